@@ -1,10 +1,273 @@
-import os 
+import os
+import sys
+import json
+import time
+import hashlib
+import shutil
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.constants.training_pipeline import (SYNC_MAX_WORKERS, SYNC_MULTIPART_THRESHOLD_MB,
+                                                         SYNC_MULTIPART_CHUNKSIZE_MB, SYNC_MANIFEST_FILE_NAME)
+from NetworkSecurity.utils.common.stage_cache import hash_path
+
+MB = 1024 * 1024
+
+class S3ObjectStore:
+    """
+    Objects of an S3 bucket, through boto3. Large files are transferred as concurrent
+    multipart uploads / ranged downloads.
+    """
+    def __init__(self, bucket: str, multipart_threshold: int, multipart_chunksize: int, max_concurrency: int):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            self.bucket = bucket
+            self.client = boto3.client("s3")
+            self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold,
+                                                  multipart_chunksize=multipart_chunksize,
+                                                  max_concurrency=max_concurrency, use_threads=True)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_object(self, key: str):
+        """
+        Returns:
+            object content, None if there is no such object
+        """
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def put_object(self, key: str, body: bytes)->None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body)
+
+    def list_keys(self, prefix: str)->list:
+        keys = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+        return keys
+
+    def upload_file(self, file_path: str, key: str)->None:
+        self.client.upload_file(file_path, self.bucket, key, Config=self.transfer_config)
+
+    def download_file(self, key: str, file_path: str)->None:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.client.download_file(self.bucket, key, file_path, Config=self.transfer_config)
+
+class LocalObjectStore:
+    """
+    Object store kept in a local directory (file:// urls), a stand-in for S3 in tests and
+    offline runs. Files above multipart_threshold are copied in parts by concurrent threads,
+    like a multipart upload, and every object appears atomically once complete.
+    """
+    def __init__(self, root_dir: str, multipart_threshold: int, multipart_chunksize: int, max_concurrency: int):
+        self.root_dir = root_dir
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.max_concurrency = max_concurrency
+
+    def _path(self, key: str)->str:
+        return os.path.join(self.root_dir, *key.split("/"))
+
+    def get_object(self, key: str):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as file_obj:
+            return file_obj.read()
+
+    def put_object(self, key: str, body: bytes)->None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".part", "wb") as file_obj:
+            file_obj.write(body)
+        os.replace(path + ".part", path)
+
+    def list_keys(self, prefix: str)->list:
+        keys = []
+        for root, dirs, files in os.walk(self.root_dir):
+            for file_name in files:
+                key = os.path.relpath(os.path.join(root, file_name), self.root_dir).replace(os.sep, "/")
+                if key.startswith(prefix) and not key.endswith(".part"):
+                    keys.append(key)
+        return sorted(keys)
+
+    def _copy(self, source_path: str, destination_path: str)->None:
+        os.makedirs(os.path.dirname(destination_path) or ".", exist_ok=True)
+        temp_path = destination_path + ".part"
+        size = os.path.getsize(source_path)
+        if size < self.multipart_threshold or not hasattr(os, "pread"):
+            shutil.copyfile(source_path, temp_path)
+        else:
+            source_fd = os.open(source_path, os.O_RDONLY)
+            destination_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.ftruncate(destination_fd, size)
+                def copy_part(offset):
+                    # pread and pwrite may transfer fewer bytes than asked, loop until the part is copied
+                    end = min(offset + self.multipart_chunksize, size)
+                    while offset < end:
+                        data = os.pread(source_fd, end - offset, offset)
+                        if not data:
+                            raise EOFError(f"{source_path} was truncated while being copied")
+                        view = memoryview(data)
+                        while view:
+                            written = os.pwrite(destination_fd, view, offset)
+                            view = view[written:]
+                            offset += written
+                with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                    list(executor.map(copy_part, range(0, size, self.multipart_chunksize)))
+            finally:
+                os.close(source_fd)
+                os.close(destination_fd)
+        os.replace(temp_path, destination_path)
+
+    def upload_file(self, file_path: str, key: str)->None:
+        self._copy(file_path, self._path(key))
+
+    def download_file(self, key: str, file_path: str)->None:
+        self._copy(self._path(key), file_path)
 
 class S3Sync:
-    def sync_folder_to_s3(self, folder, aws_bucket_url):
-        command = f"aws s3 sync {folder} {aws_bucket_url}"
-        os.system(command)
-    
-    def sync_folder_from_s3(self, folder, aws_bucket_url):
-        command = f"aws s3 sync {aws_bucket_url} {folder}"
-        os.system(command)
\ No newline at end of file
+    """
+    In process folder sync with an object store: s3://bucket/prefix urls use the S3 API,
+    file:// urls (or plain paths) a local directory store.
+    Every synced prefix holds a manifest of the sha256 and size of its files, so only the
+    files whose content changed are transferred, on a thread pool of max_workers.
+    The manifest is written after all transfers succeeded, so a failed sync is retried in full.
+    """
+    def __init__(self, max_workers: int = SYNC_MAX_WORKERS,
+                 multipart_threshold: int = SYNC_MULTIPART_THRESHOLD_MB * MB,
+                 multipart_chunksize: int = SYNC_MULTIPART_CHUNKSIZE_MB * MB):
+        self.max_workers = max_workers
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+
+    def get_store(self, url: str):
+        """
+        Returns:
+            (object store, key prefix) for the url
+        """
+        parsed = urlparse(url)
+        if parsed.scheme == "s3":
+            store = S3ObjectStore(parsed.netloc, self.multipart_threshold, self.multipart_chunksize, self.max_workers)
+            return store, parsed.path.strip("/")
+        if parsed.scheme in ("file", ""):
+            root_dir = parsed.netloc + parsed.path if parsed.scheme == "file" else url
+            return LocalObjectStore(root_dir, self.multipart_threshold, self.multipart_chunksize, self.max_workers), ""
+        raise ValueError(f"Unsupported sync url: {url}")
+
+    def hash_folder(self, folder: str)->dict:
+        """
+        Returns:
+            relative posix path -> {"sha256", "size"} of every file under folder
+        """
+        file_paths = []
+        for root, dirs, files in os.walk(folder):
+            file_paths.extend(os.path.join(root, file_name) for file_name in files)
+
+        def hash_file(file_path):
+            hasher = hashlib.sha256()
+            hash_path(file_path, hasher)
+            return {"sha256": hasher.hexdigest(), "size": os.path.getsize(file_path)}
+
+        # hashlib releases the GIL on large blocks, so files are hashed in parallel
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            hashes = list(executor.map(hash_file, file_paths))
+        return {os.path.relpath(file_path, folder).replace(os.sep, "/"): file_hash
+                for file_path, file_hash in zip(file_paths, hashes)}
+
+    def read_manifest(self, store, prefix: str)->dict:
+        body = store.get_object(posixpath.join(prefix, SYNC_MANIFEST_FILE_NAME))
+        return json.loads(body) if body is not None else None
+
+    def transfer(self, transfer_file, jobs: list)->None:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # result() raises the first failed transfer
+            for future in [executor.submit(transfer_file, *job) for job in jobs]:
+                future.result()
+
+    def get_report(self, direction: str, n_files: int, transferred: list, sizes: dict, start_time: float)->dict:
+        seconds = time.perf_counter() - start_time
+        bytes_transferred = sum(sizes[key] for key in transferred)
+        report = {
+            "direction": direction,
+            "files": n_files,
+            "transferred": len(transferred),
+            "skipped": n_files - len(transferred),
+            "bytes_transferred": bytes_transferred,
+            "seconds": round(seconds, 3),
+            "mb_per_second": round(bytes_transferred / MB / seconds, 2) if seconds > 0 else 0.0
+        }
+        logging.info(f"Sync report: {report}")
+        return report
+
+    def sync_folder_to_s3(self, folder, aws_bucket_url)->dict:
+        """
+        Uploads the files of folder whose content differs from the synced copy.
+        Returns:
+            sync report (files, transferred, skipped, bytes_transferred, seconds, mb_per_second)
+        """
+        try:
+            local_files = self.hash_folder(folder)
+            file_paths = {key: os.path.join(folder, *key.split("/")) for key in local_files}
+            return self.sync_files_to_s3(local_files, file_paths, aws_bucket_url)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def sync_files_to_s3(self, local_files: dict, file_paths: dict, aws_bucket_url)->dict:
+        """
+        Uploads the files whose content differs from the synced copy.
+        Args:
+            local_files: key -> {"sha256", "size"}
+            file_paths: key -> local file path
+        Returns:
+            sync report (files, transferred, skipped, bytes_transferred, seconds, mb_per_second)
+        """
+        try:
+            start_time = time.perf_counter()
+            store, prefix = self.get_store(aws_bucket_url)
+            remote_files = self.read_manifest(store, prefix) or {}
+            changed = [key for key, file_hash in local_files.items() if remote_files.get(key) != file_hash]
+            logging.info(f"Uploading {len(changed)} of {len(local_files)} files to {aws_bucket_url}")
+
+            self.transfer(store.upload_file, [(file_paths[key], posixpath.join(prefix, key)) for key in changed])
+            # Like aws s3 sync, files that are only in the remote copy are kept
+            remote_files.update(local_files)
+            store.put_object(posixpath.join(prefix, SYNC_MANIFEST_FILE_NAME),
+                             json.dumps(remote_files, sort_keys=True).encode())
+            return self.get_report("upload", len(local_files), changed,
+                                   {key: file_hash["size"] for key, file_hash in local_files.items()}, start_time)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def sync_folder_from_s3(self, folder, aws_bucket_url)->dict:
+        """
+        Downloads the remote files that are missing from folder or differ from it.
+        A prefix without manifest (not written by S3Sync) is downloaded in full.
+        Returns:
+            sync report (files, transferred, skipped, bytes_transferred, seconds, mb_per_second)
+        """
+        try:
+            start_time = time.perf_counter()
+            store, prefix = self.get_store(aws_bucket_url)
+            remote_files = self.read_manifest(store, prefix)
+            if remote_files is None:
+                keys = [key for key in store.list_keys(prefix) if not key.endswith(SYNC_MANIFEST_FILE_NAME)]
+                remote_files = {posixpath.relpath(key, prefix or "."): None for key in keys}
+            local_files = self.hash_folder(folder) if os.path.isdir(folder) else {}
+            changed = [key for key, file_hash in remote_files.items()
+                       if file_hash is None or local_files.get(key) != file_hash]
+            logging.info(f"Downloading {len(changed)} of {len(remote_files)} files from {aws_bucket_url} to {folder}")
+
+            self.transfer(store.download_file, [(posixpath.join(prefix, key), os.path.join(folder, *key.split("/")))
+                                                for key in changed])
+            sizes = {key: os.path.getsize(os.path.join(folder, *key.split("/"))) for key in changed}
+            return self.get_report("download", len(remote_files), changed, sizes, start_time)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -2,14 +2,26 @@ from NetworkSecurity.exception.exception import NetworkSecurityException
 from NetworkSecurity.logging.logger import logging
 import os 
 import sys 
+import time 
+import zlib 
+from datetime import timedelta
+from itertools import islice 
 import pymongo 
+from bson import ObjectId 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split 
 
 # Config file for data ingestion 
 from NetworkSecurity.entity.config_entity import DataIngestionConfig
 from NetworkSecurity.entity.artifact_entity import DataIngestionArtifact
+from NetworkSecurity.constants.training_pipeline import SCHEMA_FILE_PATH
+from NetworkSecurity.utils.common.functions import (get_peak_rss_mb, read_yaml_file, write_yaml_file,
+                                                    get_schema_dtypes, enforce_schema_dtypes, get_arrow_schema,
+                                                    write_feature_store_file, read_feature_store_file,
+                                                    replace_file)
+from NetworkSecurity.utils.common.profiler import profile_step
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -19,57 +31,271 @@ class DataIngestion():
     def __init__(self, data_ingestion_config: DataIngestionConfig):
         try:
             self.data_ingestion_config = data_ingestion_config
+            self.schema_dtypes = get_schema_dtypes(read_yaml_file(SCHEMA_FILE_PATH))
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
-    def export_collection_as_df(self):
+    def to_typed_frame(self, documents: list) -> pd.DataFrame:
+        """
+        Builds a dataframe from one batch of documents with the compact dtypes of schema.yaml
+        (int8 for the -1/0/1 features), columns with "na" values become float32 with nan.
+        """
+        try:
+            df = pd.DataFrame.from_records(documents)
+            df.replace({"na": np.nan}, inplace=True)
+            return enforce_schema_dtypes(df, self.schema_dtypes)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def read_collection_in_chunks(self, incremental: bool = False, after_object_id: str = None):
+        """
+        Yields the collection as typed dataframes of at most batch_size documents,
+        so the full list of documents is never held in memory.
+        Args:
+            incremental: read in _id order and keep the _id column so the caller can track the watermark
+            after_object_id: with incremental, only documents with a greater _id are read
+        """
         try:
             database_name = self.data_ingestion_config.database_name
             collection_name = self.data_ingestion_config.collection_name
+            batch_size = self.data_ingestion_config.batch_size
             self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
             collection = self.mongo_client[database_name][collection_name]
-            df = pd.DataFrame(list(collection.find()))
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns = ["_id"], axis=1)
-            df.replace({"na":np.nan}, inplace=True)
-            return df
+            if not incremental:
+                # _id is dropped server side instead of after loading
+                cursor = collection.find({}, projection={"_id": 0}, batch_size=batch_size)
+            else:
+                query = {"_id": {"$gt": ObjectId(after_object_id)}} if after_object_id else {}
+                cursor = collection.find(query, batch_size=batch_size).sort("_id", pymongo.ASCENDING)
+
+            total_docs = 0
+            start_time = time.perf_counter()
+            while True:
+                documents = list(islice(cursor, batch_size))
+                if not documents:
+                    break
+                total_docs += len(documents)
+                yield self.to_typed_frame(documents)
+            elapsed = time.perf_counter() - start_time
+            logging.info(f"Exported {total_docs} documents in {elapsed:.1f}s "
+                         f"({total_docs / elapsed if elapsed > 0 else 0:.0f} docs/sec), "
+                         f"peak RSS {get_peak_rss_mb():.1f} MB")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_collection_fingerprint(self) -> dict:
+        """
+        Cheap identity of the collection content (document count and newest _id) used as the
+        ingestion cache key. Documents are only ever appended, in place updates are not detected.
+        """
+        try:
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+            collection = self.mongo_client[self.data_ingestion_config.database_name][
+                self.data_ingestion_config.collection_name]
+            newest = collection.find_one({}, projection={"_id": 1}, sort=[("_id", pymongo.DESCENDING)])
+            return {"count": collection.count_documents({}),
+                    "last_object_id": str(newest["_id"]) if newest else None}
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def export_collection_into_featurestore(self) -> str:
+        """
+        Streams the collection into the feature store, one row group per chunk of documents.
+        Only one chunk is held in memory at a time.
+        Returns:
+            feature store file path
+        """
+        try:
+            feature_store_file_path = self.data_ingestion_config.feature_store_file_path
+            os.makedirs(os.path.dirname(feature_store_file_path), exist_ok=True)
+            arrow_schema = get_arrow_schema(self.schema_dtypes)
+            with replace_file(feature_store_file_path) as temp_path, pq.ParquetWriter(temp_path, arrow_schema) as writer:
+                for chunk in self.read_collection_in_chunks():
+                    writer.write_table(pa.Table.from_pandas(chunk[arrow_schema.names], schema=arrow_schema,
+                                                            preserve_index=False))
+            return feature_store_file_path
         except Exception as e:
             raise NetworkSecurityException(e, sys)
     
+    def is_test_document(self, object_ids: pd.Series) -> np.ndarray:
+        """
+        Deterministic train test assignment from a hash of the document _id, so a document
+        stays in the same split across incremental runs.
+        """
+        try:
+            buckets = np.array([zlib.crc32(object_id.binary) % 10000 for object_id in object_ids])
+            return buckets < self.data_ingestion_config.train_test_split_ratio * 10000
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def read_watermark(self) -> dict:
+        """
+        Returns:
+            {"last_object_id": greatest _id ingested, "recent_object_ids": _ids ingested within the lag
+            window of last_object_id}, empty before the first run. Watermarks written before the lag
+            window existed have no recent_object_ids.
+        """
+        try:
+            if not os.path.exists(self.data_ingestion_config.watermark_file_path):
+                return {}
+            return read_yaml_file(self.data_ingestion_config.watermark_file_path)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def ingest_new_documents_into_featurestore(self) -> int:
+        """
+        Pulls the documents inserted since the stored watermark and appends them to the persisted
+        train and test feature stores as new part files. Part files are named after the watermark
+        they start from, so a rerun after a failure overwrites its own parts.
+
+        ObjectIds are generated on the clients, so concurrent writers can commit a lower _id after a
+        higher one was read. Every run therefore re-reads the documents generated up to
+        watermark_lag_seconds before the watermark, and skips the _ids it already ingested; the
+        watermark keeps the _ids of that window for this. A document committed later than the lag
+        after its _id was generated is still missed, the lag has to cover insert latency and client
+        clock skew.
+        Returns:
+            number of new documents
+        """
+        try:
+            persisted_dir = self.data_ingestion_config.persisted_feature_store_dir
+            lag = timedelta(seconds=self.data_ingestion_config.watermark_lag_seconds)
+            watermark = self.read_watermark()
+            last_object_id = watermark.get("last_object_id")
+            recent_object_ids = watermark.get("recent_object_ids")
+            window_start = None
+            if last_object_id:
+                window_start = str(ObjectId.from_datetime(ObjectId(last_object_id).generation_time - lag))
+            logging.info(f"Incremental ingestion after watermark {last_object_id}, re-reading from {window_start}")
+
+            seen_object_ids = set(recent_object_ids or [])
+            def is_ingested(object_id) -> bool:
+                if recent_object_ids is None:
+                    # Watermark without a lag window, everything up to it was ingested
+                    return last_object_id is not None and object_id <= ObjectId(last_object_id)
+                return str(object_id) in seen_object_ids
+
+            part_file_name = f"part_after_{last_object_id or 'start'}.parquet"
+            arrow_schema = get_arrow_schema(self.schema_dtypes)
+            writers = {}
+            new_docs = 0
+            read_object_ids = []
+            try:
+                for chunk in self.read_collection_in_chunks(incremental=True, after_object_id=window_start):
+                    object_ids = chunk.pop("_id")
+                    read_object_ids.extend(object_ids)
+                    is_new = np.array([not is_ingested(object_id) for object_id in object_ids], dtype=bool)
+                    chunk, object_ids = chunk[is_new], object_ids[is_new]
+                    if chunk.empty:
+                        continue
+                    is_test = self.is_test_document(object_ids)
+                    for split, mask in (("train", ~is_test), ("test", is_test)):
+                        if not mask.any():
+                            continue
+                        if split not in writers:
+                            split_dir = os.path.join(persisted_dir, split)
+                            os.makedirs(split_dir, exist_ok=True)
+                            writers[split] = pq.ParquetWriter(os.path.join(split_dir, part_file_name), arrow_schema)
+                        writers[split].write_table(pa.Table.from_pandas(chunk.loc[mask, arrow_schema.names],
+                                                                        schema=arrow_schema, preserve_index=False))
+                    new_docs += len(chunk)
+            finally:
+                for writer in writers.values():
+                    writer.close()
+
+            # Watermark is moved only after the part files are complete
+            if new_docs:
+                newest = max(read_object_ids)
+                newest_window_start = newest.generation_time - lag
+                write_yaml_file(self.data_ingestion_config.watermark_file_path, {
+                    "last_object_id": str(newest),
+                    "recent_object_ids": sorted(str(object_id) for object_id in read_object_ids
+                                                if object_id.generation_time >= newest_window_start)
+                })
+                last_object_id = str(newest)
+            logging.info(f"Appended {new_docs} new documents to the feature store, watermark {last_object_id}")
+            return new_docs
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def export_featurestore_into_train_test(self):
+        """
+        Writes the union of all persisted train and test parts to this run's ingested files
+        """
+        try:
+            persisted_dir = self.data_ingestion_config.persisted_feature_store_dir
+            for split, file_path in (("train", self.data_ingestion_config.training_file_path),
+                                     ("test", self.data_ingestion_config.testing_file_path)):
+                dataframe = read_feature_store_file(os.path.join(persisted_dir, split), self.schema_dtypes)
+                write_feature_store_file(file_path, dataframe, self.schema_dtypes)
+                logging.info(f"Exported {len(dataframe)} {split} rows from the persisted feature store")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
     def export_data_into_featurestore(self, dataframe: pd.DataFrame):
         try:
             feature_store_file_path = self.data_ingestion_config.feature_store_file_path
             # creating folder 
             dir_path = os.path.dirname(feature_store_file_path)
             os.makedirs(dir_path, exist_ok=True)
-            dataframe.to_csv(feature_store_file_path, index=False, header=True)
+            write_feature_store_file(feature_store_file_path, dataframe, self.schema_dtypes)
             return dataframe
         
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
-    def split_data_into_train_test(self, dataframe: pd.DataFrame):
+    def split_data_into_train_test(self, feature_store_file_path: str) -> int:
+        """
+        Splits the feature store file into the train and test files one row group at a time, so
+        the data set is never held in memory whole. As train_test_split, ceil(n_rows * ratio)
+        random rows go to the test file, and the rows of every row group are shuffled.
+        Returns:
+            number of rows split
+        """
         try:
-            train, test = train_test_split(dataframe,
-                                           test_size=self.data_ingestion_config.train_test_split_ratio)
-            logging.info("Performed train test split on dataframe")
-            train_dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
-            os.makedirs(train_dir_path, exist_ok=True)
-            test_dir_path = os.path.dirname(self.data_ingestion_config.testing_file_path)
-            os.makedirs(test_dir_path, exist_ok=True)
-            logging.info(f"Exporting train and test file path")
-            train.to_csv(self.data_ingestion_config.training_file_path, index=False, header=True)
-            test.to_csv(self.data_ingestion_config.testing_file_path, index = False, header=True)
-            logging.info(f"Exported train and test path")
+            parquet_file = pq.ParquetFile(feature_store_file_path)
+            n_rows = parquet_file.metadata.num_rows
+            n_test = int(np.ceil(n_rows * self.data_ingestion_config.train_test_split_ratio))
+            random_generator = np.random.default_rng()
+            # One flag per row is all that is kept for the whole data set
+            is_test = np.zeros(n_rows, dtype=bool)
+            is_test[random_generator.choice(n_rows, size=n_test, replace=False)] = True
 
+            os.makedirs(os.path.dirname(self.data_ingestion_config.training_file_path), exist_ok=True)
+            os.makedirs(os.path.dirname(self.data_ingestion_config.testing_file_path), exist_ok=True)
+            logging.info(f"Exporting train and test file path")
+            arrow_schema = parquet_file.schema_arrow
+            with replace_file(self.data_ingestion_config.training_file_path) as train_temp_path, \
+                    replace_file(self.data_ingestion_config.testing_file_path) as test_temp_path, \
+                    pq.ParquetWriter(train_temp_path, arrow_schema) as train_writer, \
+                    pq.ParquetWriter(test_temp_path, arrow_schema) as test_writer:
+                offset = 0
+                for row_group in range(parquet_file.num_row_groups):
+                    table = parquet_file.read_row_group(row_group)
+                    order = random_generator.permutation(table.num_rows)
+                    table = table.take(order)
+                    test_mask = is_test[offset:offset + table.num_rows][order]
+                    offset += table.num_rows
+                    train_writer.write_table(table.filter(pa.array(~test_mask)))
+                    test_writer.write_table(table.filter(pa.array(test_mask)))
+            logging.info(f"Exported train and test path: {n_rows - n_test} train rows, {n_test} test rows")
+            return n_rows
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
     def initiate_data_ingestion(self):
         try:
-            dataframe = self.export_collection_as_df()
-            dataframe = self.export_data_into_featurestore(dataframe)
-            self.split_data_into_train_test(dataframe)
+            if self.data_ingestion_config.incremental:
+                with profile_step("ingest_new_documents") as step:
+                    step["rows"] = self.ingest_new_documents_into_featurestore()
+                with profile_step("export_train_test"):
+                    self.export_featurestore_into_train_test()
+            else:
+                with profile_step("export_collection") as step:
+                    feature_store_file_path = self.export_collection_into_featurestore()
+                    step["rows"] = pq.ParquetFile(feature_store_file_path).metadata.num_rows
+                with profile_step("split_train_test", rows=step["rows"]):
+                    self.split_data_into_train_test(feature_store_file_path)
             dataingestion_artifacts = DataIngestionArtifact(
                 trained_file_path=self.data_ingestion_config.training_file_path, 
                 test_file_path = self.data_ingestion_config.testing_file_path
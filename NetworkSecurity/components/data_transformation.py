@@ -1,16 +1,19 @@
 import sys 
 import os 
-import numpy as np
 import pandas as pd 
-from sklearn.impute import KNNImputer 
 from sklearn.pipeline import Pipeline
 
-from NetworkSecurity.constants.training_pipeline import TARGET_COLUMN, DATA_TRANSFORMATION_IMPUTER_PARAMS
+from NetworkSecurity.constants.training_pipeline import (TARGET_COLUMN, DATA_TRANSFORMATION_IMPUTER_PARAMS,
+                                                         SCHEMA_FILE_PATH)
 from NetworkSecurity.entity.artifact_entity import DataTransformationArtifacts, DataValidationArtifacts
 from NetworkSecurity.entity.config_entity import DataTransformationConfig 
 from NetworkSecurity.exception.exception import NetworkSecurityException
 from NetworkSecurity.logging.logger import logging
-from NetworkSecurity.utils.common.functions import save_numpy_array_data, save_object
+from NetworkSecurity.utils.ml_utils.model.imputer import FastImputer
+from NetworkSecurity.utils.common.functions import (save_numpy_array_data, save_object, read_yaml_file,
+                                                    get_schema_dtypes, read_feature_store_file,
+                                                    to_compact_array)
+from NetworkSecurity.utils.common.profiler import profile_step
 
 class DataTransformation:
     def __init__(self, data_validation_artifacts: DataValidationArtifacts,
@@ -18,20 +21,20 @@ class DataTransformation:
         try:
             self.data_validation_artifacts = data_validation_artifacts
             self.data_transformation_config = data_transformation_config 
+            self.schema_dtypes = get_schema_dtypes(read_yaml_file(SCHEMA_FILE_PATH))
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
-    @staticmethod
-    def read_data(file_path)->pd.DataFrame:
+    def read_data(self, file_path)->pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_feature_store_file(file_path, self.schema_dtypes)
         except Exception as e:
             raise NetworkSecurityException(e, sys)
 
     def get_data_transformer_object(cls)->Pipeline:
         """
-        It initialises a KNN imputer object with parameter specified in training pipeline.py file
-        and retune the pipeline object with tha KNNImputer object as the first step.
+        It initialises an imputer object with parameter specified in training pipeline.py file
+        and retune the pipeline object with tha imputer object as the first step.
         Args:
             cls: DataTransformation
         Returns:
@@ -39,8 +42,8 @@ class DataTransformation:
         """
         logging.info("entered get_data_transormer_object method of transformation class")
         try:
-            imputer = KNNImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
-            logging.info(f"Initilizing KNNImputer with {DATA_TRANSFORMATION_IMPUTER_PARAMS}")
+            imputer = FastImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
+            logging.info(f"Initilizing FastImputer with {DATA_TRANSFORMATION_IMPUTER_PARAMS}")
             processor: Pipeline = Pipeline([("imputer", imputer)])
             return processor
         except Exception as e:
@@ -50,43 +53,47 @@ class DataTransformation:
         logging.info("Entered initiate_data_transformation method of Data Transformation class")
         try:
             logging.info("Initiating Data Transformation")
-            train_df = DataTransformation.read_data(self.data_validation_artifacts.valid_train_file_path)
-            test_df = DataTransformation.read_data(self.data_validation_artifacts.valid_test_file_path)
+            train_df = self.read_data(self.data_validation_artifacts.valid_train_file_path)
+            test_df = self.read_data(self.data_validation_artifacts.valid_test_file_path)
 
             # Training data frame
-            X_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
+            X_train_df = train_df.drop(columns=[TARGET_COLUMN])
             y_train_df = train_df[TARGET_COLUMN]
             # Replacing the feature values with 0 and 1. (replacing -1 to 0)
             X_train_df = X_train_df.replace(-1, 0)
 
             # Testing data frame
-            X_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+            X_test_df = test_df.drop(columns=[TARGET_COLUMN])
             y_test_df = test_df[TARGET_COLUMN]
             # Replacing the feature values with 0 and 1. (replacing -1 to 0)
             X_test_df = X_test_df.replace(-1, 0)
 
             # Transforming the data
             preprocessor = self.get_data_transformer_object()
-            preprocessor_object = preprocessor.fit(X_test_df)
-            X_train_transformed_df = preprocessor_object.transform(X_train_df)
-            X_test_transformed_df = preprocessor_object.transform(X_test_df)
-            train_arr = np.c_[X_train_transformed_df, np.array(y_train_df)]
-            test_arr = np.c_[X_test_transformed_df, np.array(y_test_df)]
+            with profile_step("preprocessor_fit", rows=len(X_train_df)):
+                preprocessor_object = preprocessor.fit(X_train_df)
+            feature_dtype = self.data_transformation_config.feature_dtype
+            with profile_step("preprocessor_transform", rows=len(X_train_df) + len(X_test_df)):
+                X_train_arr = to_compact_array(preprocessor_object.transform(X_train_df), feature_dtype)
+                X_test_arr = to_compact_array(preprocessor_object.transform(X_test_df), feature_dtype)
+            y_train_arr = to_compact_array(y_train_df.to_numpy(), self.schema_dtypes[TARGET_COLUMN])
+            y_test_arr = to_compact_array(y_test_df.to_numpy(), self.schema_dtypes[TARGET_COLUMN])
 
-            # Save array data   
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_arr)
+            # Save features and labels as separate arrays, so they can be memory mapped
+            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=X_train_arr)
+            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=X_test_arr)
+            save_numpy_array_data(self.data_transformation_config.transformed_train_label_file_path, array=y_train_arr)
+            save_numpy_array_data(self.data_transformation_config.transformed_test_label_file_path, array=y_test_arr)
+            # The preprocessor is published with the model, as one registry version, by ModelTrainer
             save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_object)
 
-            # Saving our preprocessing object 
-            os.makedirs("final_models/", exist_ok=True)
-            save_object("final_models/preprocessor.pkl", preprocessor_object)
-
             # Preparing artifacts
             data_transformation_artifacts = DataTransformationArtifacts(
                 transformed_object_file_path= self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path = self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path = self.data_transformation_config.transformed_test_file_path
+                transformed_test_file_path = self.data_transformation_config.transformed_test_file_path,
+                transformed_train_label_file_path = self.data_transformation_config.transformed_train_label_file_path,
+                transformed_test_label_file_path = self.data_transformation_config.transformed_test_label_file_path
                 )
             return data_transformation_artifacts
 
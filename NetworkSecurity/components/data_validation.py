@@ -4,8 +4,12 @@ from NetworkSecurity.entity.config_entity import DataValidationConfig
 from NetworkSecurity.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifacts
 from NetworkSecurity.logging.logger import logging
 from NetworkSecurity.exception.exception import NetworkSecurityException
-from NetworkSecurity.constants.training_pipeline import SCHEMA_FILE_PATH
-from scipy.stats import ks_2samp
+from NetworkSecurity.constants.training_pipeline import (SCHEMA_FILE_PATH, DATA_VALIDATION_FEATURE_DOMAIN,
+                                                         DATA_VALIDATION_DRIFT_THRESHOLD)
+from NetworkSecurity.utils.ml_utils.metric.drift_metric import (compute_histograms, compare_histograms,
+                                                                save_histograms)
+from NetworkSecurity.utils.common.schema_validator import SchemaValidator
+from NetworkSecurity.utils.common.profiler import profile_step
 import pandas as pd
 from NetworkSecurity.utils.common.functions import *
 
@@ -17,65 +21,62 @@ class DataValidation:
             self.data_ingestion_artifacts = data_ingestion_artifacts
             self.data_validation_config = data_validation_config
             self.schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self.schema_dtypes = get_schema_dtypes(self.schema_config)
+            self.schema_validator = SchemaValidator(self.schema_config, DATA_VALIDATION_FEATURE_DOMAIN,
+                                                    allow_nulls=data_validation_config.allow_nulls)
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
-    @staticmethod
-    def read_df(file_path) ->pd.DataFrame:
+    def read_df(self, file_path) ->pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_feature_store_file(file_path, self.schema_dtypes)
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
-    def validate_no_of_columns(self, dataframe:pd.DataFrame) -> bool:
+    def validate_dataframe(self, dataframe: pd.DataFrame, file_path) ->tuple:
+        """
+        Checks column presence, dtypes, nulls and the value domain of every schema column
+        in one pass, with the validator compiled from schema.yaml in __init__.
+        Returns:
+            (boolean mask of valid rows, report dict with per column violation counts)
+        """
         try:
-            default_col_len = len(self.schema_config["columns"])
-            logging.info(f"Required no of columns: {default_col_len}")
-            df_col_len = len(dataframe.columns) 
-            logging.info(f"Data frame has the column length of {df_col_len}")
-            if df_col_len == default_col_len:
-                return True 
-            return False 
-        except Exception as e:
-            raise NetworkSecurityException(e, sys)  
-
-    def validate_numerical_columns(self, dataframe: pd.DataFrame) ->bool:
-        try:
-            default_num_columns = self.schema_config["numerical_columns"]
-            df_num_cols = list((dataframe.select_dtypes("int64")).columns)
-            if default_num_columns not in df_num_cols:
-                return False 
-            return True
+            valid_rows, report = self.schema_validator.validate(dataframe, get_feature_store_dtypes(file_path))
+            logging.info(f"{file_path}: schema status {report['status']}, "
+                         f"{report['n_invalid_rows']} of {report['n_rows']} rows invalid")
+            if report["missing_columns"]:
+                logging.info(f"Missing columns: {report['missing_columns']}")
+            return valid_rows, report
         except Exception as e:
             raise NetworkSecurityException(e, sys)
-        
-    def detect_data_drift(self, default_df: pd.DataFrame, current_df: pd.DataFrame, threshold=0.05) ->bool:
+
+    def detect_data_drift(self, default_df: pd.DataFrame, current_df: pd.DataFrame,
+                          threshold=DATA_VALIDATION_DRIFT_THRESHOLD) ->bool:
+        """
+        Compares the value histograms of every column, computed in one vectorized pass
+        per dataframe, and writes KS / chi-square / PSI statistics to the drift report.
+        Returns:
+            True if drift is found in any column
+        """
         try:
-            status = False 
-            report={}
-            for column in default_df.columns:
-                d1 = default_df[column]
-                d2 = current_df[column]
-                sample_dist = ks_2samp(d1,d2)
-                if sample_dist.pvalue >= threshold:
-                    is_found = False 
-                else:
-                    is_found = True  
-                    status = True 
-                report.update(
-                    {column:{"p_value": float(sample_dist.pvalue),
-                             "drift_status": is_found}}
-                )
+            columns = list(default_df.columns)
+            reference_counts = compute_histograms(default_df[columns].to_numpy(), DATA_VALIDATION_FEATURE_DOMAIN)
+            current_counts = compute_histograms(current_df[columns].to_numpy(), DATA_VALIDATION_FEATURE_DOMAIN)
+            status, report = compare_histograms(reference_counts, current_counts, columns, threshold)
+            logging.info(f"Data drift found: {status}")
+
             drift_report_file_path = self.data_validation_config.drift_report_file_path
 
             # Create directory 
             dir_path = os.path.dirname(drift_report_file_path)
             os.makedirs(dir_path, exist_ok=True)
-            write_yaml_file(file_path=drift_report_file_path, content=report)
+            write_yaml_file(file_path=drift_report_file_path,
+                            content={"drift_status": status, "columns": report})
+            return status
             
         except Exception as e:
             raise NetworkSecurityException(e, sys)
-       
+
 
     def initiate_data_validation(self)-> DataValidationArtifacts:
         try:
@@ -83,45 +84,52 @@ class DataValidation:
             test_file_path = self.data_ingestion_artifacts.test_file_path
 
             # Read the data from train and test path 
-            train_df = DataValidation.read_df(train_file_path)
-            test_df = DataValidation.read_df(test_file_path)
-
-            # Validate number of columns 
-            status = self.validate_no_of_columns(dataframe=train_df)
-            if not status:
-                error_message = "Train dataframe does not contain all columns"
-            status = self.validate_no_of_columns(dataframe=test_df)
-            if not status:
-                error_message = "Test dataframe does not cointain all columns"
-            
-            # Validate numerical columns exists
-            status = self.validate_numerical_columns(dataframe=train_df)
-            if not status: 
-                error_message = "Train dataframe has missing numerical columns"
-            status = self.validate_numerical_columns(dataframe=test_df)
-            if not status: 
-                error_message = "Test dataframe has missing numerical columns"
+            with profile_step("read") as step:
+                train_df = self.read_df(train_file_path)
+                test_df = self.read_df(test_file_path)
+                step["rows"] = len(train_df) + len(test_df)
+
+            # Validate schema and split out invalid rows
+            with profile_step("schema_validation", rows=len(train_df) + len(test_df)) as step:
+                train_valid_rows, train_report = self.validate_dataframe(train_df, train_file_path)
+                test_valid_rows, test_report = self.validate_dataframe(test_df, test_file_path)
+                step["invalid_rows"] = train_report["n_invalid_rows"] + test_report["n_invalid_rows"]
+            write_yaml_file(file_path=self.data_validation_config.schema_report_file_path,
+                            content={"train": train_report, "test": test_report}, replace=True)
+            schema_status = train_report["status"] and test_report["status"]
+            if not schema_status:
+                logging.info("Train or test dataframe does not match the schema")
+
+            write_feature_store_file(self.data_validation_config.invalid_train_file_path,
+                                     train_df[~train_valid_rows], self.schema_dtypes)
+            write_feature_store_file(self.data_validation_config.invalid_test_file_path,
+                                     test_df[~test_valid_rows], self.schema_dtypes)
+            train_df = enforce_schema_dtypes(train_df[train_valid_rows].reset_index(drop=True), self.schema_dtypes)
+            test_df = enforce_schema_dtypes(test_df[test_valid_rows].reset_index(drop=True), self.schema_dtypes)
+            write_feature_store_file(self.data_validation_config.valid_train_file_path,
+                                     train_df, self.schema_dtypes)
+            write_feature_store_file(self.data_validation_config.valid_test_file_path,
+                                     test_df, self.schema_dtypes)
+
+            # Reference histograms of the training data, used by the live drift monitor
+            train_columns = list(train_df.columns)
+            save_histograms(self.data_validation_config.reference_histogram_file_path, train_columns,
+                            compute_histograms(train_df[train_columns].to_numpy(), DATA_VALIDATION_FEATURE_DOMAIN))
 
             # Check data drift
-            status = self.detect_data_drift(default_df=train_df, current_df=test_df)
-            dir_path = os.path.dirname(self.data_validation_config.valid_train_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            if not status:
-                train_df.to_csv(
-                    self.data_validation_config.valid_train_file_path, index = False, header=True 
-                    )
-                test_df.to_csv(
-                    self.data_validation_config.valid_test_file_path, index =False, header=True
-                )
+            with profile_step("drift_detection", rows=len(train_df) + len(test_df), columns=len(train_columns)):
+                drift_status = self.detect_data_drift(default_df=train_df, current_df=test_df)
+            status = schema_status and not drift_status
 
-            
             data_validation_artifacts = DataValidationArtifacts(
                 validation_status= status, 
-                valid_train_file_path= self.data_ingestion_artifacts.trained_file_path,
-                valid_test_file_path= self.data_ingestion_artifacts.test_file_path,
-                invalid_train_file_path=None,
-                invalid_test_file_path=None,
-                drift_report_file_path=self.data_validation_config.drift_report_file_path
+                valid_train_file_path= self.data_validation_config.valid_train_file_path,
+                valid_test_file_path= self.data_validation_config.valid_test_file_path,
+                invalid_train_file_path=self.data_validation_config.invalid_train_file_path,
+                invalid_test_file_path=self.data_validation_config.invalid_test_file_path,
+                drift_report_file_path=self.data_validation_config.drift_report_file_path,
+                schema_report_file_path=self.data_validation_config.schema_report_file_path,
+                reference_histogram_file_path=self.data_validation_config.reference_histogram_file_path
             )
 
             return data_validation_artifacts
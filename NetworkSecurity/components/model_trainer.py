@@ -1,5 +1,6 @@
 import os 
 import sys 
+import numpy as np
 
 from NetworkSecurity.logging.logger import logging
 from NetworkSecurity.exception.exception import NetworkSecurityException 
@@ -7,22 +8,15 @@ from NetworkSecurity.exception.exception import NetworkSecurityException
 from NetworkSecurity.entity.artifact_entity import DataTransformationArtifacts, ModelTrainerArtifacts
 from NetworkSecurity.entity.config_entity import ModelTrainerConfig 
 
-from NetworkSecurity.utils.common.functions import (save_object, load_object, 
-                                                    load_numpy_array_data)
+from NetworkSecurity.utils.common.functions import save_object, load_object, load_numpy_array_data
+from NetworkSecurity.constants.training_pipeline import DATA_VALIDATION_FEATURE_DOMAIN
 from NetworkSecurity.utils.ml_utils.model.evaluate import evaluate_models
 from NetworkSecurity.utils.ml_utils.metric.classification_metric import get_classification_score
 from NetworkSecurity.utils.ml_utils.model.estimator import NetworkModel
-
-from sklearn.linear_model import LogisticRegression
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.tree import DecisionTreeClassifier 
-from sklearn.ensemble import ( RandomForestClassifier, 
-                            AdaBoostClassifier, GradientBoostingClassifier)
-
-import mlflow
-
-import dagshub
-dagshub.init(repo_owner='naveenmails814', repo_name='Network_Security', mlflow=True)
+from NetworkSecurity.utils.ml_utils.model.compiled_ensemble import CompiledEnsemble
+from NetworkSecurity.utils.ml_utils.model.registry import ModelRegistry
+from NetworkSecurity.utils.common.profiler import profile_step
+from NetworkSecurity.utils.ml_utils.experiment_tracker import get_experiment_tracker
 
 
 class ModelTrainer:
@@ -34,59 +28,105 @@ class ModelTrainer:
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
-    def track_mlflow(self, best_model , classification_metric ):
-        with mlflow.start_run():
-            f1_score = classification_metric.f1_score
-            precision_score = classification_metric.precision_score
-            recall_score = classification_metric.recall_score
-
-            mlflow.log_metric("f1_score", f1_score)
-            mlflow.log_metric("Precision", precision_score)
-            mlflow.log_metric("Recall", recall_score)
+    def track_mlflow(self, best_model, classification_train_report, classification_test_report):
+        """
+        Tracks one run with the train and test metrics and the model. The run is shipped
+        to MLflow by a background worker, training does not wait for it.
+        """
+        with profile_step("mlflow_tracking"):
+            experiment_tracker = get_experiment_tracker()
+            experiment_tracker.log_params({"model_class": type(best_model).__name__, **best_model.get_params()})
+            for prefix, classification_metric in (("train_", classification_train_report),
+                                                  ("test_", classification_test_report)):
+                experiment_tracker.log_metrics({"f1_score": classification_metric.f1_score,
+                                                "Precision": classification_metric.precision_score,
+                                                "Recall": classification_metric.recall_score}, prefix=prefix)
+            experiment_tracker.log_model(best_model)
+            experiment_tracker.end_run()
 
-            mlflow.sklearn.log_model(best_model, "model")
 
+        
+    def get_serving_model(self, best_model, X_test):
+        """
+        Compiles a tree ensemble for serving if enabled and supported. The compiled model is
+        only used if it predicts exactly like the sklearn model on the test set.
+        """
+        try:
+            if not (self.model_trainer_config.compile_ensemble and CompiledEnsemble.is_supported(best_model)):
+                return best_model
+            compiled_model = CompiledEnsemble(
+                best_model, domain=DATA_VALIDATION_FEATURE_DOMAIN,
+                fallback_min_rows=self.model_trainer_config.compiled_fallback_min_rows,
+                fallback_distinct_ratio=self.model_trainer_config.compiled_fallback_distinct_ratio)
+            if not np.array_equal(compiled_model.predict(X_test), best_model.predict(X_test)):
+                logging.info("Compiled ensemble predictions differ from sklearn, serving the sklearn model")
+                return best_model
+            logging.info(f"Serving {type(best_model).__name__} through the compiled ensemble kernel")
+            return compiled_model
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
 
+    @staticmethod
+    def get_search_space()->tuple:
+        """
+        Returns:
+            (model name -> candidate estimator, model name -> hyperparameter distributions)
+        """
+        # Candidate estimators are imported here, importing the trainer stays cheap
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.tree import DecisionTreeClassifier 
+        from sklearn.ensemble import ( RandomForestClassifier, 
+                                      AdaBoostClassifier, GradientBoostingClassifier)
+
+        models = {
+            "Random Forest": RandomForestClassifier(verbose=1),
+            "Decision Tree": DecisionTreeClassifier(),
+            "Gradient Boosting": GradientBoostingClassifier(),
+            "Logistic Regression": LogisticRegression(verbose=1),
+            "Ada Boost": AdaBoostClassifier()
+        }
         
+        params = {
+            "Decision Tree":{
+                "criterion": ["gini", "entropy", "log_loss"],
+                "splitter": ["best", "random"],
+                "max_features": ["sqrt", "log2"]
+            },
+            "Random Forest":{
+                "criterion": ["gini", "entropy", "log_loss"],
+                "max_features": ["sqrt", "log2", None],
+                "n_estimators": [8,16,32,64,128,246]
+            },
+            "Gradient Boosting":{
+                "loss": ["log_loss", "exponential"],
+                "learning_rate": [0.1, 0.01, 0.05, 0.001],
+                "subsample": [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
+                "criterion": ["squared_error", "friedman_mse"],
+                "max_features": ["auto", "sqrt", "log2"],
+                "n_estimators": [88,16,32,64,128,256]
+            },
+            "Ada Boost":{
+                "learning_rate": [0.1, 0.01, 0.05, 0.001],
+                "n_estimators": [88,16,32,64,128,256]
+            },
+            "Logistic Regression":{}
+        }
+        return models, params
+
     def train_model(self,X_train, y_train, X_test, y_test):
         try:
-            
-            models = {
-                "Random Forest": RandomForestClassifier(verbose=1),
-                "Decision Tree": DecisionTreeClassifier(),
-                "Gradient Boosting": GradientBoostingClassifier(),
-                "Logistic Regression": LogisticRegression(verbose=1),
-                "Ada Boost": AdaBoostClassifier()
-            }
-        
-            params = {
-                "Decision Tree":{
-                    "criterion": ["gini", "entropy", "log_loss"],
-                    "splitter": ["best", "random"],
-                    "max_features": ["sqrt", "log2"]
-                },
-                "Random Forest":{
-                    "criterion": ["gini", "entropy", "log_loss"],
-                    "max_features": ["sqrt", "log2", None],
-                    "n_estimators": [8,16,32,64,128,246]
-                },
-                "Gradient Boosting":{
-                    "loss": ["log_loss", "exponential"],
-                    "learning_rate": [0.1, 0.01, 0.05, 0.001],
-                    "subsample": [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
-                    "criterion": ["squared_error", "friedman_mse"],
-                    "max_features": ["auto", "sqrt", "log2"],
-                    "n_estimators": [88,16,32,64,128,256]
-                },
-                "Ada Boost":{
-                    "learning_rate": [0.1, 0.01, 0.05, 0.001],
-                    "n_estimators": [88,16,32,64,128,256]
-                },
-                "Logistic Regression":{}
-            }
-            model_report: dict = evaluate_models(X_train=X_train, y_train= y_train,
-                                                 X_test = X_test, y_test=y_test, 
-                                                 params = params, models= models) 
+            models, params = self.get_search_space()
+            with profile_step("model_search", rows=len(X_train), models=len(models)):
+                model_report: dict = evaluate_models(X_train=X_train, y_train= y_train,
+                                                     X_test = X_test, y_test=y_test, 
+                                                     params = params, models= models,
+                                                     n_jobs=self.model_trainer_config.search_n_jobs,
+                                                     time_budget_seconds=self.model_trainer_config.search_time_budget_seconds,
+                                                     n_iter=self.model_trainer_config.search_n_iter,
+                                                     random_state=self.model_trainer_config.search_random_state,
+                                                     search_mode=self.model_trainer_config.search_mode,
+                                                     halving_factor=self.model_trainer_config.halving_factor,
+                                                     halving_resources=self.model_trainer_config.halving_resources) 
             
             # Get best model score and model
             best_model_score = max(sorted(model_report.values()))
@@ -98,32 +138,39 @@ class ModelTrainer:
             y_train_pred = best_model.predict(X_train)
             classification_train_report = get_classification_score(y_true=y_train, y_pred= y_train_pred )
 
-            # Track experiments with MLflow
-            self.track_mlflow(best_model, classification_train_report)
-
             y_test_pred = best_model.predict(X_test)
             classification_test_report = get_classification_score(y_true=y_test, y_pred= y_test_pred )
 
-            # Track experiments with MLflow
-            self.track_mlflow(best_model, classification_test_report)
+            # Track experiments with MLflow, one run with train and test metrics
+            self.track_mlflow(best_model, classification_train_report, classification_test_report)
 
             preprocessor = load_object(file_path=self.data_transformation_artifacts.transformed_object_file_path)
 
             model_dir_path = os.path.dirname(self.model_trainer_config.trainer_model_file_path)
             os.makedirs(model_dir_path, exist_ok=True)
 
-            Network_Model = NetworkModel(preprocessor=preprocessor, model=best_model)
+            with profile_step("compile_serving_model"):
+                Network_Model = NetworkModel(preprocessor=preprocessor, model=self.get_serving_model(best_model, X_test))
             save_object(self.model_trainer_config.trainer_model_file_path, obj=Network_Model)
 
-            # Saving our final model 
-            os.makedirs("final_models/", exist_ok=True)
-            save_object("final_models/model.pkl", best_model)
+            # The registry is the only place models are published: preprocessor and model go together as one
+            # version, with the drift reference of this run's training data, picked up by the serving app
+            model_registry = ModelRegistry(self.model_trainer_config.model_registry_dir,
+                                           keep_versions=self.model_trainer_config.model_registry_keep_versions)
+            drift_reference_file_path = self.model_trainer_config.drift_reference_file_path
+            version = model_registry.publish(Network_Model, metadata={
+                "model_class": type(best_model).__name__,
+                "train_f1_score": classification_train_report.f1_score,
+                "test_f1_score": classification_test_report.f1_score
+            }, files=[drift_reference_file_path] if os.path.exists(drift_reference_file_path) else [])
+            logging.info(f"Published model version {version}")
 
             # Model Trainer Artifacts 
             model_trainer_artifacts = ModelTrainerArtifacts(
                 trained_model_file_path=self.model_trainer_config.trainer_model_file_path,
                 train_metric_artifact= classification_train_report,
-                test_metric_artifact= classification_test_report
+                test_metric_artifact= classification_test_report,
+                model_version=version
                                   )
             logging.info(f"Model Trainer Artifacts: {model_trainer_artifacts}")
             return model_trainer_artifacts
@@ -135,21 +182,12 @@ class ModelTrainer:
     def initiate_model_trainer(self)->ModelTrainerArtifacts:
         try:
 
-            train_file_path = self.data_transformation_artifacts.transformed_train_file_path
-            test_file_path = self.data_transformation_artifacts.transformed_test_file_path
-
-            # loading training array and testing array 
-            train_arr = load_numpy_array_data(train_file_path)
-            test_arr = load_numpy_array_data(test_file_path)
+            # Memory mapped int8 features and labels, nothing is copied until a model needs it
+            X_train = load_numpy_array_data(self.data_transformation_artifacts.transformed_train_file_path, mmap_mode="r")
+            y_train = load_numpy_array_data(self.data_transformation_artifacts.transformed_train_label_file_path, mmap_mode="r")
+            X_test = load_numpy_array_data(self.data_transformation_artifacts.transformed_test_file_path, mmap_mode="r")
+            y_test = load_numpy_array_data(self.data_transformation_artifacts.transformed_test_label_file_path, mmap_mode="r")
 
-            # splitting dependent and independent features 
-            X_train, y_train, X_test, y_test = (
-                train_arr[:,:-1],
-                train_arr[:,-1],
-                test_arr[:,:-1],
-                test_arr[:,-1]
-                )
-            
             model_trainer_artifacts = self.train_model(X_train, y_train, X_test, y_test)
             return model_trainer_artifacts
 
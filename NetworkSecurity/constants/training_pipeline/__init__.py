@@ -1,21 +1,40 @@
 import os 
 import sys
-import numpy as np
-import pandas as pd 
 
 # Common constant variable 
 TARGET_COLUMN = "Result"
 PIPELINE_NAME: str = "NetworkSSecurity"
 ARTIFACT_DIR : str = "Artifacts" 
-FILE_NAME: str = "phisingData.csv"
+FILE_NAME: str = "phisingData.parquet"
 
-TRAIN_FILE_NAME:str = "train.csv"
-TEST_FILE_NAME:str = "test.csv"
+TRAIN_FILE_NAME:str = "train.parquet"
+TEST_FILE_NAME:str = "test.parquet"
 
 SCHEMA_FILE_PATH = os.path.join("data_schema", "schema.yaml") 
 
 SAVED_MODEL_DIR = os.path.join("saved_models")
 
+# Every run writes to Artifacts/<timestamp>, the timestamp names the run
+RUN_TIMESTAMP_FORMAT: str = "%m_%d_%Y_%H_%M_%S"
+# Artifacts of every completed stage, lets a later process (python main.py <stage>) continue the run
+STAGE_ARTIFACTS_DIR_NAME: str = "stage_artifacts"
+
+# Content addressed cache of stage artifacts, lets unchanged stages be skipped
+STAGE_CACHE_DIR: str = "stage_cache"
+STAGE_CACHE_ENABLED: bool = True
+
+# Content addressed store shared by all runs, run directories become hard links to its blobs
+ARTIFACT_STORE_DIR: str = "artifact_store"
+ARTIFACT_STORE_ENABLED: bool = True
+# Manifests kept per kind (runs, final_models: published model versions), blobs of older ones are garbage collected
+ARTIFACT_STORE_KEEP_RUNS: int = 20
+
+# Run profile (per stage timing, cpu, peak memory, rows) written to <artifact dir>/profile
+PROFILE_DIR_NAME: str = "profile"
+PROFILE_FILE_NAME: str = "run_profile.json"
+# Stage to run under cProfile, e.g. "model_training", None disables it
+PROFILE_CPROFILE_STAGE: str = None
+
 # Data ingestion related constant start with DATA_INGESTION VAR NAME 
 DATA_INGESTION_COLLECTION_NAME:str = "Network Data"
 DATA_INGESTION_DATABASE_NAME:str = "NAVEEN"
@@ -23,6 +42,14 @@ DATA_INGESTION_DIR_NAME:str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTIONTRAIN_TEST_SPLIT_RATIO: float = 0.2
+DATA_INGESTION_BATCH_SIZE: int = 10000
+# Incremental ingestion keeps a feature store across runs and only pulls documents after the watermark
+DATA_INGESTION_INCREMENTAL: bool = False
+DATA_INGESTION_PERSISTED_FEATURE_STORE_DIR: str = "feature_store"
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
+# ObjectIds are generated by the clients, a lower _id can be committed after a higher one was read.
+# Every run re-reads the documents generated up to this long before the watermark and skips those already ingested
+DATA_INGESTION_WATERMARK_LAG_SECONDS: int = 300
 
 # Data Validation related constant start with DATA_VALIDATION var name
 DATA_VALIDATION_DIR_NAME:str = "data_validation"
@@ -30,6 +57,12 @@ DATA_VALIDATION_VALID_DIR:str = "valid"
 DATA_VALIDATION_INVALID_DIR:str = "invalid"
 DATA_VALIDATION_DRIFT_REPORT_DIR:str = "drift_report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME: str = "schema_report.yaml"
+DATA_VALIDATION_ALLOW_NULLS: bool = True
+# Every feature (and the target) takes one of these values
+DATA_VALIDATION_FEATURE_DOMAIN: list = [-1, 0, 1]
+DATA_VALIDATION_DRIFT_THRESHOLD: float = 0.05
+DATA_VALIDATION_REFERENCE_HISTOGRAM_FILE_NAME: str = "reference_histograms.npz"
 
 PREPROCESSING_OBJECT_FILE_NAME:str = "preprocessing.pkl"
 
@@ -37,11 +70,20 @@ PREPROCESSING_OBJECT_FILE_NAME:str = "preprocessing.pkl"
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR :str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
-# KNN imputer to replace nan values
+DATA_TRANSFORMATION_LABEL_FILE_SUFFIX: str = "_label.npy"
+# Ternary features fit in int8, transformed arrays are stored compact and loaded memory mapped
+DATA_TRANSFORMATION_FEATURE_DTYPE: str = "int8"
+# Imputer to replace nan values, strategy is one of "mode", "knn" (bounded reference sample), "full_knn".
+# knn is the serving default, its cost does not grow with the training set. It is less accurate than the
+# O(n^2) full KNNImputer: on the bundled dataset (8.8k train rows, 5% of cells missing, rounded to codes,
+# python benchmark_imputer.py --round-to-codes) knn imputes 1k rows in 27ms with MAE 0.137, full_knn in 594ms
+# with MAE 0.093. Set "full_knn" to opt in to the exact imputer where its latency is acceptable.
+# round_to_codes rounds the imputed neighbour means to feature codes, for training and serving alike
 DATA_TRANSFORMATION_IMPUTER_PARAMS: dict = {
-    "missing_values" : np.nan ,
+    "strategy": "knn",
     "n_neighbors": 3,
-    "weights" : "uniform"
+    "reference_size": 2000,
+    "round_to_codes": True
     }
 
 # Model Trainer 
@@ -50,6 +92,83 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str ="trained_model"
 MODEL_FILE_NAME:str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD: float = 0.05
+# Hyperparameter search: -1 uses every core, None budget means no time limit
+MODEL_TRAINER_SEARCH_N_JOBS: int = -1
+MODEL_TRAINER_SEARCH_TIME_BUDGET_SECONDS: float = None
+MODEL_TRAINER_SEARCH_N_ITER: int = 10
+# Seed of the sampled candidates and of the halving row subsamples, so a search can be reproduced
+MODEL_TRAINER_SEARCH_RANDOM_STATE: int = 42
+# "random" scores every sampled candidate on all rows, "halving" drops losers on growing subsamples
+MODEL_TRAINER_SEARCH_MODE: str = "random"
+MODEL_TRAINER_HALVING_FACTOR: int = 3
+# Budgets grown by halving rounds: training rows, and the estimators of the ensembles
+MODEL_TRAINER_HALVING_RESOURCES: tuple = ("rows", "n_estimators")
+# Serve tree ensembles through the flattened NumPy kernel (checked to predict exactly like sklearn)
+MODEL_TRAINER_COMPILE_ENSEMBLE: bool = True
+# Batches of at least MIN_ROWS rows with more than DISTINCT_RATIO distinct rows are faster in sklearn's own
+# traversal (100k distinct rows, random forest: 1.1s sklearn, 3.3s kernel), the compiled model hands them to it
+MODEL_TRAINER_COMPILED_FALLBACK_MIN_ROWS: int = 10000
+MODEL_TRAINER_COMPILED_FALLBACK_DISTINCT_RATIO: float = 0.25
+
+# Experiment tracking: "mlflow" (on DagsHub), "local" (files under TRACKING_LOCAL_DIR) or "none"
+TRACKING_BACKEND: str = os.getenv("TRACKING_BACKEND", "mlflow")
+TRACKING_LOCAL_DIR: str = "experiment_tracking"
+TRACKING_DAGSHUB_REPO_OWNER: str = "naveenmails814"
+TRACKING_DAGSHUB_REPO_NAME: str = "Network_Security"
+# Longest wait at exit for queued runs to be shipped
+TRACKING_FLUSH_TIMEOUT_SECONDS: float = 60
 
 TRAINING_BUCKET_NAME = "networksecurity8"
+# Where artifacts and final models are synced: s3://bucket or file:///local/dir (local stand-in)
+ARTIFACT_STORE_URL: str = os.getenv("ARTIFACT_STORE_URL", f"s3://{TRAINING_BUCKET_NAME}")
+
+# Artifact sync (S3Sync), files above the threshold are transferred in concurrent parts
+SYNC_MAX_WORKERS: int = 8
+SYNC_MULTIPART_THRESHOLD_MB: int = 8
+SYNC_MULTIPART_CHUNKSIZE_MB: int = 8
+SYNC_MANIFEST_FILE_NAME: str = ".sync_manifest.json"
+
+# Versioned model registry, a version is one NetworkModel (preprocessor and model) published atomically.
+# It is the only place trained models are published, the app and batch prediction serve its current version
+MODEL_REGISTRY_DIR: str = "model_registry"
+# Drift reference histograms of the training data, published in every registry version
+FINAL_DRIFT_REFERENCE_FILE_NAME: str = "drift_reference.npz"
+MODEL_REGISTRY_KEEP_VERSIONS: int = 10
+
+# Batch prediction related constant start with PREDICTION var name
+PREDICTION_DIR_NAME: str = "prediction_output"
+PREDICTION_FILE_NAME: str = "predictions.csv"
+PREDICTION_COLUMN: str = "prediction"
+PREDICTION_CHUNK_SIZE: int = 50000
+# Parallel batch prediction: worker processes (-1 uses every core, 1 scores in this process)
+PREDICTION_N_JOBS: int = -1
+# Input file is split into n_workers * PREDICTION_SHARDS_PER_WORKER shards to balance the load
+PREDICTION_SHARDS_PER_WORKER: int = 4
+
+
+# Online prediction service related constant start with APP var name
+APP_HOST: str = "0.0.0.0"
+APP_PORT: int = 8080
+APP_MAX_BATCH_SIZE: int = 1000
+APP_WARMUP_ROUNDS: int = 5
+APP_LATENCY_BUCKETS_MS: list = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+# Micro-batching of concurrent single-row requests
+APP_COALESCE_MAX_WAIT_MS: float = 2
+APP_COALESCE_MAX_BATCH_SIZE: int = 64
+# Predictions of repeated feature vectors are served from an LRU cache, 0 disables it
+APP_SCORE_CACHE_SIZE: int = 100000
+# How often the service checks the model registry for a new current version to hot swap in
+APP_MODEL_WATCH_INTERVAL_SECONDS: float = 5
 
+# Drift monitor over live prediction traffic, sliding window of DRIFT_MONITOR_WINDOW_BUCKETS buckets
+DRIFT_MONITOR_DIR_NAME: str = "drift_monitor"
+DRIFT_MONITOR_SNAPSHOT_FILE_NAME: str = "snapshots.jsonl"
+DRIFT_MONITOR_BUCKET_SECONDS: int = 300
+DRIFT_MONITOR_WINDOW_BUCKETS: int = 12
+DRIFT_MONITOR_CHECK_INTERVAL_SECONDS: int = 300
+DRIFT_MONITOR_MIN_WINDOW_ROWS: int = 1000
+DRIFT_MONITOR_PSI_THRESHOLD: float = 0.1
+# Request handlers only queue their rows, a background task folds them into the window every flush interval.
+# At most MAX_PENDING_BATCHES requests are queued, the oldest are dropped if flushing falls behind
+DRIFT_MONITOR_FLUSH_INTERVAL_SECONDS: float = 1
+DRIFT_MONITOR_MAX_PENDING_BATCHES: int = 100000
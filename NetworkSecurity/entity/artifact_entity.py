@@ -14,12 +14,16 @@ class DataValidationArtifacts:
     invalid_train_file_path: Path 
     invalid_test_file_path: Path
     drift_report_file_path: Path 
+    schema_report_file_path: Path 
+    reference_histogram_file_path: Path 
 
 @dataclass 
 class DataTransformationArtifacts:
     transformed_object_file_path: Path 
     transformed_train_file_path: Path 
     transformed_test_file_path: Path 
+    transformed_train_label_file_path: Path 
+    transformed_test_label_file_path: Path 
 
 @dataclass
 class ClassificationMetricArtifact:
@@ -32,3 +36,14 @@ class ModelTrainerArtifacts:
     trained_model_file_path: Path 
     train_metric_artifact: ClassificationMetricArtifact
     test_metric_artifact: ClassificationMetricArtifact
+    model_version: str = None
+
+@dataclass
+class BatchPredictionArtifact:
+    prediction_file_path: Path
+    rows_scored: int
+    elapsed_seconds: float
+    rows_per_second: float
+    peak_rss_mb: float
+    n_workers: int
+    worker_stats: list
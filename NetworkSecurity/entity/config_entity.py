@@ -4,13 +4,23 @@ from NetworkSecurity.constants import training_pipeline
 
 class TrainingPipelineConfig():
     def __init__(self, timestamp= datetime.now()):
-        timestamp = timestamp.strftime("%m_%d_%Y_%H_%M_%S")
+        timestamp = timestamp.strftime(training_pipeline.RUN_TIMESTAMP_FORMAT)
         self.pipelinename = training_pipeline.PIPELINE_NAME
         self.artifact_name = training_pipeline.ARTIFACT_DIR 
         self.artifact_dir = os.path.join(self.artifact_name, timestamp)
         self.timestamp: str = timestamp
-        self.model_dir = os.path.join("final_models")
+        self.model_registry_dir: str = training_pipeline.MODEL_REGISTRY_DIR
         self.training_bucket_name = training_pipeline.TRAINING_BUCKET_NAME
+        self.artifact_store_url: str = training_pipeline.ARTIFACT_STORE_URL
+        self.stage_cache_dir: str = training_pipeline.STAGE_CACHE_DIR
+        self.stage_cache_enabled: bool = training_pipeline.STAGE_CACHE_ENABLED
+        self.artifact_store_dir: str = training_pipeline.ARTIFACT_STORE_DIR
+        self.artifact_store_enabled: bool = training_pipeline.ARTIFACT_STORE_ENABLED
+        self.artifact_store_keep_runs: int = training_pipeline.ARTIFACT_STORE_KEEP_RUNS
+        self.profile_file_path: str = os.path.join(self.artifact_dir, training_pipeline.PROFILE_DIR_NAME,
+                                                   training_pipeline.PROFILE_FILE_NAME)
+        self.cprofile_stage: str = training_pipeline.PROFILE_CPROFILE_STAGE
+        self.stage_artifacts_dir: str = os.path.join(self.artifact_dir, training_pipeline.STAGE_ARTIFACTS_DIR_NAME)
 
 class DataIngestionConfig:
     def __init__(self, training_pipeline_config:TrainingPipelineConfig):
@@ -33,6 +43,12 @@ class DataIngestionConfig:
         self.train_test_split_ratio: float = training_pipeline.DATA_INGESTIONTRAIN_TEST_SPLIT_RATIO
         self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
         self.database_name : str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.batch_size: int = training_pipeline.DATA_INGESTION_BATCH_SIZE
+        self.incremental: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.persisted_feature_store_dir: str = training_pipeline.DATA_INGESTION_PERSISTED_FEATURE_STORE_DIR
+        self.watermark_file_path: str = os.path.join(self.persisted_feature_store_dir,
+                                                     training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME)
+        self.watermark_lag_seconds: int = training_pipeline.DATA_INGESTION_WATERMARK_LAG_SECONDS
 
 class DataValidationConfig:
     def __init__(self, training_pipeline_config:TrainingPipelineConfig):
@@ -53,6 +69,11 @@ class DataValidationConfig:
         self.drift_report_file_path:str = os.path.join(self.data_validation_dir,
                                                        training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
                                                        training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
+        self.schema_report_file_path:str = os.path.join(self.data_validation_dir,
+                                                        training_pipeline.DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME)
+        self.allow_nulls:bool = training_pipeline.DATA_VALIDATION_ALLOW_NULLS
+        self.reference_histogram_file_path:str = os.path.join(self.data_validation_dir,
+                                                              training_pipeline.DATA_VALIDATION_REFERENCE_HISTOGRAM_FILE_NAME)
         
 class DataTransformationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -60,10 +81,19 @@ class DataTransformationConfig:
                                                          training_pipeline.DATA_TRANSFORMATION_DIR_NAME)
         self.transformed_train_file_path:str = os.path.join(self.data_transformation_dir,
                                                             training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                            training_pipeline.TRAIN_FILE_NAME.replace("csv", "npy" ))
+                                                            training_pipeline.TRAIN_FILE_NAME.replace("parquet", "npy" ))
         self.transformed_test_file_path:str = os.path.join(self.data_transformation_dir,
                                                            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                           training_pipeline.TEST_FILE_NAME.replace("csv", "npy" ))
+                                                           training_pipeline.TEST_FILE_NAME.replace("parquet", "npy" ))
+        self.transformed_train_label_file_path:str = os.path.join(self.data_transformation_dir,
+                                                                  training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                                  training_pipeline.TRAIN_FILE_NAME.replace(
+                                                                      ".parquet", training_pipeline.DATA_TRANSFORMATION_LABEL_FILE_SUFFIX))
+        self.transformed_test_label_file_path:str = os.path.join(self.data_transformation_dir,
+                                                                 training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                                 training_pipeline.TEST_FILE_NAME.replace(
+                                                                     ".parquet", training_pipeline.DATA_TRANSFORMATION_LABEL_FILE_SUFFIX))
+        self.feature_dtype:str = training_pipeline.DATA_TRANSFORMATION_FEATURE_DTYPE
         self.transformed_object_file_path:str = os.path.join(self.data_transformation_dir,
                                                              training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
                                                              training_pipeline.PREPROCESSING_OBJECT_FILE_NAME)
@@ -76,4 +106,48 @@ class ModelTrainerConfig:
                                                         training_pipeline.MODEL_TRAINER_TRAINED_MODEL_DIR,
                                                         training_pipeline.MODEL_FILE_NAME)
         self.expected_accuracy:float = training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
-        self.overfitting_underfitting_threshold = training_pipeline.MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD
\ No newline at end of file
+        self.overfitting_underfitting_threshold = training_pipeline.MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD
+        self.search_n_jobs:int = training_pipeline.MODEL_TRAINER_SEARCH_N_JOBS
+        self.search_time_budget_seconds:float = training_pipeline.MODEL_TRAINER_SEARCH_TIME_BUDGET_SECONDS
+        self.search_n_iter:int = training_pipeline.MODEL_TRAINER_SEARCH_N_ITER
+        self.search_random_state:int = training_pipeline.MODEL_TRAINER_SEARCH_RANDOM_STATE
+        self.search_mode:str = training_pipeline.MODEL_TRAINER_SEARCH_MODE
+        self.halving_factor:int = training_pipeline.MODEL_TRAINER_HALVING_FACTOR
+        self.halving_resources:tuple = training_pipeline.MODEL_TRAINER_HALVING_RESOURCES
+        self.compile_ensemble:bool = training_pipeline.MODEL_TRAINER_COMPILE_ENSEMBLE
+        self.compiled_fallback_min_rows:int = training_pipeline.MODEL_TRAINER_COMPILED_FALLBACK_MIN_ROWS
+        self.compiled_fallback_distinct_ratio:float = training_pipeline.MODEL_TRAINER_COMPILED_FALLBACK_DISTINCT_RATIO
+        self.model_registry_dir:str = training_pipeline.MODEL_REGISTRY_DIR
+        self.model_registry_keep_versions:int = training_pipeline.MODEL_REGISTRY_KEEP_VERSIONS
+        # Reference histograms of the run's training data, the training pipeline points this to
+        # the data validation artifacts (a cached stage keeps them in the stage cache)
+        self.drift_reference_file_path:str = DataValidationConfig(training_pipeline_config).reference_histogram_file_path
+
+class BatchPredictionConfig:
+    def __init__(self, timestamp= datetime.now()):
+        timestamp = timestamp.strftime(training_pipeline.RUN_TIMESTAMP_FORMAT)
+        self.prediction_dir:str = os.path.join(training_pipeline.PREDICTION_DIR_NAME, timestamp)
+        self.prediction_file_path:str = os.path.join(self.prediction_dir,
+                                                     training_pipeline.PREDICTION_FILE_NAME)
+        self.model_registry_dir:str = training_pipeline.MODEL_REGISTRY_DIR
+        self.prediction_column:str = training_pipeline.PREDICTION_COLUMN
+        self.chunk_size:int = training_pipeline.PREDICTION_CHUNK_SIZE
+        self.n_jobs:int = training_pipeline.PREDICTION_N_JOBS
+        self.shards_per_worker:int = training_pipeline.PREDICTION_SHARDS_PER_WORKER
+
+
+class DriftMonitorConfig:
+    def __init__(self):
+        # Drift reference published with the served registry version, set by the app
+        self.reference_file_path:str = None
+        self.snapshot_file_path:str = os.path.join(training_pipeline.DRIFT_MONITOR_DIR_NAME,
+                                                   training_pipeline.DRIFT_MONITOR_SNAPSHOT_FILE_NAME)
+        self.bucket_seconds:int = training_pipeline.DRIFT_MONITOR_BUCKET_SECONDS
+        self.window_buckets:int = training_pipeline.DRIFT_MONITOR_WINDOW_BUCKETS
+        self.check_interval_seconds:int = training_pipeline.DRIFT_MONITOR_CHECK_INTERVAL_SECONDS
+        self.flush_interval_seconds:float = training_pipeline.DRIFT_MONITOR_FLUSH_INTERVAL_SECONDS
+        self.max_pending_batches:int = training_pipeline.DRIFT_MONITOR_MAX_PENDING_BATCHES
+        self.min_window_rows:int = training_pipeline.DRIFT_MONITOR_MIN_WINDOW_ROWS
+        self.threshold:float = training_pipeline.DATA_VALIDATION_DRIFT_THRESHOLD
+        self.psi_threshold:float = training_pipeline.DRIFT_MONITOR_PSI_THRESHOLD
+        self.feature_domain:list = training_pipeline.DATA_VALIDATION_FEATURE_DOMAIN
@@ -5,12 +5,22 @@ from datetime import datetime
 LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 logs_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
 
-os.makedirs(logs_path, exist_ok=True)
-
 LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
+class LazyFileHandler(logging.FileHandler):
+    """
+    File handler that creates the log directory and opens the file on the first record,
+    so importing the package (e.g. a CLI --help or a short prediction job) touches no files.
+    """
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 logging.basicConfig(
-    filename=LOG_FILE_PATH, 
+    handlers=[LazyFileHandler(LOG_FILE_PATH)], 
     format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
     level = logging.INFO,
-)
\ No newline at end of file
+)
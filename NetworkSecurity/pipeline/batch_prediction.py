@@ -0,0 +1,345 @@
+import io
+import os 
+import sys 
+import time 
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd 
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+
+from NetworkSecurity.constants.training_pipeline import TARGET_COLUMN, SCHEMA_FILE_PATH
+from NetworkSecurity.entity.config_entity import BatchPredictionConfig
+from NetworkSecurity.entity.artifact_entity import BatchPredictionArtifact
+from NetworkSecurity.utils.common.functions import (get_peak_rss_mb, get_n_workers, read_yaml_file,
+                                                    get_schema_dtypes, get_arrow_schema)
+from NetworkSecurity.utils.ml_utils.model.estimator import NetworkModel, load_final_network_model
+
+# Every prediction worker loads the model once, in the pool initializer
+_worker_state = {}
+
+def _init_prediction_worker(batch_prediction_config: BatchPredictionConfig):
+    batch_prediction = BatchPrediction(batch_prediction_config)
+    batch_prediction.load_network_model()
+    _worker_state["batch_prediction"] = batch_prediction
+
+def _score_shard(input_file_path, shard_index: int, shard, part_file_path: str)->dict:
+    start_time = time.perf_counter()
+    rows_scored = _worker_state["batch_prediction"].score_shard(input_file_path, shard, part_file_path,
+                                                                write_header= shard_index == 0)
+    return {"shard": shard_index, "worker": os.getpid(), "rows": rows_scored,
+            "seconds": time.perf_counter() - start_time}
+
+class _ByteRange(io.RawIOBase):
+    """
+    Read only view of the bytes [start, end) of a file
+    """
+    def __init__(self, file_path, start: int, end: int):
+        self.file_obj = open(file_path, "rb")
+        self.file_obj.seek(start)
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n_bytes = self.file_obj.readinto(memoryview(buffer)[:min(len(buffer), self.remaining)])
+        self.remaining -= n_bytes
+        return n_bytes
+
+    def close(self):
+        self.file_obj.close()
+        super().close()
+
+class BatchPrediction:
+    def __init__(self, batch_prediction_config: BatchPredictionConfig):
+        try:
+            self.batch_prediction_config = batch_prediction_config
+            self.network_model = None
+            self.schema_dtypes = get_schema_dtypes(read_yaml_file(SCHEMA_FILE_PATH))
+            self.output_schema = None
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def load_network_model(self)->NetworkModel:
+        """
+        Loads the final preprocessor and model once and keeps them for every chunk.
+        """
+        try:
+            if self.network_model is None:
+                self.network_model = load_final_network_model(self.batch_prediction_config.model_registry_dir)
+                logging.info("Loaded final preprocessor and model for batch prediction")
+            return self.network_model
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def read_in_chunks(self, file_path, shard=None):
+        """
+        Yields the input file as dataframes of at most chunk_size rows,
+        so memory stays bounded whatever the file size.
+        Args:
+            file_path: csv or parquet file to score
+            shard: part of the file to read (from get_shards), None reads the whole file
+        """
+        try:
+            chunk_size = self.batch_prediction_config.chunk_size
+            if str(file_path).endswith(".parquet"):
+                import pyarrow.parquet as pq
+                parquet_file = pq.ParquetFile(file_path)
+                if shard is None:
+                    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+                        yield batch.to_pandas()
+                    return
+                _, start, end = shard
+                row_group_start = 0
+                for row_group in range(parquet_file.metadata.num_row_groups):
+                    row_group_end = row_group_start + parquet_file.metadata.row_group(row_group).num_rows
+                    if row_group_start < end and start < row_group_end:
+                        # Rows of the row group before the shard are decoded and skipped
+                        batch_start = row_group_start
+                        for batch in parquet_file.iter_batches(batch_size=chunk_size, row_groups=[row_group]):
+                            batch_end = batch_start + len(batch)
+                            if batch_start >= end:
+                                break
+                            if batch_end > start:
+                                offset = max(start - batch_start, 0)
+                                yield batch.slice(offset, min(end, batch_end) - batch_start - offset).to_pandas()
+                            batch_start = batch_end
+                    row_group_start = row_group_end
+            elif shard is not None:
+                _, start, end, columns = shard
+                with io.BufferedReader(_ByteRange(file_path, start, end)) as byte_range:
+                    for chunk in pd.read_csv(byte_range, chunksize=chunk_size, header=None, names=columns,
+                                             dtype=self.get_csv_dtypes(columns)):
+                        yield chunk
+            else:
+                columns = pd.read_csv(file_path, nrows=0).columns.tolist()
+                for chunk in pd.read_csv(file_path, chunksize=chunk_size, dtype=self.get_csv_dtypes(columns)):
+                    yield chunk
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_shards(self, file_path, n_shards: int)->list:
+        """
+        Splits the input file into at most n_shards contiguous shards, in file order:
+        parquet files by row ranges, cut at row group ends when there are enough row groups
+        (a file written with the default row group size may have a single one), csv files by
+        byte ranges cut at line ends (quoted fields must not contain line breaks).
+        """
+        try:
+            if str(file_path).endswith(".parquet"):
+                import pyarrow.parquet as pq
+                metadata = pq.ParquetFile(file_path).metadata
+                row_group_ends = np.cumsum([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])
+                n_rows = int(row_group_ends[-1]) if len(row_group_ends) else 0
+                if len(row_group_ends) >= n_shards:
+                    boundaries = [0] + [int(row_groups[-1]) for row_groups in
+                                        np.array_split(row_group_ends, n_shards) if len(row_groups)]
+                else:
+                    boundaries = [n_rows * i // n_shards for i in range(n_shards + 1)]
+                boundaries = sorted(set(boundaries))
+                return [("parquet", start, end) for start, end in zip(boundaries[:-1], boundaries[1:])]
+
+            columns = pd.read_csv(file_path, nrows=0).columns.tolist()
+            file_size = os.path.getsize(file_path)
+            with open(file_path, "rb") as file_obj:
+                file_obj.readline()
+                boundaries = [file_obj.tell()]
+                for i in range(1, n_shards):
+                    file_obj.seek(boundaries[0] + (file_size - boundaries[0]) * i // n_shards)
+                    # Move on to the start of the next line
+                    file_obj.readline()
+                    boundaries.append(min(file_obj.tell(), file_size))
+            boundaries.append(file_size)
+            boundaries = sorted(set(boundaries))
+            return [("csv", start, end, columns) for start, end in zip(boundaries[:-1], boundaries[1:])]
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_csv_dtypes(self, columns: list)->dict:
+        """
+        Explicit read dtypes of csv columns, the same for every chunk and shard: schema columns
+        as float32 (missing values are nan), other columns as text, passed through unchanged
+        """
+        return {column: np.float32 if column in self.schema_dtypes else str for column in columns}
+
+    def get_output_schema(self, input_file_path):
+        """
+        Arrow schema of the prediction file: the input columns (typed as in the parquet input file,
+        as in the schema for csv, other csv columns as text) and the prediction column. Every chunk
+        and shard is cast to it, whatever dtypes pandas gave the chunk (e.g. float for a chunk with
+        a missing value).
+        """
+        try:
+            import pyarrow as pa
+            if str(input_file_path).endswith(".parquet"):
+                import pyarrow.parquet as pq
+                schema = pq.read_schema(input_file_path).remove_metadata()
+            else:
+                columns = pd.read_csv(input_file_path, nrows=0).columns.tolist()
+                schema_fields = get_arrow_schema({column: self.schema_dtypes[column] for column in columns
+                                                  if column in self.schema_dtypes})
+                schema = pa.schema([schema_fields.field(column) if column in self.schema_dtypes
+                                    else pa.field(column, pa.string()) for column in columns])
+            prediction_column = self.batch_prediction_config.prediction_column
+            if prediction_column in schema.names:
+                schema = schema.remove(schema.get_field_index(prediction_column))
+            return schema.append(
+                pa.field(prediction_column, pa.from_numpy_dtype(np.dtype(self.schema_dtypes[TARGET_COLUMN]))))
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def write_chunk(self, dataframe: pd.DataFrame, file_path: str, is_first_chunk: bool,
+                    write_header: bool = True):
+        """
+        Appends a scored chunk, cast to the output schema, to a prediction file (csv or parquet).
+        """
+        try:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(dataframe, schema=self.output_schema, preserve_index=False)
+            if file_path.endswith(".parquet"):
+                import pyarrow.parquet as pq
+                if is_first_chunk:
+                    self.parquet_writer = pq.ParquetWriter(file_path, self.output_schema)
+                self.parquet_writer.write_table(table)
+            else:
+                # Integer columns stay nullable integers, printed as 1 (a missing value as empty), never as 1.0
+                table.to_pandas(types_mapper=lambda arrow_type: pd.ArrowDtype(arrow_type)
+                                if pa.types.is_integer(arrow_type) else None).to_csv(
+                    file_path, mode="w" if is_first_chunk else "a", index=False, header=is_first_chunk and write_header)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def score_shard(self, input_file_path, shard, output_file_path: str, write_header: bool = True)->int:
+        """
+        Scores a shard of the input file (the whole file if shard is None) chunk by chunk
+        into output_file_path.
+        Returns:
+            number of rows scored
+        """
+        try:
+            network_model = self.load_network_model()
+            self.output_schema = self.get_output_schema(input_file_path)
+            self.parquet_writer = None
+            rows_scored = 0
+            try:
+                for chunk in self.read_in_chunks(input_file_path, shard):
+                    features = chunk.drop(columns=[TARGET_COLUMN], errors="ignore")
+                    chunk[self.batch_prediction_config.prediction_column] = network_model.predict(features)
+                    self.write_chunk(chunk, output_file_path, is_first_chunk= rows_scored == 0,
+                                     write_header=write_header)
+                    rows_scored += len(chunk)
+                    logging.info(f"Scored {rows_scored} rows, peak RSS {get_peak_rss_mb():.1f} MB")
+            finally:
+                if self.parquet_writer is not None:
+                    self.parquet_writer.close()
+                    self.parquet_writer = None
+            return rows_scored
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def merge_part(self, part_file_path: str, is_first_part: bool)->None:
+        """
+        Appends a scored shard to the prediction file and removes it.
+        """
+        try:
+            prediction_file_path = self.batch_prediction_config.prediction_file_path
+            if prediction_file_path.endswith(".parquet"):
+                import pyarrow.parquet as pq
+                part_file = pq.ParquetFile(part_file_path)
+                if is_first_part:
+                    self.parquet_writer = pq.ParquetWriter(prediction_file_path, self.output_schema)
+                for i in range(part_file.metadata.num_row_groups):
+                    self.parquet_writer.write_table(part_file.read_row_group(i).cast(self.output_schema))
+            else:
+                with open(part_file_path, "rb") as part_obj, \
+                        open(prediction_file_path, "wb" if is_first_part else "ab") as file_obj:
+                    shutil.copyfileobj(part_obj, file_obj)
+            os.remove(part_file_path)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def score_in_parallel(self, input_file_path, n_workers: int)->list:
+        """
+        Scores the shards of the input file on a process pool and merges the scored
+        shards into the prediction file in input order, each as soon as it and all the
+        shards before it are done.
+        Returns:
+            result dict of every shard (worker pid, rows, seconds)
+        """
+        try:
+            config = self.batch_prediction_config
+            self.output_schema = self.get_output_schema(input_file_path)
+            shards = self.get_shards(input_file_path, n_workers * config.shards_per_worker)
+            parts_dir = os.path.join(config.prediction_dir, "parts")
+            os.makedirs(parts_dir, exist_ok=True)
+            extension = os.path.splitext(config.prediction_file_path)[1]
+            part_file_paths = [os.path.join(parts_dir, f"part_{i:05d}{extension}") for i in range(len(shards))]
+            logging.info(f"Scoring {len(shards)} shards of {input_file_path} on {n_workers} workers")
+
+            self.parquet_writer = None
+            results = []
+            try:
+                with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_prediction_worker,
+                                         initargs=(config,)) as executor:
+                    futures = [executor.submit(_score_shard, input_file_path, i, shard, part_file_path)
+                               for i, (shard, part_file_path) in enumerate(zip(shards, part_file_paths))]
+                    for future, part_file_path in zip(futures, part_file_paths):
+                        result = future.result()
+                        # A shard without rows writes no part file
+                        if os.path.exists(part_file_path):
+                            self.merge_part(part_file_path, is_first_part= not any(r["rows"] for r in results))
+                        results.append(result)
+                        logging.info(f"Merged shard {result['shard']}: {result['rows']} rows")
+            finally:
+                if self.parquet_writer is not None:
+                    self.parquet_writer.close()
+                shutil.rmtree(parts_dir, ignore_errors=True)
+            return results
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def initiate_batch_prediction(self, input_file_path)->BatchPredictionArtifact:
+        logging.info("Entered initiate_batch_prediction method of BatchPrediction class")
+        try:
+            prediction_file_path = self.batch_prediction_config.prediction_file_path
+            os.makedirs(os.path.dirname(prediction_file_path), exist_ok=True)
+            n_workers = get_n_workers(self.batch_prediction_config.n_jobs)
+
+            start_time = time.perf_counter()
+            if n_workers == 1:
+                rows_scored = self.score_shard(input_file_path, None, prediction_file_path)
+                results = [{"shard": 0, "worker": os.getpid(), "rows": rows_scored,
+                            "seconds": time.perf_counter() - start_time}]
+            else:
+                results = self.score_in_parallel(input_file_path, n_workers)
+                rows_scored = sum(result["rows"] for result in results)
+            elapsed_seconds = time.perf_counter() - start_time
+
+            worker_stats = []
+            for worker in sorted(set(result["worker"] for result in results)):
+                worker_results = [result for result in results if result["worker"] == worker]
+                rows = sum(result["rows"] for result in worker_results)
+                busy_seconds = sum(result["seconds"] for result in worker_results)
+                worker_stats.append({"worker": worker, "shards": len(worker_results), "rows": rows,
+                                     "busy_seconds": round(busy_seconds, 3),
+                                     "rows_per_second": rows / busy_seconds if busy_seconds > 0 else 0.0})
+                logging.info(f"Worker {worker}: {rows} rows in {len(worker_results)} shards, "
+                             f"{worker_stats[-1]['rows_per_second']:.0f} rows/s")
+
+            batch_prediction_artifact = BatchPredictionArtifact(
+                prediction_file_path=prediction_file_path,
+                rows_scored=rows_scored,
+                elapsed_seconds=elapsed_seconds,
+                rows_per_second=rows_scored / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+                peak_rss_mb=get_peak_rss_mb(),
+                n_workers=len(worker_stats),
+                worker_stats=worker_stats
+            )
+            logging.info(f"Batch Prediction Artifacts: {batch_prediction_artifact}")
+            return batch_prediction_artifact
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -1,14 +1,11 @@
 import os 
 import sys 
+import inspect 
+from datetime import datetime
 
 from NetworkSecurity.logging.logger import logging
 from NetworkSecurity.exception.exception import NetworkSecurityException
 
-from NetworkSecurity.components.data_ingestion import DataIngestion
-from NetworkSecurity.components.data_validation import DataValidation 
-from NetworkSecurity.components.data_transformation import DataTransformation 
-from NetworkSecurity.components.model_trainer import ModelTrainer 
-
 from NetworkSecurity.entity.config_entity import (TrainingPipelineConfig,
                                                   DataIngestionConfig, DataValidationConfig,
                                                   DataTransformationConfig, ModelTrainerConfig )
@@ -17,76 +14,241 @@ from NetworkSecurity.entity.artifact_entity import (DataIngestionArtifact, DataV
                                                      DataTransformationArtifacts, ModelTrainerArtifacts)
 
 from NetworkSecurity.cloud.s3_syncer import S3Sync
+from NetworkSecurity.constants import training_pipeline
+from NetworkSecurity.utils.common.stage_cache import StageCache, get_code_files
+from NetworkSecurity.utils.common.artifact_store import ArtifactStore
+from NetworkSecurity.utils.common.profiler import RunProfiler, profile_stage, profile_step
+from NetworkSecurity.utils.common.functions import save_object, load_object
+from NetworkSecurity.utils.ml_utils.model.registry import ModelRegistry
 
 class TrainingPipeline:
-    def __init__(self):
-        self.training_pipeline_config = TrainingPipelineConfig()
+    """
+    Components are imported by the stage that runs them, so a process running one stage
+    (see main.py) does not pay for importing the others.
+    Every stage saves its artifacts in the run directory, a later process can continue the
+    run from them by passing its run_timestamp.
+    """
+    def __init__(self, run_timestamp: str = None):
+        if run_timestamp is None:
+            self.training_pipeline_config = TrainingPipelineConfig()
+        else:
+            self.training_pipeline_config = TrainingPipelineConfig(
+                timestamp=datetime.strptime(run_timestamp, training_pipeline.RUN_TIMESTAMP_FORMAT))
         self.s3sync = S3Sync()
+        self.stage_cache = StageCache(cache_dir=self.training_pipeline_config.stage_cache_dir,
+                                      artifact_dir=self.training_pipeline_config.artifact_dir)
+        self.artifact_store = ArtifactStore(store_dir=self.training_pipeline_config.artifact_store_dir)
+        self.profiler = RunProfiler(profile_file_path=self.training_pipeline_config.profile_file_path,
+                                    cprofile_stage=self.training_pipeline_config.cprofile_stage)
+
+    @staticmethod
+    def get_latest_run_timestamp(stage_name: str):
+        """
+        Returns:
+            timestamp of the newest run that completed stage_name, None if there is none
+        """
+        try:
+            runs = {}
+            if os.path.isdir(training_pipeline.ARTIFACT_DIR):
+                for run_timestamp in os.listdir(training_pipeline.ARTIFACT_DIR):
+                    try:
+                        run_time = datetime.strptime(run_timestamp, training_pipeline.RUN_TIMESTAMP_FORMAT)
+                    except ValueError:
+                        # Not a run directory
+                        continue
+                    if os.path.exists(os.path.join(training_pipeline.ARTIFACT_DIR, run_timestamp,
+                                                   training_pipeline.STAGE_ARTIFACTS_DIR_NAME, f"{stage_name}.pkl")):
+                        runs[run_timestamp] = run_time
+            # Timestamps are month first, they are compared as dates rather than strings
+            return max(runs, key=runs.get, default=None)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def save_stage_artifacts(self, stage_name: str, artifacts)->None:
+        save_object(os.path.join(self.training_pipeline_config.stage_artifacts_dir, f"{stage_name}.pkl"), artifacts)
 
+    def load_stage_artifacts(self, stage_name: str):
+        """
+        Artifacts an earlier process saved for stage_name in this run
+        """
+        try:
+            artifacts_file_path = os.path.join(self.training_pipeline_config.stage_artifacts_dir, f"{stage_name}.pkl")
+            if not os.path.exists(artifacts_file_path):
+                raise FileNotFoundError(f"Run {self.training_pipeline_config.timestamp} has not completed {stage_name}")
+            return load_object(artifacts_file_path)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def run_cached_stage(self, stage_name, config, component_class, run_stage, input_paths=(), get_extra=None):
+        """
+        Runs a stage unless an identical run (same inputs, config and code) is in the stage cache.
+        The code is the component module and every NetworkSecurity module it imports.
+        Args:
+            get_extra: returns more values for the cache key, only called when the cache is enabled
+        """
+        if not self.training_pipeline_config.stage_cache_enabled:
+            return run_stage()
+        code_files = get_code_files(inspect.getfile(component_class)) + [training_pipeline.SCHEMA_FILE_PATH]
+        cache_key = self.stage_cache.get_key(stage_name, config, code_files=code_files,
+                                             input_paths=input_paths, extra=get_extra() if get_extra else None)
+        with profile_step("stage_cache_lookup") as step:
+            artifacts = self.stage_cache.load(cache_key)
+            step["hit"] = artifacts is not None
+        if artifacts is None:
+            artifacts = self.stage_cache.save(cache_key, run_stage())
+        return artifacts
+
+    @profile_stage("data_ingestion")
     def start_data_ingestion(self):
         try:
+            from NetworkSecurity.components.data_ingestion import DataIngestion
             self.data_ingestion_config = DataIngestionConfig(training_pipeline_config=self.training_pipeline_config) 
             logging.info("Initializing Data Ingestion")
             data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
-            data_ingestion_artifacts = data_ingestion.initiate_data_ingestion()
+            data_ingestion_artifacts = self.run_cached_stage("data_ingestion", self.data_ingestion_config, DataIngestion,
+                                                             data_ingestion.initiate_data_ingestion,
+                                                             get_extra=data_ingestion.get_collection_fingerprint)
             logging.info(f"Data Ingestion Completed...\nData Ingestion Artifacts:\n{data_ingestion_artifacts}")
+            self.save_stage_artifacts("data_ingestion", data_ingestion_artifacts)
             return data_ingestion_artifacts
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
+    @profile_stage("data_validation")
     def start_data_validation(self, data_ingestion_atifacts: DataIngestionArtifact):
         try:
+            from NetworkSecurity.components.data_validation import DataValidation
             self.data_validation_config = DataValidationConfig(training_pipeline_config=self.training_pipeline_config)
             logging.info("Initializing Data Validation")
             data_validation = DataValidation(data_ingestion_artifacts=data_ingestion_atifacts,
                                              data_validation_config=self.data_validation_config)
-            data_validation_artifacts = data_validation.initiate_data_validation()
+            data_validation_artifacts = self.run_cached_stage("data_validation", self.data_validation_config, DataValidation,
+                                                              data_validation.initiate_data_validation,
+                                                              input_paths=[data_ingestion_atifacts.trained_file_path,
+                                                                           data_ingestion_atifacts.test_file_path])
             logging.info(f"Data Validation Completed...\nData Validation Artifacts:\n{data_validation_artifacts}")
+            self.save_stage_artifacts("data_validation", data_validation_artifacts)
             return data_validation_artifacts
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
+    @profile_stage("data_transformation")
     def start_data_transformation(self, data_validation_artifacts: DataValidationArtifacts):
         try:
+            from NetworkSecurity.components.data_transformation import DataTransformation
             self.data_transformation_config = DataTransformationConfig(training_pipeline_config=self.training_pipeline_config)
             logging.info("Initializing Data Transformation")
             data_transformation = DataTransformation(data_validation_artifacts=data_validation_artifacts, 
                                                         data_transformation_config= self.data_transformation_config)
-            data_transformation_artifacts = data_transformation.initiate_data_transformation()
+            data_transformation_artifacts = self.run_cached_stage("data_transformation", self.data_transformation_config,
+                                                                  DataTransformation,
+                                                                  data_transformation.initiate_data_transformation,
+                                                                  input_paths=[data_validation_artifacts.valid_train_file_path,
+                                                                               data_validation_artifacts.valid_test_file_path])
             logging.info(f"Data Transformation Completed...\nData Transformation Artifacts:\n{data_transformation_artifacts}")
+            self.save_stage_artifacts("data_transformation", data_transformation_artifacts)
             return data_transformation_artifacts
         except Exception as e:
             raise NetworkSecurityException(e, sys)
 
+    @profile_stage("model_training")
     def start_model_training(self, data_transformation_artifacts:DataTransformationArtifacts):
         try: 
+            from NetworkSecurity.components.model_trainer import ModelTrainer
             self.model_trainer_config = ModelTrainerConfig(training_pipeline_config=self.training_pipeline_config)
+            # Reference histograms for the live drift monitor, published with the model version,
+            # a cached data validation stage keeps them in the stage cache
+            self.model_trainer_config.drift_reference_file_path = \
+                self.load_stage_artifacts("data_validation").reference_histogram_file_path
             logging.info("Initializing Model Training")
             model_trainer = ModelTrainer(model_trainer_config=self.model_trainer_config, 
                                         data_transformation_artifacts=data_transformation_artifacts)
             model_trainer_artifacts = model_trainer.initiate_model_trainer()
+            self.model_trainer_artifacts = model_trainer_artifacts
             logging.info(f"Model Training Completed...\nModel Trainer Artifacts:\n{model_trainer_artifacts}")
+            self.save_stage_artifacts("model_training", model_trainer_artifacts)
             return model_trainer_artifacts
         except Exception as e:
             raise NetworkSecurityException(e, sys)
 
+    def get_published_model_dir(self)->str:
+        """
+        Returns:
+            directory of the model registry version this run published
+        """
+        model_version = getattr(getattr(self, "model_trainer_artifacts", None), "model_version", None)
+        if model_version is None:
+            raise ValueError(f"Run {self.training_pipeline_config.timestamp} has not published a model version")
+        return ModelRegistry(self.training_pipeline_config.model_registry_dir).version_dir(model_version)
+
+    @profile_stage("commit_artifacts")
+    def commit_artifacts(self):
+        """
+        Stores the run directory and the published model version in the artifact store, each file
+        content once across runs, and garbage collects the blobs of manifests past the retention.
+        """
+        try:
+            timestamp = self.training_pipeline_config.timestamp
+            keep_runs = self.training_pipeline_config.artifact_store_keep_runs
+            # Files are replaced by hard links to the read-only blobs, every writer replaces files (replace_file)
+            # rather than rewriting them, so a stage rerun into this run leaves the blobs as they are
+            self.artifact_store.commit(f"runs/{timestamp}", self.training_pipeline_config.artifact_dir, link=True)
+            self.artifact_store.commit(f"final_models/{timestamp}", self.get_published_model_dir(), link=True)
+            for prefix in ("runs", "final_models"):
+                self.artifact_store.prune(prefix, keep_last=keep_runs)
+            self.artifact_store.gc()
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def sync_artifact_store_to_s3(self, manifest_name: str)->dict:
+        """
+        Pushes a manifest and its blobs to the remote artifact store, blobs pushed by earlier runs are skipped
+        """
+        files, file_paths = self.artifact_store.get_sync_files([manifest_name])
+        aws_bucket_url = f"{self.training_pipeline_config.artifact_store_url}/{training_pipeline.ARTIFACT_STORE_DIR}"
+        return self.s3sync.sync_files_to_s3(files, file_paths, aws_bucket_url)
+
     # Local artifacts is pushing to AWS s3
+    @profile_stage("sync_artifacts_to_s3")
     def sync_artifacts_dir_to_s3(self):
         try:
             logging.info("Initialize artifacts pusher AWS S3 bucket")
-            aws_bucket_url = f"s3://{self.training_pipeline_config.training_bucket_name}/artifacts/{self.training_pipeline_config.timestamp}"
-            self.s3sync.sync_folder_to_s3(folder = self.training_pipeline_config.artifact_dir, aws_bucket_url=aws_bucket_url)
-            logging.info(f"Model artifacts is pushed to {self.training_pipeline_config.training_bucket_name} bucket sucessfully")
+            if self.training_pipeline_config.artifact_store_enabled:
+                sync_report = self.sync_artifact_store_to_s3(f"runs/{self.training_pipeline_config.timestamp}")
+                logging.info(f"Model artifacts is pushed to the artifact store sucessfully: {sync_report}")
+                return
+            aws_bucket_url = f"{self.training_pipeline_config.artifact_store_url}/artifacts/{self.training_pipeline_config.timestamp}"
+            sync_report = self.s3sync.sync_folder_to_s3(folder = self.training_pipeline_config.artifact_dir, aws_bucket_url=aws_bucket_url)
+            logging.info(f"Model artifacts is pushed to {aws_bucket_url} sucessfully: {sync_report}")
         except Exception as e:
             raise NetworkSecurityException(e, sys)
         
     # Local saved model is pushing to AWS s3
+    @profile_stage("sync_saved_model_to_s3")
     def sync_saved_model_dir_to_s3(self):
         try:
             logging.info("Initialize trained model pusher AWS S3 bucket")
-            aws_bucket_url = f"s3://{self.training_pipeline_config.training_bucket_name}/final_model/{self.training_pipeline_config.timestamp}"
-            self.s3sync.sync_folder_to_s3(folder = self.training_pipeline_config.model_dir, aws_bucket_url=aws_bucket_url)
-            logging.info(f"Trained model is pushed to {self.training_pipeline_config.training_bucket_name} bucket sucessfully")
+            if self.training_pipeline_config.artifact_store_enabled:
+                sync_report = self.sync_artifact_store_to_s3(f"final_models/{self.training_pipeline_config.timestamp}")
+                logging.info(f"Trained model is pushed to the artifact store sucessfully: {sync_report}")
+                return
+            aws_bucket_url = f"{self.training_pipeline_config.artifact_store_url}/final_model/{self.training_pipeline_config.timestamp}"
+            sync_report = self.s3sync.sync_folder_to_s3(folder = self.get_published_model_dir(), aws_bucket_url=aws_bucket_url)
+            logging.info(f"Trained model is pushed to {aws_bucket_url} sucessfully: {sync_report}")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def push_artifacts(self):
+        """
+        Commits the trained run to the artifact store and pushes it to S3
+        """
+        try:
+            if self.training_pipeline_config.artifact_store_enabled:
+                self.commit_artifacts()
+
+            # pushing our model to s3 bucket
+            self.sync_artifacts_dir_to_s3()
+            self.sync_saved_model_dir_to_s3()
         except Exception as e:
             raise NetworkSecurityException(e, sys)
 
@@ -96,11 +258,7 @@ class TrainingPipeline:
             data_validation_artifacts = self.start_data_validation(data_ingestion_atifacts=data_ingestion_artifacts)
             data_transformation_artifacts = self.start_data_transformation(data_validation_artifacts=data_validation_artifacts)
             model_trainer_artifacts = self.start_model_training(data_transformation_artifacts=data_transformation_artifacts)
-
-            # pushing our model to s3 bucket
-            self.sync_artifacts_dir_to_s3()
-            self.sync_saved_model_dir_to_s3()
-            
+            self.push_artifacts()
             return model_trainer_artifacts
             
         except Exception as e:
@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import stat
+import shutil
+import hashlib
+from datetime import datetime
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.utils.common.stage_cache import hash_path
+
+# Blobs are readable by everyone and writable by no one
+BLOB_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+class ArtifactStore:
+    """
+    Content addressed store of artifact files shared by all pipeline runs.
+    Every distinct file content is stored once, as blobs/<sha256[:2]>/<sha256>, and a
+    committed directory is recorded as a manifest (relative path -> sha256, size).
+
+    By default the files of a committed directory are copied into the store and left as they
+    are. With link=True they are replaced by hard links to the blobs, so a committed run takes
+    no more disk than its new file contents and identical files of different directories share
+    one copy. Writers have to replace such files (functions.replace_file) rather than rewrite them:
+    blobs are made read-only, so the linked files are too, and a write in place fails with a
+    PermissionError instead of changing the blob of every directory linking it (the mode bits do not
+    stop root). Blobs are never modified, only added or removed by gc.
+    """
+    def __init__(self, store_dir: str):
+        try:
+            self.store_dir = store_dir
+            self.blobs_dir = os.path.join(store_dir, "blobs")
+            self.manifests_dir = os.path.join(store_dir, "manifests")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def blob_path(self, digest: str)->str:
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def manifest_path(self, name: str)->str:
+        return os.path.join(self.manifests_dir, *name.split("/")) + ".json"
+
+    @staticmethod
+    def _make_read_only(file_path: str)->None:
+        if stat.S_IMODE(os.stat(file_path).st_mode) != BLOB_MODE:
+            os.chmod(file_path, BLOB_MODE)
+
+    @staticmethod
+    def _link_or_copy(source_path: str, destination_path: str)->None:
+        """
+        Atomically puts a hard link to source_path (a copy where links are not supported) at destination_path
+        """
+        temp_path = destination_path + ".tmp"
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+        try:
+            os.link(source_path, temp_path)
+        except OSError:
+            shutil.copy2(source_path, temp_path)
+        os.replace(temp_path, destination_path)
+
+    def add_file(self, file_path: str, link: bool = False)->dict:
+        """
+        Stores the content of file_path once.
+        Args:
+            link: replace file_path with a hard link to the blob
+        Returns:
+            {"sha256", "size", "stored_bytes"}, stored_bytes is 0 when the content was already stored
+        """
+        try:
+            hasher = hashlib.sha256()
+            hash_path(file_path, hasher)
+            digest = hasher.hexdigest()
+            size = os.path.getsize(file_path)
+            blob_path = self.blob_path(digest)
+            stored_bytes = 0
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                if link:
+                    self._link_or_copy(file_path, blob_path)
+                    self._make_read_only(blob_path)
+                else:
+                    temp_path = blob_path + ".tmp"
+                    shutil.copy2(file_path, temp_path)
+                    self._make_read_only(temp_path)
+                    os.replace(temp_path, blob_path)
+                stored_bytes = size
+            else:
+                # Blobs of stores written before blobs were read-only
+                self._make_read_only(blob_path)
+                if link and not os.path.samefile(file_path, blob_path):
+                    self._link_or_copy(blob_path, file_path)
+            return {"sha256": digest, "size": size, "stored_bytes": stored_bytes}
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def commit(self, name: str, dir_path: str, link: bool = False)->dict:
+        """
+        Stores every file under dir_path and writes the manifest of the directory as name
+        (e.g. "runs/<timestamp>").
+        Returns:
+            the manifest
+        """
+        try:
+            files = {}
+            stored_bytes = 0
+            for root, dirs, file_names in os.walk(dir_path):
+                dirs.sort()
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(root, file_name)
+                    entry = self.add_file(file_path, link=link)
+                    stored_bytes += entry.pop("stored_bytes")
+                    files[os.path.relpath(file_path, dir_path).replace(os.sep, "/")] = entry
+
+            manifest = {
+                "name": name,
+                "source_dir": dir_path,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "files": files
+            }
+            manifest_path = self.manifest_path(name)
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            with open(manifest_path + ".tmp", "w") as file_obj:
+                json.dump(manifest, file_obj, indent=2)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+            total_bytes = sum(entry["size"] for entry in files.values())
+            logging.info(f"Committed {dir_path} as {name}: {len(files)} files, {total_bytes} bytes, "
+                         f"{stored_bytes} new bytes stored")
+            return manifest
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def load_manifest(self, name: str)->dict:
+        try:
+            with open(self.manifest_path(name)) as file_obj:
+                return json.load(file_obj)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def list_manifests(self)->list:
+        names = []
+        for root, dirs, file_names in os.walk(self.manifests_dir):
+            for file_name in file_names:
+                if file_name.endswith(".json"):
+                    path = os.path.relpath(os.path.join(root, file_name), self.manifests_dir)
+                    names.append(path[:-len(".json")].replace(os.sep, "/"))
+        return sorted(names)
+
+    def restore(self, name: str, dir_path: str, link: bool = False)->None:
+        """
+        Materializes a committed directory at dir_path, e.g. an earlier final_models.
+        """
+        try:
+            for relative_path, entry in self.load_manifest(name)["files"].items():
+                file_path = os.path.join(dir_path, *relative_path.split("/"))
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                if link:
+                    self._link_or_copy(self.blob_path(entry["sha256"]), file_path)
+                else:
+                    # A copy is the caller's own file, it is not made read-only like the blob
+                    shutil.copyfile(self.blob_path(entry["sha256"]), file_path + ".tmp")
+                    os.replace(file_path + ".tmp", file_path)
+            logging.info(f"Restored {name} to {dir_path}")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def delete_manifest(self, name: str)->None:
+        try:
+            os.remove(self.manifest_path(name))
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def prune(self, prefix: str, keep_last: int)->list:
+        """
+        Deletes all but the keep_last newest manifests under prefix (e.g. "runs"),
+        their blobs are removed by the next gc.
+        Returns:
+            names of the deleted manifests
+        """
+        try:
+            names = [name for name in self.list_manifests() if name.startswith(prefix + "/")]
+            names.sort(key=lambda name: self.load_manifest(name)["created_at"])
+            deleted = names[:max(0, len(names) - keep_last)]
+            for name in deleted:
+                self.delete_manifest(name)
+            return deleted
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def gc(self)->dict:
+        """
+        Removes the blobs no manifest references. Bytes are freed only for blobs that are
+        not also linked from a run directory.
+        Returns:
+            {"blobs_removed", "bytes_freed", "blobs_kept"}
+        """
+        try:
+            referenced = set()
+            for name in self.list_manifests():
+                referenced.update(entry["sha256"] for entry in self.load_manifest(name)["files"].values())
+
+            blobs_removed, bytes_freed, blobs_kept = 0, 0, 0
+            for root, dirs, file_names in os.walk(self.blobs_dir):
+                for file_name in file_names:
+                    if file_name in referenced:
+                        blobs_kept += 1
+                        continue
+                    blob_path = os.path.join(root, file_name)
+                    stat = os.stat(blob_path)
+                    os.remove(blob_path)
+                    blobs_removed += 1
+                    if stat.st_nlink == 1:
+                        bytes_freed += stat.st_size
+            report = {"blobs_removed": blobs_removed, "bytes_freed": bytes_freed, "blobs_kept": blobs_kept}
+            logging.info(f"Artifact store gc: {report}")
+            return report
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_sync_files(self, names: list)->tuple:
+        """
+        Files to sync for the given manifests, keyed as in the store, with their known hashes
+        so nothing is hashed again.
+        Returns:
+            (key -> {"sha256", "size"}, key -> local file path)
+        """
+        try:
+            files, file_paths = {}, {}
+            for name in names:
+                for entry in self.load_manifest(name)["files"].values():
+                    key = f"blobs/{entry['sha256'][:2]}/{entry['sha256']}"
+                    files[key] = {"sha256": entry["sha256"], "size": entry["size"]}
+                    file_paths[key] = self.blob_path(entry["sha256"])
+                manifest_path = self.manifest_path(name)
+                hasher = hashlib.sha256()
+                hash_path(manifest_path, hasher)
+                key = f"manifests/{name}.json"
+                files[key] = {"sha256": hasher.hexdigest(), "size": os.path.getsize(manifest_path)}
+                file_paths[key] = manifest_path
+            return files, file_paths
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -3,12 +3,39 @@ import yaml
 from pathlib import Path
 import os 
 import sys 
+import mmap
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
 from NetworkSecurity.exception.exception import NetworkSecurityException 
 from NetworkSecurity.logging.logger import logging 
 import numpy as np 
+import pandas as pd 
+import pyarrow as pa 
+import pyarrow.parquet as pq 
 import dill 
 import pickle 
 
+try:
+    import resource
+except ImportError:  # resource module is not available on Windows
+    resource = None
+
+@contextmanager
+def replace_file(file_path:Path):
+    """
+    Yields a temporary path next to file_path and renames it over file_path once the block
+    completes. An existing file_path is never written to, so readers see the old or the new
+    file and hard links to the old file (artifact store blobs) keep their content.
+    """
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        yield temp_path
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
 def read_yaml_file(file_path:Path) -> dict:
     try:
         with open(file_path, "rb") as file:
@@ -22,11 +49,107 @@ def write_yaml_file(file_path:Path, content: object, replace:bool = False)->None
             if os.path.exists(file_path):
                 os.remove(file_path)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w") as file:
+        with replace_file(file_path) as temp_path, open(temp_path, "w") as file:
             yaml.dump(content, file)
     except Exception as e:
         raise NetworkSecurityException(e, sys)
     
+def get_schema_dtypes(schema_config: dict)->dict:
+    """
+    Column name -> dtype mapping from the columns section of schema.yaml
+    """
+    try:
+        dtypes = {}
+        for column in schema_config["columns"]:
+            dtypes.update(column)
+        return dtypes
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def enforce_schema_dtypes(dataframe: pd.DataFrame, dtypes: dict)->pd.DataFrame:
+    """
+    Casts every schema column to its schema dtype. Integer dtypes cannot hold missing
+    values, so columns with missing values are kept as float32 with nan.
+    """
+    try:
+        for column, dtype in dtypes.items():
+            if column not in dataframe.columns:
+                continue
+            values = pd.to_numeric(dataframe[column], errors="coerce")
+            if values.isna().any():
+                dataframe[column] = values.astype(np.float32)
+            else:
+                dataframe[column] = values.astype(dtype)
+        return dataframe
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def get_arrow_schema(dtypes: dict)->pa.Schema:
+    """
+    Arrow schema of the feature store, integer columns are nullable so every chunk
+    written to one file shares the same schema whether or not it has missing values.
+    """
+    try:
+        return pa.schema([(column, pa.from_numpy_dtype(np.dtype(dtype))) for column, dtype in dtypes.items()])
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def write_feature_store_file(file_path:Path, dataframe: pd.DataFrame, dtypes: dict)->None:
+    """
+    Writes a dataframe to the columnar (parquet) feature store with schema dtypes
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        columns = [column for column in dtypes if column in dataframe.columns]
+        table = pa.Table.from_pandas(dataframe[columns],
+                                     schema=get_arrow_schema({column: dtypes[column] for column in columns}),
+                                     preserve_index=False)
+        with replace_file(file_path) as temp_path:
+            pq.write_table(table, temp_path)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def read_feature_store_file(file_path:Path, dtypes: dict)->pd.DataFrame:
+    """
+    Reads a feature store file (memory mapped) and enforces the schema dtypes
+    """
+    try:
+        dataframe = pd.read_parquet(file_path, memory_map=True)
+        return enforce_schema_dtypes(dataframe, dtypes)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def get_feature_store_dtypes(file_path:Path)->dict:
+    """
+    Column name -> numpy dtype as stored in a feature store file or directory,
+    read from the parquet footer without reading any data
+    """
+    try:
+        schema = pq.ParquetDataset(file_path).schema
+        return {field.name: np.dtype(field.type.to_pandas_dtype()) for field in schema}
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def to_compact_array(array: np.ndarray, dtype: str)->np.ndarray:
+    """
+    Casts an array of integer codes to a compact integer dtype. Float values are rounded first,
+    the preprocessor must already round imputed values (FastImputer round_to_codes) so that the
+    model is served the same values; raises if they do not fit the dtype.
+    """
+    try:
+        array = np.asarray(array)
+        dtype = np.dtype(dtype)
+        if array.dtype == dtype:
+            return array
+        if array.dtype.kind == "f":
+            array = np.rint(array)
+        info = np.iinfo(dtype)
+        if array.size and (array.min() < info.min or array.max() > info.max):
+            raise ValueError(f"Values do not fit in {dtype}")
+        return array.astype(dtype)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
 def save_numpy_array_data(file_path:Path, array:np.array):
     """
     Save numpy array data to file
@@ -36,7 +159,7 @@ def save_numpy_array_data(file_path:Path, array:np.array):
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
-        with open (file_path, "wb") as file_obj:
+        with replace_file(file_path) as temp_path, open(temp_path, "wb") as file_obj:
             np.save(file_obj, array)
     except Exception as e:
         raise NetworkSecurityException(e, sys)
@@ -45,7 +168,7 @@ def save_object(file_path:Path, obj: object)->None:
     try:
         logging.info("Entered the save object method of commonUtils class")
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as file_obj:
+        with replace_file(file_path) as temp_path, open(temp_path, "wb") as file_obj:
             pickle.dump(obj, file_obj)
         logging.info("Exited the save object method")
     except Exception as e:
@@ -56,14 +179,182 @@ def load_object(file_path:str)->object:
         if not os.path.exists(file_path):
             raise Exception(f"The file:{file_path} is not exists")
         with open(file_path,"rb") as file_obj:
-            print(file_obj)
             return pickle.load(file_obj)
     except Exception as e:
         raise NetworkSecurityException(e, sys)
+
+MODEL_ARTIFACT_METADATA_FILE_NAME = "metadata.json"
+MODEL_ARTIFACT_SKELETON_FILE_NAME = "skeleton.pkl"
+MODEL_ARTIFACT_ARRAYS_FILE_NAME = "arrays.bin"
+MODEL_ARTIFACT_CURRENT_FILE_NAME = "CURRENT"
+MODEL_ARTIFACT_FORMAT_VERSION = 1
+MODEL_ARTIFACT_ALIGNMENT = 64
+# Versions kept besides the current one, a reader that resolved an older version finishes loading it
+MODEL_ARTIFACT_KEEP_PREVIOUS_VERSIONS = 2
+
+def write_model_artifact(dir_path:Path, obj: object)->dict:
+    """
+    Writes an object as model artifact files into dir_path: a small pickle skeleton, a blob holding
+    every contiguous numpy array of the object (pickle protocol 5 out of band buffers, 64 byte
+    aligned) and a json metadata header with the offset of every buffer in the blob.
+    The files are written once, the caller makes dir_path visible to readers when it is complete.
+    Returns:
+        the metadata
+    """
+    try:
+        buffers = []
+        skeleton = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+        os.makedirs(dir_path, exist_ok=True)
+
+        buffer_table = []
+        with open(os.path.join(dir_path, MODEL_ARTIFACT_ARRAYS_FILE_NAME), "wb") as file_obj:
+            for buffer in buffers:
+                raw = buffer.raw()
+                file_obj.write(b"\0" * (-file_obj.tell() % MODEL_ARTIFACT_ALIGNMENT))
+                buffer_table.append([file_obj.tell(), raw.nbytes])
+                file_obj.write(raw)
+        with open(os.path.join(dir_path, MODEL_ARTIFACT_SKELETON_FILE_NAME), "wb") as file_obj:
+            file_obj.write(skeleton)
+        metadata = {
+            "format_version": MODEL_ARTIFACT_FORMAT_VERSION,
+            "object_class": f"{type(obj).__module__}.{type(obj).__qualname__}",
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "arrays_nbytes": sum(nbytes for _, nbytes in buffer_table),
+            "buffers": buffer_table
+        }
+        with open(os.path.join(dir_path, MODEL_ARTIFACT_METADATA_FILE_NAME), "w") as file_obj:
+            json.dump(metadata, file_obj)
+        return metadata
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def get_model_artifact_versions(dir_path:Path)->list:
+    if not os.path.isdir(dir_path):
+        return []
+    return sorted(name for name in os.listdir(dir_path) if name[:1] == "v" and name[1:].isdigit())
+
+def save_model_artifact(dir_path:Path, obj: object)->str:
+    """
+    Saves an object as a new immutable version dir_path/<version> (see write_model_artifact) and
+    then atomically replaces the dir_path/CURRENT pointer, so a reader loads the files of one
+    complete version whichever save runs meanwhile. Versions older than the previous
+    MODEL_ARTIFACT_KEEP_PREVIOUS_VERSIONS are removed.
+    Returns:
+        the new version, e.g. "v000003"
+    """
+    try:
+        os.makedirs(dir_path, exist_ok=True)
+        number = max([int(version[1:]) for version in get_model_artifact_versions(dir_path)] + [0])
+        # mkdir fails if the name is taken, so concurrent savers get distinct versions
+        while True:
+            number += 1
+            version = f"v{number:06d}"
+            try:
+                os.mkdir(os.path.join(dir_path, version))
+                break
+            except FileExistsError:
+                continue
+        metadata = write_model_artifact(os.path.join(dir_path, version), obj)
+
+        with replace_file(os.path.join(dir_path, MODEL_ARTIFACT_CURRENT_FILE_NAME)) as temp_path, \
+                open(temp_path, "w") as file_obj:
+            file_obj.write(version)
+        # Files of the earlier unversioned layout, superseded by CURRENT
+        for file_name in (MODEL_ARTIFACT_METADATA_FILE_NAME, MODEL_ARTIFACT_SKELETON_FILE_NAME,
+                          MODEL_ARTIFACT_ARRAYS_FILE_NAME):
+            if os.path.exists(os.path.join(dir_path, file_name)):
+                os.remove(os.path.join(dir_path, file_name))
+        versions = [name for name in get_model_artifact_versions(dir_path) if name < version]
+        for old_version in versions[:max(0, len(versions) - MODEL_ARTIFACT_KEEP_PREVIOUS_VERSIONS)]:
+            shutil.rmtree(os.path.join(dir_path, old_version), ignore_errors=True)
+        logging.info(f"Saved model artifact {dir_path} version {version} ({metadata['arrays_nbytes']} bytes of arrays)")
+        return version
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def model_artifact_exists(dir_path:Path)->bool:
+    """
+    Whether dir_path holds a complete model artifact, versioned or not
+    """
+    return (os.path.exists(os.path.join(dir_path, MODEL_ARTIFACT_CURRENT_FILE_NAME))
+            or os.path.exists(os.path.join(dir_path, MODEL_ARTIFACT_METADATA_FILE_NAME)))
+
+def read_model_artifact(dir_path:Path)->object:
+    """
+    Loads the object of the model artifact files in dir_path (see write_model_artifact)
+    """
+    with open(os.path.join(dir_path, MODEL_ARTIFACT_METADATA_FILE_NAME), "r") as file_obj:
+        metadata = json.load(file_obj)
+    if metadata["format_version"] != MODEL_ARTIFACT_FORMAT_VERSION:
+        raise Exception(f"Unsupported model artifact format {metadata['format_version']}")
+    with open(os.path.join(dir_path, MODEL_ARTIFACT_SKELETON_FILE_NAME), "rb") as file_obj:
+        skeleton = file_obj.read()
+
+    blob = memoryview(b"")
+    if metadata["arrays_nbytes"] > 0:
+        with open(os.path.join(dir_path, MODEL_ARTIFACT_ARRAYS_FILE_NAME), "rb") as file_obj:
+            # The mapping stays alive as long as an array views it
+            blob = memoryview(mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ))
+    buffers = [blob[offset:offset + nbytes] for offset, nbytes in metadata["buffers"]]
+    return pickle.loads(skeleton, buffers=buffers)
+
+def load_model_artifact(dir_path:Path)->object:
+    """
+    Loads an object saved with save_model_artifact, the version CURRENT points to (or the files of
+    dir_path itself, as written by write_model_artifact). The array blob is memory mapped read only,
+    numpy arrays are views on the mapping, so their pages are read lazily and shared through the
+    OS page cache by every process serving the same artifact. Objects that copy arrays into
+    their own storage on unpickling (sklearn trees) still get their own copy.
+    """
+    try:
+        current_file_path = os.path.join(dir_path, MODEL_ARTIFACT_CURRENT_FILE_NAME)
+        if not os.path.exists(current_file_path):
+            return read_model_artifact(dir_path)
+        while True:
+            with open(current_file_path) as file_obj:
+                version = file_obj.read().strip()
+            try:
+                return read_model_artifact(os.path.join(dir_path, version))
+            except FileNotFoundError:
+                # The version was removed by saves that ran since CURRENT was read, load the new current one
+                with open(current_file_path) as file_obj:
+                    if file_obj.read().strip() == version:
+                        raise
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
     
-def load_numpy_array_data(file_path:str)->np.array:
+def load_numpy_array_data(file_path:str, mmap_mode:str = None)->np.array:
+    """
+    mmap_mode: "r" maps the file instead of reading it, slices are then zero copy views
+    """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
     except Exception as e:
-        raise NetworkSecurityException(e, sys)
\ No newline at end of file
+        raise NetworkSecurityException(e, sys)
+
+def get_peak_rss_mb()->float:
+    """
+    Return the peak resident set size of the current process in MB.
+    Returns 0.0 where the platform does not expose it.
+    """
+    try:
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+        if sys.platform == "darwin":
+            return peak / (1024 * 1024)
+        return peak / 1024
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def get_n_workers(n_jobs)->int:
+    """
+    Number of worker processes for n_jobs, a negative or None n_jobs uses every cpu
+    """
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+    return max(1, n_jobs)
@@ -0,0 +1,57 @@
+import sys 
+import threading 
+from bisect import bisect_left 
+
+from NetworkSecurity.exception.exception import NetworkSecurityException 
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram, cheap enough to record on every request.
+    bucket_bounds_ms: upper bound (inclusive) of every bucket, an overflow bucket is added
+    """
+    def __init__(self, bucket_bounds_ms: list):
+        try:
+            self.bucket_bounds_ms = sorted(bucket_bounds_ms)
+            self.bucket_counts = [0] * (len(self.bucket_bounds_ms) + 1)
+            self.count = 0
+            self.sum_ms = 0.0
+            self.max_ms = 0.0
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def record(self, value_ms: float)->None:
+        with self._lock:
+            self.bucket_counts[bisect_left(self.bucket_bounds_ms, value_ms)] += 1
+            self.count += 1
+            self.sum_ms += value_ms
+            self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q: float)->float:
+        """
+        Upper bound of the bucket holding the q-th quantile (max value for the overflow bucket).
+        """
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for i, bucket_count in enumerate(self.bucket_counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    if i < len(self.bucket_bounds_ms):
+                        return min(float(self.bucket_bounds_ms[i]), self.max_ms)
+                    return self.max_ms
+            return self.max_ms
+
+    def snapshot(self)->dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bucket_bounds_ms, self.bucket_counts)}
+        buckets["le_inf"] = self.bucket_counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": self.sum_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets
+        }
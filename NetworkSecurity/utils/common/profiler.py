@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.utils.common.functions import get_peak_rss_mb
+
+# Profiler of the running pipeline, lets components record substeps without passing it around
+_active_profiler = None
+
+class RunProfiler:
+    """
+    Structured timing of a pipeline run. Every step records wall time, cpu time of this
+    process and of finished child processes (e.g. search workers), peak RSS and any
+    fields the caller adds (e.g. rows). Steps nest, a stage holds the substeps run inside it.
+    The profile is rewritten as JSON after every stage, so a failed run keeps its profile.
+
+    One stage can run under cProfile, its stats are dumped next to the profile
+    (pstats format, readable by snakeviz or python -m pstats). The pid and the start time of
+    every step are recorded to line up an external sampler such as py-spy record --pid.
+
+    A run continued by another process (one stage per process) appends its stages to the
+    profile the earlier processes wrote.
+    """
+    def __init__(self, profile_file_path: str, cprofile_stage: str = None):
+        try:
+            self.profile_file_path = profile_file_path
+            self.cprofile_stage = cprofile_stage
+            self.started_at = datetime.now().isoformat(timespec="seconds")
+            self.start_time = time.perf_counter()
+            self.previous_wall_seconds = 0.0
+            self.stages = []
+            self.stack = []
+            if os.path.exists(profile_file_path):
+                with open(profile_file_path) as file_obj:
+                    profile = json.load(file_obj)
+                self.started_at = profile["started_at"]
+                self.previous_wall_seconds = profile["wall_seconds"]
+                self.stages = profile["stages"]
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    @contextmanager
+    def step(self, name: str, **fields):
+        """
+        Times the block as a step (a stage at the top level).
+        Yields:
+            the step record, callers may add fields such as rows to it
+        """
+        global _active_profiler
+        record = {"name": name, "started_at": datetime.now().isoformat(timespec="milliseconds"), **fields}
+        if not self.stack:
+            record["pid"] = os.getpid()
+        (self.stack[-1].setdefault("steps", []) if self.stack else self.stages).append(record)
+        self.stack.append(record)
+        previous_profiler, _active_profiler = _active_profiler, self
+
+        profiler = cProfile.Profile() if len(self.stack) == 1 and name == self.cprofile_stage else None
+        start_times = os.times()
+        start_peak_rss_mb = get_peak_rss_mb()
+        start_time = time.perf_counter()
+        record["status"] = "running"
+        try:
+            if profiler is not None:
+                profiler.enable()
+            yield record
+            record["status"] = "succeeded"
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                record["cprofile_file_path"] = os.path.join(os.path.dirname(self.profile_file_path), f"{name}.prof")
+                profiler.dump_stats(record["cprofile_file_path"])
+            end_times = os.times()
+            record["wall_seconds"] = round(time.perf_counter() - start_time, 6)
+            record["cpu_seconds"] = round(max(0.0, end_times.user + end_times.system
+                                              - start_times.user - start_times.system), 6)
+            record["children_cpu_seconds"] = round(max(0.0, end_times.children_user + end_times.children_system
+                                                       - start_times.children_user - start_times.children_system), 6)
+            record["peak_rss_mb"] = round(get_peak_rss_mb(), 1)
+            # Memory the step added on top of the earlier peak of the process
+            record["peak_rss_increase_mb"] = round(max(0.0, record["peak_rss_mb"] - start_peak_rss_mb), 1)
+            if "steps" in record:
+                # Keep the substeps after the measurements of their step
+                record["steps"] = record.pop("steps")
+            self.stack.pop()
+            _active_profiler = previous_profiler
+            if not self.stack:
+                self.write()
+
+    def write(self)->None:
+        try:
+            os.makedirs(os.path.dirname(self.profile_file_path), exist_ok=True)
+            profile = {
+                "pid": os.getpid(),
+                "started_at": self.started_at,
+                "wall_seconds": round(self.previous_wall_seconds + time.perf_counter() - self.start_time, 6),
+                "peak_rss_mb": round(get_peak_rss_mb(), 1),
+                "stages": self.stages
+            }
+            # Replaced rather than rewritten in place, the file may be hard linked into the artifact store
+            with open(self.profile_file_path + ".tmp", "w") as file_obj:
+                json.dump(profile, file_obj, indent=2, default=str)
+            os.replace(self.profile_file_path + ".tmp", self.profile_file_path)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+@contextmanager
+def profile_step(name: str, **fields):
+    """
+    Records the block as a substep of the running pipeline stage, does nothing
+    (yields a throwaway record) when no stage is being profiled.
+    """
+    if _active_profiler is None or not _active_profiler.stack:
+        yield dict(fields)
+        return
+    with _active_profiler.step(name, **fields) as record:
+        yield record
+
+def profile_stage(name: str):
+    """
+    Decorator recording a method as a stage of the RunProfiler in self.profiler
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.step(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
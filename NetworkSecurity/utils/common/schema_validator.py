@@ -0,0 +1,86 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.utils.common.functions import get_schema_dtypes
+
+class SchemaValidator:
+    """
+    Validator compiled once from schema.yaml. Column presence and dtypes are checked on
+    the column names and (file) dtypes, nulls and the allowed value domain of every column
+    in one vectorized pass over the values, which also yields the mask of valid rows.
+    """
+    def __init__(self, schema_config: dict, domain: list, allow_nulls: bool = True,
+                 chunk_rows: int = 1000000):
+        """
+        Args:
+            domain: values every column may take, e.g. [-1, 0, 1]
+            allow_nulls: rows with missing values are valid (imputed later), otherwise invalid
+            chunk_rows: rows checked at a time, bounds the temporary memory
+        """
+        try:
+            self.dtypes = {column: np.dtype(dtype) for column, dtype in get_schema_dtypes(schema_config).items()}
+            self.columns = list(self.dtypes)
+            self.domain = np.array(sorted(domain))
+            self.allow_nulls = allow_nulls
+            self.chunk_rows = chunk_rows
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def validate(self, dataframe: pd.DataFrame, file_dtypes: dict = None):
+        """
+        Args:
+            file_dtypes: column -> dtype as stored in the source file, defaults to the dataframe dtypes
+        Returns:
+            (boolean mask of valid rows, report dict with per column violation counts)
+        """
+        try:
+            file_dtypes = file_dtypes or dict(dataframe.dtypes)
+            missing_columns = [column for column in self.columns if column not in dataframe.columns]
+            extra_columns = [column for column in dataframe.columns if column not in self.dtypes]
+            present_columns = [column for column in self.columns if column in dataframe.columns]
+
+            n_rows = len(dataframe)
+            null_counts = np.zeros(len(present_columns), dtype=np.int64)
+            out_of_domain_counts = np.zeros(len(present_columns), dtype=np.int64)
+            valid_rows = np.ones(n_rows, dtype=bool)
+            matrix = dataframe[present_columns].to_numpy()
+            for start in range(0, n_rows, self.chunk_rows):
+                chunk = matrix[start:start + self.chunk_rows]
+                if np.issubdtype(chunk.dtype, np.floating):
+                    nulls = np.isnan(chunk)
+                else:
+                    nulls = np.zeros(chunk.shape, dtype=bool)
+                out_of_domain = ~np.isin(chunk, self.domain) & ~nulls
+                null_counts += nulls.sum(axis=0)
+                out_of_domain_counts += out_of_domain.sum(axis=0)
+                invalid = out_of_domain if self.allow_nulls else out_of_domain | nulls
+                valid_rows[start:start + self.chunk_rows] = ~invalid.any(axis=1)
+
+            columns = {}
+            dtypes_ok = True
+            for i, column in enumerate(present_columns):
+                dtype = np.dtype(file_dtypes[column])
+                # A nullable integer column is read back as float when it has missing values
+                dtype_ok = dtype == self.dtypes[column] or (null_counts[i] > 0 and dtype.kind == "f")
+                dtypes_ok &= bool(dtype_ok)
+                columns[column] = {
+                    "dtype": str(dtype),
+                    "dtype_ok": bool(dtype_ok),
+                    "null_count": int(null_counts[i]),
+                    "out_of_domain_count": int(out_of_domain_counts[i])
+                }
+
+            report = {
+                "status": not missing_columns and dtypes_ok,
+                "n_rows": n_rows,
+                "n_invalid_rows": int(n_rows - valid_rows.sum()),
+                "missing_columns": missing_columns,
+                "extra_columns": extra_columns,
+                "columns": columns
+            }
+            return valid_rows, report
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
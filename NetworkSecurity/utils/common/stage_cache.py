@@ -0,0 +1,134 @@
+import os
+import sys
+import ast
+import json
+import shutil
+import hashlib
+import importlib.util
+from dataclasses import fields, replace
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.utils.common.functions import save_object, load_object
+
+ARTIFACT_OBJECT_FILE_NAME = "artifact.pkl"
+
+def hash_path(path, hasher)->None:
+    """
+    Feeds the content of a file, or of every file under a directory in sorted order, to hasher
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                hasher.update(os.path.relpath(file_path, path).encode())
+                hash_path(file_path, hasher)
+    else:
+        with open(path, "rb") as file_obj:
+            for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+                hasher.update(block)
+
+def get_code_files(module_file: str, package: str = "NetworkSecurity")->list:
+    """
+    Source files of module_file and of every module of package it imports, directly or through
+    other modules (imports inside functions included), so the cache key of a stage changes with
+    any of the code it runs.
+    """
+    code_files = []
+    pending = [os.path.abspath(module_file)]
+    while pending:
+        file_path = pending.pop()
+        if file_path in code_files:
+            continue
+        code_files.append(file_path)
+        with open(file_path, "rb") as file_obj:
+            tree = ast.parse(file_obj.read(), filename=file_path)
+        module_names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                module_names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                module_names.append(node.module)
+                # from package import submodule
+                module_names.extend(f"{node.module}.{alias.name}" for alias in node.names if alias.name != "*")
+        for module_name in module_names:
+            if module_name.split(".")[0] != package:
+                continue
+            try:
+                spec = importlib.util.find_spec(module_name)
+            except ModuleNotFoundError:
+                spec = None
+            if spec is not None and spec.origin and spec.origin.endswith(".py"):
+                pending.append(os.path.abspath(spec.origin))
+    return sorted(code_files)
+
+class StageCache:
+    """
+    Content addressed cache of pipeline stage artifacts.
+    A stage is keyed by the hash of its input files, its config (with the timestamped
+    artifact dir masked out) and the source of the code it runs, so an unchanged stage
+    is skipped and a failed run resumes from the first stage that did not complete.
+    """
+    def __init__(self, cache_dir: str, artifact_dir: str):
+        try:
+            self.cache_dir = cache_dir
+            self.artifact_dir = artifact_dir
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_key(self, stage_name: str, config: object, code_files: list,
+                input_paths: list = (), extra: dict = None)->str:
+        try:
+            hasher = hashlib.sha256()
+            hasher.update(stage_name.encode())
+            config_values = {name: str(value).replace(self.artifact_dir, "<artifact_dir>")
+                             for name, value in vars(config).items()}
+            hasher.update(json.dumps(config_values, sort_keys=True).encode())
+            hasher.update(json.dumps(extra or {}, sort_keys=True, default=str).encode())
+            # Only contents count, an input restored from the cache hashes like a fresh one
+            for path in list(code_files) + list(input_paths):
+                hash_path(path, hasher)
+            return f"{stage_name}_{hasher.hexdigest()[:16]}"
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def load(self, key: str):
+        """
+        Returns the cached artifact of a stage, with file paths pointing into the cache, or None
+        """
+        try:
+            artifact_object_path = os.path.join(self.cache_dir, key, ARTIFACT_OBJECT_FILE_NAME)
+            if not os.path.exists(artifact_object_path):
+                return None
+            logging.info(f"Stage cache hit {key}, skipping stage")
+            return load_object(artifact_object_path)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def save(self, key: str, artifact):
+        """
+        Copies every file the artifact points to into the cache entry. The entry is built in a
+        temporary directory and renamed into place, so a failed save never leaves a partial entry.
+        """
+        try:
+            entry_dir = os.path.join(self.cache_dir, key)
+            tmp_dir = f"{entry_dir}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            cached_paths = {}
+            for field in fields(artifact):
+                path = getattr(artifact, field.name)
+                if isinstance(path, (str, os.PathLike)) and os.path.isfile(path):
+                    cached_path = os.path.join(tmp_dir, field.name + os.path.splitext(path)[1])
+                    shutil.copy2(path, cached_path)
+                    cached_paths[field.name] = os.path.join(entry_dir, os.path.basename(cached_path))
+            save_object(os.path.join(tmp_dir, ARTIFACT_OBJECT_FILE_NAME), replace(artifact, **cached_paths))
+
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            logging.info(f"Saved stage artifacts to cache {key}")
+            return artifact
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.constants.training_pipeline import (TRACKING_BACKEND, TRACKING_LOCAL_DIR,
+                                                         TRACKING_DAGSHUB_REPO_OWNER, TRACKING_DAGSHUB_REPO_NAME,
+                                                         TRACKING_FLUSH_TIMEOUT_SECONDS)
+from NetworkSecurity.utils.common.functions import save_object
+
+class MlflowBackend:
+    """
+    Logs runs to MLflow on DagsHub. mlflow and dagshub are imported and initialised on the
+    first run, in the tracking worker, so a slow or offline remote never delays startup.
+    """
+    def __init__(self, repo_owner: str, repo_name: str):
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.mlflow = None
+
+    def log_run(self, run: dict)->None:
+        if self.mlflow is None:
+            import dagshub
+            import mlflow
+            dagshub.init(repo_owner=self.repo_owner, repo_name=self.repo_name, mlflow=True)
+            self.mlflow = mlflow
+        with self.mlflow.start_run(run_name=run["run_name"]):
+            self.mlflow.log_params(run["params"])
+            self.mlflow.log_metrics(run["metrics"])
+            if run["model"] is not None:
+                self.mlflow.sklearn.log_model(run["model"], "model")
+
+class LocalFileBackend:
+    """
+    Logs every run to <tracking_dir>/<run_name>/ as run.json (params, metrics) and model.pkl,
+    for tests and offline runs.
+    """
+    def __init__(self, tracking_dir: str):
+        self.tracking_dir = tracking_dir
+
+    def log_run(self, run: dict)->None:
+        run_dir = os.path.join(self.tracking_dir, run["run_name"])
+        os.makedirs(run_dir, exist_ok=True)
+        if run["model"] is not None:
+            save_object(os.path.join(run_dir, "model.pkl"), run["model"])
+        with open(os.path.join(run_dir, "run.json"), "w") as file_obj:
+            json.dump({key: value for key, value in run.items() if key != "model"}, file_obj, indent=2, default=str)
+
+def get_tracking_backend(backend_name: str):
+    if backend_name == "mlflow":
+        return MlflowBackend(TRACKING_DAGSHUB_REPO_OWNER, TRACKING_DAGSHUB_REPO_NAME)
+    if backend_name == "local":
+        return LocalFileBackend(TRACKING_LOCAL_DIR)
+    raise ValueError(f"Unknown tracking backend: {backend_name}")
+
+class ExperimentTracker:
+    """
+    Buffers the params, metrics and model of a run and ships the finished run from a
+    background worker thread, so tracking is off the training critical path. The backend is
+    created on the worker when the first run is shipped. A failed run is logged and dropped,
+    training never fails because of tracking.
+    """
+    def __init__(self, backend_name: str = TRACKING_BACKEND):
+        try:
+            self.backend_name = backend_name
+            self.backend = None
+            self.queue = queue.Queue()
+            self.worker = None
+            self.lock = threading.Lock()
+            self.runs_logged = 0
+            self.runs_failed = 0
+            self._reset_run()
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def _reset_run(self)->None:
+        self.params, self.metrics, self.model = {}, {}, None
+
+    def log_params(self, params: dict)->None:
+        self.params.update(params)
+
+    def log_metrics(self, metrics: dict, prefix: str = "")->None:
+        self.metrics.update({f"{prefix}{name}": float(value) for name, value in metrics.items()})
+
+    def log_model(self, model)->None:
+        """
+        Keeps the model of the run, it is logged once when the run ends.
+        """
+        self.model = model
+
+    def end_run(self, run_name: str = None)->None:
+        """
+        Queues the buffered run for the worker and returns at once.
+        """
+        try:
+            if self.backend_name == "none":
+                self._reset_run()
+                return
+            run = {"run_name": run_name or datetime.now().strftime("%m_%d_%Y_%H_%M_%S"),
+                   "params": self.params, "metrics": self.metrics, "model": self.model}
+            self._reset_run()
+            with self.lock:
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self._run, name="experiment-tracker", daemon=True)
+                    self.worker.start()
+            self.queue.put(run)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def _run(self)->None:
+        while True:
+            run = self.queue.get()
+            try:
+                start_time = time.perf_counter()
+                if self.backend is None:
+                    self.backend = get_tracking_backend(self.backend_name)
+                self.backend.log_run(run)
+                self.runs_logged += 1
+                logging.info(f"Tracked run {run['run_name']} with {self.backend_name} in "
+                             f"{time.perf_counter() - start_time:.2f}s")
+            except Exception as e:
+                self.runs_failed += 1
+                logging.info(f"Tracking run {run['run_name']} with {self.backend_name} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self, timeout_seconds: float = TRACKING_FLUSH_TIMEOUT_SECONDS)->bool:
+        """
+        Waits up to timeout_seconds for queued runs to be shipped.
+        Returns:
+            True if nothing is left in the queue
+        """
+        deadline = time.perf_counter() + timeout_seconds
+        while self.queue.unfinished_tasks and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        if self.queue.unfinished_tasks:
+            logging.info(f"{self.queue.unfinished_tasks} tracking runs were not shipped within {timeout_seconds}s")
+            return False
+        return True
+
+_experiment_tracker = None
+
+def get_experiment_tracker()->ExperimentTracker:
+    """
+    Process wide tracker, created on first use. Queued runs are flushed (bounded by
+    TRACKING_FLUSH_TIMEOUT_SECONDS) when the interpreter exits.
+    """
+    global _experiment_tracker
+    if _experiment_tracker is None:
+        _experiment_tracker = ExperimentTracker()
+        atexit.register(_experiment_tracker.flush)
+    return _experiment_tracker
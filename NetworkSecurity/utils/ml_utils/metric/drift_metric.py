@@ -0,0 +1,120 @@
+import os
+import sys
+
+import numpy as np
+from scipy.stats import chi2, kstwo
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.utils.common.functions import replace_file
+
+def compute_histograms(matrix: np.ndarray, domain: list, chunk_rows: int = 1000000)->np.ndarray:
+    """
+    Value counts of every column of a small integer matrix in one vectorized pass.
+    Args:
+        matrix: 2D array, one column per feature (nan allowed for float input)
+        domain: contiguous integer values a feature can take, e.g. [-1, 0, 1]
+        chunk_rows: rows encoded at a time, bounds the temporary memory
+    Returns:
+        array of shape (n_columns, len(domain) + 1), the last bucket counts
+        missing and out of domain values
+    """
+    try:
+        matrix = np.asarray(matrix)
+        n_columns = matrix.shape[1]
+        domain_min = min(domain)
+        n_values = max(domain) - domain_min + 1
+        n_buckets = n_values + 1
+        # Each column owns n_buckets consecutive codes so one bincount covers all columns
+        column_offsets = np.arange(n_columns, dtype=np.int64) * n_buckets
+        counts = np.zeros(n_columns * n_buckets, dtype=np.int64)
+        for start in range(0, matrix.shape[0], chunk_rows):
+            chunk = matrix[start:start + chunk_rows]
+            if np.issubdtype(chunk.dtype, np.floating):
+                invalid = np.isnan(chunk)
+                values = np.where(invalid, domain_min, chunk).astype(np.int64) - domain_min
+            else:
+                invalid = np.zeros(chunk.shape, dtype=bool)
+                values = chunk.astype(np.int64) - domain_min
+            invalid |= (values < 0) | (values >= n_values)
+            values[invalid] = n_values
+            counts += np.bincount((values + column_offsets).ravel(), minlength=n_columns * n_buckets)
+        return counts.reshape(n_columns, n_buckets)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def save_histograms(file_path, columns: list, counts: np.ndarray)->None:
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with replace_file(file_path) as temp_path, open(temp_path, "wb") as file_obj:
+            np.savez(file_obj, columns=np.array(columns), counts=counts)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def load_histograms(file_path):
+    """
+    Returns:
+        (columns, counts) saved with save_histograms
+    """
+    try:
+        with np.load(file_path) as data:
+            return [str(column) for column in data["columns"]], data["counts"]
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def compare_histograms(reference_counts: np.ndarray, current_counts: np.ndarray,
+                       columns: list, threshold: float = 0.05, psi_threshold: float = None,
+                       psi_epsilon: float = 1e-6):
+    """
+    KS, chi-square and PSI statistics of every column, derived from value counts only.
+    A column drifts when the KS p value is below threshold and, if psi_threshold is given,
+    its PSI is at least psi_threshold (large samples make tiny shifts significant).
+    Returns:
+        (drift found in any column, report dict keyed by column)
+    """
+    try:
+        reference = reference_counts[:, :-1].astype(np.float64)
+        current = current_counts[:, :-1].astype(np.float64)
+        n_reference = reference.sum(axis=1)
+        n_current = current.sum(axis=1)
+        reference_p = reference / np.maximum(n_reference, 1)[:, None]
+        current_p = current / np.maximum(n_current, 1)[:, None]
+
+        # Two sample KS on discrete values: largest gap between the empirical CDFs
+        ks_statistic = np.abs(np.cumsum(reference_p, axis=1) - np.cumsum(current_p, axis=1)).max(axis=1)
+        n_effective = np.round(n_reference * n_current / np.maximum(n_reference + n_current, 1))
+        ks_p_value = np.ones(len(columns))
+        has_data = n_effective >= 1
+        ks_p_value[has_data] = kstwo.sf(ks_statistic[has_data], n_effective[has_data])
+
+        # Chi-square test of the 2 x n_values contingency table of every column
+        totals = reference + current
+        n_total = np.maximum(n_reference + n_current, 1)
+        expected_reference = totals * (n_reference / n_total)[:, None]
+        expected_current = totals * (n_current / n_total)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            chi2_statistic = np.nansum(np.where(totals > 0, (reference - expected_reference) ** 2 / expected_reference
+                                                + (current - expected_current) ** 2 / expected_current, 0.0), axis=1)
+        dof = (totals > 0).sum(axis=1) - 1
+        chi2_p_value = np.where(dof > 0, chi2.sf(chi2_statistic, np.maximum(dof, 1)), 1.0)
+
+        # Population stability index with smoothing of empty buckets
+        reference_s = (reference + psi_epsilon) / (n_reference + psi_epsilon * reference.shape[1])[:, None]
+        current_s = (current + psi_epsilon) / (n_current + psi_epsilon * current.shape[1])[:, None]
+        psi = ((current_s - reference_s) * np.log(current_s / reference_s)).sum(axis=1)
+
+        drift = ks_p_value < threshold
+        if psi_threshold is not None:
+            drift &= psi >= psi_threshold
+        report = {}
+        for i, column in enumerate(columns):
+            report[column] = {
+                "p_value": float(ks_p_value[i]),
+                "ks_statistic": float(ks_statistic[i]),
+                "chi2_p_value": float(chi2_p_value[i]),
+                "psi": float(psi[i]),
+                "invalid_count": int(current_counts[i, -1]),
+                "drift_status": bool(drift[i])
+            }
+        return bool(drift.any()), report
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.entity.config_entity import DriftMonitorConfig
+from NetworkSecurity.utils.ml_utils.metric.drift_metric import (compute_histograms, compare_histograms,
+                                                                load_histograms)
+
+class DriftMonitor:
+    """
+    Data drift over live prediction traffic, raw rows are only kept until the next flush.
+    The window is a ring of window_buckets time buckets holding value counts per feature.
+    Incoming rows are added to the current bucket and to the running window total, and a
+    bucket that falls out of the window is subtracted once, so each row costs O(n_features)
+    no matter how long the window is.
+    Request handlers record rows, which only queues them; a background task flushes them into
+    the window, so counting is off the request path.
+    """
+    def __init__(self, drift_monitor_config: DriftMonitorConfig, feature_columns: list):
+        try:
+            self.drift_monitor_config = drift_monitor_config
+            self.feature_columns = feature_columns
+            reference_columns, reference_counts = load_histograms(drift_monitor_config.reference_file_path)
+            self.reference_counts = reference_counts[[reference_columns.index(c) for c in feature_columns]]
+
+            shape = (drift_monitor_config.window_buckets,) + self.reference_counts.shape
+            self.bucket_counts = np.zeros(shape, dtype=np.int64)
+            self.window_counts = np.zeros(self.reference_counts.shape, dtype=np.int64)
+            self.current_bucket = 0
+            self.current_bucket_start = time.time()
+            self.last_report = None
+            self.lock = threading.Lock()
+            # Rows recorded by request handlers, waiting for the next flush
+            self.pending = deque(maxlen=drift_monitor_config.max_pending_batches)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def _rotate(self, now: float)->None:
+        bucket_seconds = self.drift_monitor_config.bucket_seconds
+        n_expired = int((now - self.current_bucket_start) // bucket_seconds)
+        # After a long idle gap every bucket has expired, no need to step through them all
+        for _ in range(min(n_expired, len(self.bucket_counts))):
+            self.current_bucket = (self.current_bucket + 1) % len(self.bucket_counts)
+            self.window_counts -= self.bucket_counts[self.current_bucket]
+            self.bucket_counts[self.current_bucket] = 0
+        self.current_bucket_start += n_expired * bucket_seconds
+
+    def record(self, rows)->None:
+        """
+        Queues rows for the next flush. It does no counting, so it is cheap enough to call from
+        a request handler; deque appends are thread safe.
+        Args:
+            rows: 2D array or list of rows of raw feature values, columns in feature_columns order
+        """
+        self.pending.append(rows)
+
+    def flush(self)->int:
+        """
+        Adds every queued row to the window.
+        Returns:
+            number of rows added
+        """
+        try:
+            batches = []
+            while self.pending:
+                try:
+                    batches.append(np.asarray(self.pending.popleft()))
+                except IndexError:
+                    break
+            if not batches:
+                return 0
+            rows = np.concatenate(batches)
+            self.update(rows)
+            return len(rows)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def update(self, rows: np.ndarray)->None:
+        """
+        Args:
+            rows: 2D array of raw feature values, columns in feature_columns order
+        """
+        try:
+            counts = compute_histograms(rows, self.drift_monitor_config.feature_domain)
+            with self.lock:
+                self._rotate(time.time())
+                self.bucket_counts[self.current_bucket] += counts
+                self.window_counts += counts
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def check(self)->dict:
+        """
+        Compares the current window with the training reference and appends a snapshot
+        of the window counts and drift flags to the snapshot file.
+        Returns:
+            snapshot dict, drift_status is None while the window has too few rows
+        """
+        try:
+            self.flush()
+            with self.lock:
+                self._rotate(time.time())
+                window_counts = self.window_counts.copy()
+            window_rows = int(window_counts[0].sum()) if len(window_counts) else 0
+
+            drift_status, columns = None, {}
+            if window_rows >= self.drift_monitor_config.min_window_rows:
+                drift_status, report = compare_histograms(self.reference_counts, window_counts,
+                                                          self.feature_columns,
+                                                          threshold=self.drift_monitor_config.threshold,
+                                                          psi_threshold=self.drift_monitor_config.psi_threshold)
+                columns = {column: {"psi": round(stats["psi"], 6), "p_value": stats["p_value"],
+                                    "drift_status": stats["drift_status"]}
+                           for column, stats in report.items()}
+                drifted = [column for column, stats in report.items() if stats["drift_status"]]
+                if drift_status:
+                    logging.info(f"Drift detected in live traffic on {len(drifted)} features: {drifted}")
+
+            snapshot = {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "window_rows": window_rows,
+                "drift_status": drift_status,
+                "columns": columns,
+                "window_counts": window_counts.tolist()
+            }
+            self.persist_snapshot(snapshot)
+            self.last_report = snapshot
+            return snapshot
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def persist_snapshot(self, snapshot: dict)->None:
+        try:
+            snapshot_file_path = self.drift_monitor_config.snapshot_file_path
+            os.makedirs(os.path.dirname(snapshot_file_path), exist_ok=True)
+            with open(snapshot_file_path, "a") as file_obj:
+                file_obj.write(json.dumps(snapshot) + "\n")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
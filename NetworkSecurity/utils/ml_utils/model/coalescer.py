@@ -0,0 +1,110 @@
+import sys
+import time
+import asyncio
+
+import pandas as pd
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.utils.common.histogram import LatencyHistogram
+from NetworkSecurity.utils.ml_utils.model.estimator import NetworkModel
+
+class PredictionCoalescer:
+    """
+    Gathers concurrent single-row prediction requests into one matrix and runs a single
+    vectorized NetworkModel.predict for the whole batch.
+    A batch is dispatched when max_batch_size rows are queued or max_wait_ms has passed
+    since the first queued row, whichever comes first.
+    """
+    def __init__(self, network_model: NetworkModel, feature_columns: list,
+                 max_wait_ms: float, max_batch_size: int, latency_buckets_ms: list):
+        try:
+            self.network_model = network_model
+            self.feature_columns = feature_columns
+            self.max_wait_seconds = max_wait_ms / 1000
+            self.max_batch_size = max_batch_size
+            self.queue_delay = LatencyHistogram(latency_buckets_ms)
+            self.batch_size_counts = {}
+            self.batch_count = 0
+            self.row_count = 0
+            self._queue = None
+            self._worker = None
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    async def start(self)->None:
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logging.info(f"Started prediction coalescer with max wait {self.max_wait_seconds * 1000} ms "
+                     f"and max batch size {self.max_batch_size}")
+
+    async def stop(self)->None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def predict(self, row: dict):
+        """
+        Queues one feature row and waits for its prediction.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self)->list:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued before waiting on the clock
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict_batch(self, rows: list)->list:
+        dataframe = pd.DataFrame(rows, columns=self.feature_columns)
+        return list(self.network_model.predict(dataframe))
+
+    async def _run(self)->None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            dispatch_time = time.perf_counter()
+            for _, _, enqueue_time in batch:
+                self.queue_delay.record((dispatch_time - enqueue_time) * 1000)
+            self.batch_count += 1
+            self.row_count += len(batch)
+            self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+
+            try:
+                # Predict off the event loop so new requests keep queueing meanwhile
+                predictions = await loop.run_in_executor(None, self._predict_batch,
+                                                         [row for row, _, _ in batch])
+                for (_, future, _), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(prediction)
+            except Exception as e:
+                logging.error(f"Coalesced prediction of {len(batch)} rows failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(NetworkSecurityException(e, sys))
+
+    def stats(self)->dict:
+        return {
+            "batches": self.batch_count,
+            "rows": self.row_count,
+            "mean_batch_size": self.row_count / self.batch_count if self.batch_count else 0.0,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "queue_delay": self.queue_delay.snapshot()
+        }
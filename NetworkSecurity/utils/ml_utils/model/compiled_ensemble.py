@@ -0,0 +1,255 @@
+import sys
+
+import numpy as np
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+
+TREE_LEAF = -1
+
+class CompiledEnsemble:
+    """
+    Tree ensemble flattened into contiguous node arrays with a vectorized NumPy traversal.
+    Predictions are bit identical to the sklearn model's predict: the leaf values are
+    aggregated with the same floating point operations in the same order as sklearn does.
+
+    Inputs whose values all lie in the small integer feature domain take a fast path:
+    the child of every node for every domain value is precomputed, so one traversal step
+    is a table lookup, and duplicate rows of a batch are traversed once (rows are packed
+    into integer keys, base len(domain)). Other inputs are compared with the thresholds.
+
+    The kernel wins on single rows and on batches with many duplicate rows, sklearn's Cython
+    traversal wins on large batches of mostly distinct rows (e.g. offline scoring of historical
+    dumps). A batch of at least fallback_min_rows rows with more than fallback_distinct_ratio
+    distinct rows (or with values outside the domain) is predicted by the sklearn model, kept
+    as fallback_model.
+    """
+    def __init__(self, model, domain: list = (-1, 0, 1), dedup_min_rows: int = 64,
+                 chunk_elements: int = 1000000, fallback_min_rows: int = 10000,
+                 fallback_distinct_ratio: float = 0.25):
+        try:
+            from sklearn.dummy import DummyClassifier
+            from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+            from sklearn.tree import DecisionTreeClassifier
+            self.domain_min = int(min(domain))
+            self.n_codes = int(max(domain)) - self.domain_min + 1
+            self.dedup_min_rows = dedup_min_rows
+            self.chunk_elements = chunk_elements
+            self.fallback_model = model
+            self.fallback_min_rows = fallback_min_rows
+            self.fallback_distinct_ratio = fallback_distinct_ratio
+            self.classes_ = model.classes_
+            self.n_features_in_ = model.n_features_in_
+            self.model_class = type(model).__name__
+
+            if isinstance(model, RandomForestClassifier):
+                self.kind = "forest"
+                trees = [estimator.tree_ for estimator in model.estimators_]
+            elif isinstance(model, DecisionTreeClassifier):
+                self.kind = "tree"
+                trees = [model.tree_]
+            elif isinstance(model, GradientBoostingClassifier):
+                if not (model.init_ == "zero" or isinstance(model.init_, DummyClassifier)):
+                    raise ValueError("Only the default or zero init estimator can be compiled")
+                self.kind = "gradient_boosting"
+                trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+                n_outputs = model.estimators_.shape[1]
+                # Output column of every tree, stages are stored one after another
+                self.tree_output = np.tile(np.arange(n_outputs), model.estimators_.shape[0])
+                self.learning_rate = model.learning_rate
+                self.init_raw = self.get_init_raw(model)
+            elif isinstance(model, AdaBoostClassifier):
+                self.kind = "ada_boost"
+                trees = [estimator.tree_ for estimator in model.estimators_]
+                self.estimator_weights = model.estimator_weights_[:len(trees)]
+                self.estimator_weights_sum = model.estimator_weights_.sum()
+            else:
+                raise ValueError(f"Cannot compile {type(model).__name__}")
+            self._flatten(trees, model)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def __setstate__(self, state):
+        # Ensembles compiled before the sklearn fallback was kept always use the kernel
+        state.setdefault("fallback_model", None)
+        self.__dict__.update(state)
+
+    @staticmethod
+    def get_init_raw(model)->np.ndarray:
+        """
+        Raw prediction of a gradient boosting init estimator (zero or the class prior DummyClassifier),
+        computed from its predict_proba as sklearn does: clipped, then the logit link for two classes
+        and the symmetric multinomial logit for more. It does not depend on X for these estimators.
+        """
+        n_outputs = model.estimators_.shape[1]
+        if model.init_ == "zero":
+            return np.zeros(n_outputs, dtype=np.float64)
+        from scipy.special import logit
+        from scipy.stats import gmean
+        eps = np.finfo(np.float64).eps
+        proba = model.init_.predict_proba(np.zeros((1, model.n_features_in_), dtype=np.float32))
+        if n_outputs == 1:
+            return logit(np.clip(proba[:, 1], eps, 1 - eps, dtype=np.float64))
+        proba = np.clip(proba, eps, 1 - eps, dtype=np.float64)
+        return np.log(proba / gmean(proba, axis=1)[:, None])[0]
+
+    @staticmethod
+    def is_supported(model)->bool:
+        from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+        return isinstance(model, (RandomForestClassifier, DecisionTreeClassifier,
+                                  GradientBoostingClassifier, AdaBoostClassifier))
+
+    def _flatten(self, trees: list, model)->None:
+        n_nodes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(n_nodes)[:-1]])
+        self.roots = offsets.astype(np.int64)
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        features, thresholds, lefts, rights, missing_left, values = [], [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            node_index = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == TREE_LEAF
+            # Leaves point to themselves, so a finished traversal stays put
+            lefts.append(np.where(is_leaf, node_index, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_index, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            missing_left.append(tree.missing_go_to_left.astype(bool))
+            values.append(tree.value[:, 0, :])
+        self.feature = np.concatenate(features).astype(np.int64)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.int64)
+        self.right = np.concatenate(rights).astype(np.int64)
+        self.missing_go_to_left = np.concatenate(missing_left)
+        self.is_leaf = self.left == np.arange(len(self.left))
+
+        # Child of every node for every domain value, compared the way sklearn does (float32 <= float64)
+        codes = (np.arange(self.n_codes) + self.domain_min).astype(np.float32)
+        go_left = codes[None, :] <= self.threshold[:, None]
+        self.next_node = np.where(go_left, self.left[:, None], self.right[:, None]).ravel()
+
+        leaf_value = np.concatenate(values)
+        if self.kind == "gradient_boosting":
+            self.leaf_value = np.ascontiguousarray(leaf_value[:, 0])
+        elif self.kind == "ada_boost":
+            # Each stump predicts the class with the largest leaf value, as DecisionTreeClassifier.predict
+            stump_classes = np.concatenate([np.repeat(estimator.classes_[None, :], tree.node_count, axis=0)
+                                            for estimator, tree in zip(model.estimators_, trees)])
+            leaf_class = stump_classes[np.arange(len(leaf_value)), np.argmax(leaf_value, axis=1)]
+            self.leaf_onehot = leaf_class[:, None] == self.classes_[None, :]
+        else:
+            self.leaf_value = np.ascontiguousarray(leaf_value)
+
+    def _to_codes(self, X: np.ndarray):
+        """
+        Returns X as int64 domain codes (0 .. n_codes-1), or None if a value is outside the domain
+        """
+        if X.dtype.kind == "f":
+            if not np.array_equal(X, np.rint(X)):
+                return None
+        elif X.dtype.kind not in "iub":
+            return None
+        codes = X.astype(np.int64) - self.domain_min
+        if codes.size and (codes.min() < 0 or codes.max() >= self.n_codes):
+            return None
+        return codes
+
+    def _leaves(self, codes: np.ndarray, X32: np.ndarray)->np.ndarray:
+        """
+        Leaf node of every (row, tree), traversing only the pairs not at a leaf yet.
+        Returns:
+            array of shape (n_rows, n_trees) of global node indices
+        """
+        n_rows, n_trees = len(codes if codes is not None else X32), len(self.roots)
+        nodes = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * self.n_features_in_, n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        current = nodes[active]
+        base = row_base[active]
+        flat = codes.ravel() if codes is not None else X32.ravel()
+        while active.size:
+            values = flat[base + self.feature[current]]
+            if codes is not None:
+                current = self.next_node[current * self.n_codes + values]
+            else:
+                go_left = values <= self.threshold[current]
+                missing = np.isnan(values)
+                if missing.any():
+                    go_left = np.where(missing, self.missing_go_to_left[current], go_left)
+                current = np.where(go_left, self.left[current], self.right[current])
+            done = self.is_leaf[current]
+            if done.any():
+                nodes[active[done]] = current[done]
+                keep = ~done
+                active, current, base = active[keep], current[keep], base[keep]
+        return nodes.reshape(n_rows, n_trees)
+
+    def _aggregate(self, leaves: np.ndarray)->np.ndarray:
+        """
+        Class predictions from leaf nodes, with the floating point operations of sklearn's predict.
+        np.add.accumulate adds strictly left to right, the same order as sklearn's loops over
+        estimators, unlike np.sum which may add pairwise.
+        """
+        n_rows, n_trees = leaves.shape
+        if self.kind == "tree":
+            return self.classes_.take(np.argmax(self.leaf_value[leaves[:, 0]], axis=1), axis=0)
+        if self.kind == "forest":
+            # ForestClassifier.predict_proba adds the tree probabilities in order, then divides
+            proba = np.add.accumulate(self.leaf_value[leaves], axis=1)[:, -1]
+            proba /= n_trees
+            return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+        if self.kind == "gradient_boosting":
+            # predict_stages adds learning_rate * value to the init prediction, stage by stage
+            n_outputs = len(self.init_raw)
+            contributions = (self.learning_rate * self.leaf_value[leaves]).reshape(n_rows, -1, n_outputs)
+            init = np.broadcast_to(self.init_raw, (n_rows, 1, n_outputs))
+            raw = np.add.accumulate(np.concatenate([init, contributions], axis=1), axis=1)[:, -1]
+            if n_outputs == 1:
+                return self.classes_[(raw.ravel() >= 0).astype(int)]
+            return self.classes_[np.argmax(raw, axis=1)]
+        # AdaBoostClassifier.decision_function (SAMME)
+        n_classes = len(self.classes_)
+        w = self.estimator_weights[None, :, None]
+        votes = np.where(self.leaf_onehot[leaves], w, -1 / (n_classes - 1) * w)
+        pred = np.add.accumulate(votes, axis=1)[:, -1]
+        pred /= self.estimator_weights_sum
+        if n_classes == 2:
+            pred[:, 0] *= -1
+            return self.classes_.take(pred.sum(axis=1) > 0, axis=0)
+        return self.classes_.take(np.argmax(pred, axis=1), axis=0)
+
+    def _predict_rows(self, codes: np.ndarray, X32: np.ndarray)->np.ndarray:
+        """
+        Traverses and aggregates in chunks of rows, bounding the (row, tree) arrays by chunk_elements
+        """
+        rows = codes if codes is not None else X32
+        chunk_rows = max(1, self.chunk_elements // max(len(self.roots), 1))
+        predictions = [self._aggregate(self._leaves(codes[start:start + chunk_rows] if codes is not None else None,
+                                                    X32[start:start + chunk_rows] if X32 is not None else None))
+                       for start in range(0, len(rows), chunk_rows)]
+        return np.concatenate(predictions) if predictions else self.classes_[:0]
+
+    def predict(self, X)->np.ndarray:
+        try:
+            X = np.asarray(X)
+            if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+                raise ValueError(f"X has shape {X.shape}, expected {self.n_features_in_} features")
+            codes = self._to_codes(X)
+            if codes is None:
+                if self.fallback_model is not None and len(X) >= self.fallback_min_rows:
+                    return self.fallback_model.predict(X)
+                X32 = np.ascontiguousarray(X, dtype=np.float32)
+                if self.kind == "gradient_boosting" and np.isnan(X32).any():
+                    raise ValueError("Input X contains NaN")
+                return self._predict_rows(None, X32)
+            if len(codes) >= self.dedup_min_rows and self.n_codes ** codes.shape[1] < 2 ** 62:
+                # Duplicate rows of the batch are traversed once
+                keys = codes @ (self.n_codes ** np.arange(codes.shape[1], dtype=np.int64))
+                _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+                if (self.fallback_model is not None and len(codes) >= self.fallback_min_rows
+                        and len(first) > self.fallback_distinct_ratio * len(codes)):
+                    return self.fallback_model.predict(X)
+                return self._predict_rows(codes[first], None)[inverse.ravel()]
+            return self._predict_rows(codes, None)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -5,6 +5,7 @@ from NetworkSecurity.exception.exception import NetworkSecurityException
 from NetworkSecurity.logging.logger import logging 
 
 from NetworkSecurity.constants.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME 
+from NetworkSecurity.utils.ml_utils.model.registry import ModelRegistry
 
 class NetworkModel:
     def __init__(self, preprocessor, model):
@@ -16,8 +17,24 @@ class NetworkModel:
         
     def predict(self, X):
         try:
-            X_transform = self.preprocessor.tranform(X)
+            # Same feature mapping as DataTransformation (replacing -1 to 0)
+            X = X.replace(-1, 0)
+            X_transform = self.preprocessor.transform(X)
             y_hat = self.model.predict(X_transform)
             return y_hat 
         except Exception as e:
-            raise NetworkSecurityException(e, sys)
\ No newline at end of file
+            raise NetworkSecurityException(e, sys)
+
+def load_final_network_model(model_registry_dir: str)->NetworkModel:
+    """
+    Loads the current version of the model registry, the preprocessor and model of one training run.
+    """
+    try:
+        model_registry = ModelRegistry(model_registry_dir)
+        version = model_registry.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No model version is published in {model_registry_dir}, run the training pipeline")
+        logging.info(f"Loading model version {version} from {model_registry_dir}")
+        return model_registry.load(version)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
@@ -1,36 +1,232 @@
-import os 
-import sys 
+import sys
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-from NetworkSecurity.exception.exception import NetworkSecurityException 
-from NetworkSecurity.logging.logger import logging 
+import numpy as np
 
-from sklearn.model_selection import RandomizedSearchCV
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.utils.common.functions import get_n_workers
+
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler, check_cv
 from sklearn.metrics import r2_score
 
-def evaluate_models(X_train, y_train, X_test, y_test, models, params):
+# Training data is sent to every search worker once, instead of with every fit task
+_worker_data = {}
+
+def _share_array(array):
+    """
+    A memory mapped array is sent to workers as its file location and reopened there,
+    so every worker maps the same pages instead of unpickling its own copy.
+    """
+    if isinstance(array, np.memmap) and array.filename is not None:
+        return ("memmap", array.filename, array.dtype.str, array.shape, array.offset,
+                "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C")
+    return array
+
+def _open_array(shared):
+    if isinstance(shared, tuple) and shared[0] == "memmap":
+        _, filename, dtype, shape, offset, order = shared
+        return np.memmap(filename, dtype=dtype, mode="r", shape=shape, offset=offset, order=order)
+    return shared
+
+def _init_search_worker(X_train, y_train):
+    _worker_data["X_train"] = _open_array(X_train)
+    _worker_data["y_train"] = _open_array(y_train)
+
+def _fit_and_score(model, param, train_idx, test_idx):
+    """
+    Fits one candidate on one cv fold and returns its score, nan if the fit fails
+    (same as error_score=nan in RandomizedSearchCV).
+    """
+    X, y = _worker_data["X_train"], _worker_data["y_train"]
     try:
-        report ={}
+        estimator = clone(model).set_params(**param)
+        estimator.fit(X[train_idx], y[train_idx])
+        return estimator.score(X[test_idx], y[test_idx])
+    except Exception:
+        return np.nan
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            param = params[list(models.keys())[i]]
+def _refit(model, param):
+    estimator = clone(model).set_params(**param)
+    return estimator.fit(_worker_data["X_train"], _worker_data["y_train"])
 
-            rs = RandomizedSearchCV(model, param, cv=3)
-            rs.fit(X_train, y_train)
+def _run_search_round(executor, n_workers, models, candidates, splits, deadline):
+    """
+    Scores the given candidates of every model on every split.
+    Candidates of all models are interleaved so a deadline cuts every model's search evenly;
+    fits already running when the deadline passes are allowed to finish.
+    Args:
+        candidates: dict of model name -> list of (candidate_idx, param)
+        deadline: perf_counter value after which no new fit is started, None for no limit
+    Returns:
+        dict of model name -> {candidate_idx: mean cv score} for fully scored candidates,
+        and whether the deadline was hit
+    """
+    tasks = []
+    for position in range(max((len(c) for c in candidates.values()), default=0)):
+        for name in candidates:
+            if position < len(candidates[name]):
+                candidate_idx, param = candidates[name][position]
+                for train_idx, test_idx in splits:
+                    tasks.append((name, candidate_idx, param, train_idx, test_idx))
 
-            model.set_params(**rs.best_params_)
-            model.fit(X_train, y_train)
+    fold_scores = {}
+    deadline_hit = False
+    pending = {}
+    task_iter = iter(tasks)
+    while True:
+        # Keep the pool busy without queueing everything up front, so the deadline is honoured
+        while not deadline_hit and len(pending) < 2 * n_workers:
+            if deadline is not None and time.perf_counter() > deadline:
+                deadline_hit = True
+                logging.info(f"Search time budget exhausted, finishing {len(pending)} running fits")
+                break
+            task = next(task_iter, None)
+            if task is None:
+                break
+            name, candidate_idx, param, train_idx, test_idx = task
+            future = executor.submit(_fit_and_score, models[name], param, train_idx, test_idx)
+            pending[future] = (name, candidate_idx)
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            fold_scores.setdefault(pending.pop(future), []).append(future.result())
 
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
+    mean_scores = {name: {} for name in candidates}
+    for (name, candidate_idx), scores in fold_scores.items():
+        if len(scores) == len(splits) and not np.isnan(scores).any():
+            mean_scores[name][candidate_idx] = float(np.mean(scores))
+    return mean_scores, deadline_hit
+
+def _n_halving_rounds(n_candidates, factor):
+    """
+    Rounds until one candidate is left, keeping 1/factor of the candidates per round
+    """
+    return 1 + int(math.floor(math.log(max(n_candidates, 1), factor)))
+
+def _halving_schedule(n_resources, n_rounds, factor, min_resources):
+    """
+    Resource (training rows or estimators) allowed in each successive halving round,
+    the last round allows all of it.
+    """
+    return [max(min_resources, n_resources // factor ** (n_rounds - 1 - r)) for r in range(n_rounds)]
 
-            train_model_score = r2_score(y_train, y_train_pred)
+def _cap_n_estimators(candidates, default_n_estimators, budget):
+    """
+    Candidates with n_estimators limited to budget, so a round fits at most budget estimators per candidate
+    """
+    return [(idx, {**param, "n_estimators": min(param.get("n_estimators", default_n_estimators), budget)})
+            for idx, param in candidates]
+
+def evaluate_models(X_train, y_train, X_test, y_test, models, params,
+                    n_jobs=-1, time_budget_seconds=None, n_iter=10, cv=3,
+                    search_mode="random", halving_factor=3, halving_resources=("rows", "n_estimators"),
+                    random_state=None):
+    """
+    Hyperparameter search for all models at once.
+    Every (model, candidate, fold) fit is scheduled on one process pool sized to n_jobs
+    (all cores by default). Each model is then refit once with its best parameters and
+    the fitted estimator replaces the entry in `models`.
+    Args:
+        time_budget_seconds: wall clock budget of the search phase, None for no limit
+        search_mode: "random" scores n_iter sampled candidates on all training rows,
+            "halving" scores them on growing budgets and keeps only the best
+            1/halving_factor of candidates for the next round
+        halving_resources: budgets grown by halving rounds, "rows" subsamples the training rows
+            of every model, "n_estimators" caps the estimators of the ensembles (models with an
+            n_estimators parameter), whose fit time grows with their number of estimators
+        random_state: seed of the sampled candidates and of the halving row subsamples,
+            an int makes the search reproducible (the cv splits are not shuffled)
+    Returns:
+        dict of model name -> test score
+    """
+    try:
+        if search_mode not in ("random", "halving"):
+            raise ValueError(f"Unknown search mode: {search_mode}")
+        if not set(halving_resources) <= {"rows", "n_estimators"}:
+            raise ValueError(f"Unknown halving resources: {halving_resources}")
+        report = {}
+        n_workers = get_n_workers(n_jobs)
+        candidates = {name: list(enumerate(ParameterSampler(params[name], n_iter=n_iter, random_state=random_state)))
+                      for name in models}
+        best_params = {name: candidates[name][0][1] if len(candidates[name]) == 1 else {} for name in models}
+
+        start_time = time.perf_counter()
+        deadline = start_time + time_budget_seconds if time_budget_seconds is not None else None
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_search_worker,
+                                 initargs=(_share_array(X_train), _share_array(y_train))) as executor:
+            splits = list(check_cv(cv, y_train, classifier=True).split(X_train, y_train))
+            # Round: (training rows, cv splits, model name -> estimator budget)
+            rounds = [(len(y_train), splits, {})]
+            if search_mode == "halving":
+                n_rounds = _n_halving_rounds(max(len(c) for c in candidates.values()), halving_factor)
+                rounds = [(len(y_train), splits, {}) for _ in range(n_rounds)]
+                if "rows" in halving_resources:
+                    n_classes = len(np.unique(y_train))
+                    schedule = _halving_schedule(len(y_train), n_rounds, halving_factor,
+                                                 min_resources=2 * cv * n_classes)
+                    # Rows are added in one fixed random order so each round extends the previous one
+                    row_order = np.random.default_rng(random_state).permutation(len(y_train))
+                    for round_idx, n_rows in enumerate(schedule):
+                        subset = row_order[:n_rows]
+                        subset_splits = check_cv(cv, y_train[subset], classifier=True).split(
+                            np.zeros(len(subset)), y_train[subset])
+                        rounds[round_idx] = (n_rows, [(subset[tr], subset[te]) for tr, te in subset_splits], {})
+                if "n_estimators" in halving_resources:
+                    for name, model in models.items():
+                        if "n_estimators" not in model.get_params():
+                            continue
+                        max_n_estimators = max(param.get("n_estimators", model.n_estimators)
+                                               for _, param in candidates[name])
+                        schedule = _halving_schedule(max_n_estimators, n_rounds, halving_factor, min_resources=1)
+                        for round_idx, budget in enumerate(schedule):
+                            rounds[round_idx][2][name] = budget
+
+            round_candidates = {name: c for name, c in candidates.items() if len(c) > 1}
+            for round_idx, (n_rows, splits, n_estimators_budgets) in enumerate(rounds):
+                if not round_candidates:
+                    break
+                fit_candidates = {name: _cap_n_estimators(c, models[name].n_estimators, n_estimators_budgets[name])
+                                  if name in n_estimators_budgets else c
+                                  for name, c in round_candidates.items()}
+                mean_scores, deadline_hit = _run_search_round(executor, n_workers, models,
+                                                              fit_candidates, splits, deadline)
+                params_by_idx = {name: dict(c) for name, c in round_candidates.items()}
+                next_candidates = {}
+                for name, scores in mean_scores.items():
+                    if not scores:
+                        continue
+                    ranked = sorted(scores, key=scores.get, reverse=True)
+                    best_params[name] = params_by_idx[name][ranked[0]]
+                    n_keep = int(math.ceil(len(ranked) / halving_factor))
+                    if n_keep > 1:
+                        next_candidates[name] = [(idx, params_by_idx[name][idx]) for idx in ranked[:n_keep]]
+                logging.info(f"Search round {round_idx} on {n_rows} rows, estimator budgets {n_estimators_budgets}: "
+                             f"{ {name: len(scores) for name, scores in mean_scores.items()} } candidates scored")
+                round_candidates = next_candidates
+                if deadline_hit:
+                    break
+            search_seconds = time.perf_counter() - start_time
+
+            for name in models:
+                logging.info(f"{name}: best params {best_params[name]}")
+            refit_futures = {name: executor.submit(_refit, models[name], best_params[name]) for name in models}
+            for name, future in refit_futures.items():
+                models[name] = future.result()
+
+        logging.info(f"{search_mode} search with {n_workers} workers took {search_seconds:.1f}s, "
+                     f"total with refit {time.perf_counter() - start_time:.1f}s")
+
+        for name, model in models.items():
+            y_test_pred = model.predict(X_test)
             test_model_score = r2_score(y_test, y_test_pred)
+            report[name] = test_model_score
 
-            report[list(models.keys())[i]] = test_model_score
+        return report
 
-        return report 
-    
     except Exception as e:
         raise NetworkSecurityException(e, sys)
-    
\ No newline at end of file
@@ -0,0 +1,106 @@
+import sys
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.impute import KNNImputer
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+
+IMPUTER_STRATEGIES = ("mode", "knn", "full_knn")
+
+class FastImputer(BaseEstimator, TransformerMixin):
+    """
+    Missing value imputer for the preprocessing pipeline. Inputs without missing values
+    are returned as they are, which is the common case for online scoring.
+    Strategies:
+        mode: most frequent value of every feature
+        knn: mean of the n_neighbors nearest rows of a bounded random sample of complete
+            training rows (nan euclidean distance), cost is independent of the training size
+        full_knn: sklearn KNNImputer over the whole training set, an explicit opt-in as its
+            cost grows with the training size
+    The knn sample trades accuracy for a bounded cost, on the bundled dataset it is about 20 times
+    faster than full_knn with about 1.5 times its error (see benchmark_imputer.py).
+    With round_to_codes the knn means are rounded to the nearest value, so imputed features are
+    integer codes like the observed ones, in the training arrays and when the model is served.
+    """
+    def __init__(self, strategy: str = "mode", n_neighbors: int = 3, reference_size: int = 2000,
+                 chunk_elements: int = 1000000, random_state: int = 42, round_to_codes: bool = False):
+        self.strategy = strategy
+        self.n_neighbors = n_neighbors
+        self.reference_size = reference_size
+        self.chunk_elements = chunk_elements
+        self.random_state = random_state
+        self.round_to_codes = round_to_codes
+
+    def fit(self, X, y=None):
+        try:
+            if self.strategy not in IMPUTER_STRATEGIES:
+                raise ValueError(f"Unknown imputer strategy: {self.strategy}")
+            X = np.asarray(X, dtype=np.float64)
+            missing = np.isnan(X)
+            self.n_features_in_ = X.shape[1]
+            self.strategy_ = self.strategy
+
+            self.modes_ = np.zeros(X.shape[1])
+            for i in range(X.shape[1]):
+                values, counts = np.unique(X[~missing[:, i], i], return_counts=True)
+                if len(values):
+                    self.modes_[i] = values[np.argmax(counts)]
+
+            if self.strategy_ == "knn":
+                complete_rows = X[~missing.any(axis=1)]
+                rng = np.random.default_rng(self.random_state)
+                n_reference = min(self.reference_size, len(complete_rows))
+                self.reference_ = complete_rows[rng.choice(len(complete_rows), n_reference, replace=False)]
+            elif self.strategy_ == "full_knn":
+                self.knn_imputer_ = KNNImputer(n_neighbors=self.n_neighbors).fit(X)
+            return self
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def _impute_knn(self, X: np.ndarray, missing: np.ndarray)->np.ndarray:
+        rows = np.flatnonzero(missing.any(axis=1))
+        reference = self.reference_
+        n_neighbors = min(self.n_neighbors, len(reference))
+        if n_neighbors == 0:
+            X[missing] = np.take(self.modes_, np.nonzero(missing)[1])
+            return X
+        # Squared distance over the observed features expanded into matrix products,
+        # sum(x^2) - 2 x.r + observed.r^2, in chunks of rows bounded by chunk_elements
+        reference_squared = (reference ** 2).T
+        chunk_rows = max(1, self.chunk_elements // max(len(reference), 1))
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            observed = ~missing[chunk]
+            values = np.where(observed, X[chunk], 0.0)
+            distances = ((values ** 2).sum(axis=1)[:, None] - 2 * values @ reference.T
+                         + observed.astype(np.float64) @ reference_squared)
+            # Rescaling by the observed feature count does not change the neighbour order
+            neighbours = np.argpartition(distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            X[chunk] = np.where(observed, X[chunk], reference[neighbours].mean(axis=1))
+        return X
+
+    def transform(self, X):
+        try:
+            X = np.asarray(X)
+            if X.dtype.kind != "f":
+                return X
+            missing = np.isnan(X)
+            if not missing.any():
+                return X
+
+            # Imputers pickled before strategy_ was recorded at fit time have none
+            strategy = getattr(self, "strategy_", self.strategy)
+            if strategy == "full_knn":
+                X = self.knn_imputer_.transform(X)
+            elif strategy == "knn":
+                X = self._impute_knn(X.astype(np.float64), missing)
+            else:
+                X = X.astype(np.float64)
+                X[missing] = np.take(self.modes_, np.nonzero(missing)[1])
+            # Preprocessors pickled before round_to_codes existed do not round
+            if getattr(self, "round_to_codes", False):
+                X = np.rint(X)
+            return X
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -0,0 +1,107 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.utils.ml_utils.model.estimator import NetworkModel
+
+class MemoizedScorer:
+    """
+    Bounded LRU cache of predictions in front of NetworkModel.predict.
+    Every feature takes one of a few integer values, so a row is packed into one integer key
+    (base len(domain), one digit per feature) and repeated feature vectors are served from
+    the cache. Cache misses of a batch are scored together in one model call; rows with
+    values outside the domain (e.g. missing values) are always scored by the model.
+    """
+    def __init__(self, network_model: NetworkModel, feature_columns: list, max_size: int,
+                 domain: list = (-1, 0, 1)):
+        try:
+            self.network_model = network_model
+            self.feature_columns = feature_columns
+            self.max_size = max_size
+            self.domain_min = int(min(domain))
+            self.n_codes = int(max(domain)) - self.domain_min + 1
+            if self.n_codes ** len(feature_columns) >= 2 ** 63:
+                raise ValueError("Feature space is too large to pack rows into int64 keys")
+            self.powers = self.n_codes ** np.arange(len(feature_columns), dtype=np.int64)
+            self.cache = OrderedDict()
+            self.lock = threading.Lock()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.uncacheable = 0
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def encode(self, dataframe: pd.DataFrame):
+        """
+        Returns:
+            (int64 key of every row, boolean mask of rows whose values are all in the domain)
+        """
+        if list(dataframe.columns) != self.feature_columns:
+            dataframe = dataframe[self.feature_columns]
+        values = dataframe.to_numpy()
+        if values.dtype.kind not in "iuf":
+            values = values.astype(np.float64)
+        codes = values - self.domain_min
+        valid = ((codes >= 0) & (codes < self.n_codes)).all(axis=1)
+        if codes.dtype.kind == "f":
+            # Missing or fractional values cannot be packed
+            valid &= (codes == np.rint(codes)).all(axis=1)
+        keys = np.where(valid[:, None], codes, 0).astype(np.int64) @ self.powers
+        return keys, valid
+
+    def predict(self, dataframe: pd.DataFrame)->np.ndarray:
+        try:
+            keys, valid = self.encode(dataframe)
+            predictions = [None] * len(keys)
+            missing_rows = {}
+            with self.lock:
+                for i, key in enumerate(keys.tolist()):
+                    if not valid[i]:
+                        missing_rows.setdefault(("row", i), []).append(i)
+                        continue
+                    prediction = self.cache.get(key)
+                    if prediction is None:
+                        missing_rows.setdefault(key, []).append(i)
+                    else:
+                        self.cache.move_to_end(key)
+                        predictions[i] = prediction
+                        self.hits += 1
+
+            if missing_rows:
+                # One model call for the distinct missing keys of the whole batch
+                first_rows = [rows[0] for rows in missing_rows.values()]
+                scored = self.network_model.predict(dataframe.iloc[first_rows])
+                with self.lock:
+                    for (key, rows), prediction in zip(missing_rows.items(), scored):
+                        for i in rows:
+                            predictions[i] = prediction
+                        if isinstance(key, tuple):
+                            self.uncacheable += 1
+                            continue
+                        self.misses += 1
+                        self.hits += len(rows) - 1
+                        self.cache[key] = prediction
+                        if len(self.cache) > self.max_size:
+                            self.cache.popitem(last=False)
+                            self.evictions += 1
+            return np.array(predictions)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def stats(self)->dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "uncacheable": self.uncacheable,
+                "size": len(self.cache),
+                "max_size": self.max_size
+            }
@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import shutil
+from datetime import datetime
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.utils.common.functions import write_model_artifact, load_model_artifact
+
+VERSION_METADATA_FILE_NAME = "version.json"
+CURRENT_FILE_NAME = "CURRENT"
+
+class ModelRegistry:
+    """
+    Versioned local registry of serving models. A version is one NetworkModel (preprocessor
+    and model together) saved as a memory mapped model artifact under versions/<version>,
+    with the files that belong to it (the drift reference of its training data), so a reader
+    can never pair the preprocessor of one training run with the model of another.
+    The CURRENT file names the version to serve; it is replaced atomically once the version
+    is complete, so readers see either the old or the new version.
+    """
+    def __init__(self, registry_dir: str, keep_versions: int = None):
+        try:
+            self.registry_dir = registry_dir
+            self.versions_dir = os.path.join(registry_dir, "versions")
+            self.current_file_path = os.path.join(registry_dir, CURRENT_FILE_NAME)
+            self.keep_versions = keep_versions
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def version_dir(self, version: str)->str:
+        return os.path.join(self.versions_dir, version)
+
+    def list_versions(self)->list:
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir)
+                      if os.path.exists(os.path.join(self.versions_dir, name, VERSION_METADATA_FILE_NAME)))
+
+    def current_version(self):
+        """
+        Returns:
+            the version to serve, None if nothing was published yet
+        """
+        try:
+            if not os.path.exists(self.current_file_path):
+                return None
+            with open(self.current_file_path) as file_obj:
+                return file_obj.read().strip() or None
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def set_current(self, version: str)->None:
+        """
+        Points CURRENT to an existing version, also used to roll back.
+        """
+        try:
+            if version not in self.list_versions():
+                raise ValueError(f"Unknown model version {version}")
+            with open(self.current_file_path + ".tmp", "w") as file_obj:
+                file_obj.write(version)
+            os.replace(self.current_file_path + ".tmp", self.current_file_path)
+            logging.info(f"Model registry now serves version {version}")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def publish(self, network_model: "NetworkModel", metadata: dict = None, files: list = ())->str:
+        """
+        Saves network_model as the next version and makes it current.
+        Args:
+            files: paths of files that belong to the version (e.g. drift reference histograms), copied
+                into it under their file names
+        Returns:
+            the new version, e.g. "v000003"
+        """
+        try:
+            os.makedirs(self.versions_dir, exist_ok=True)
+            number = max([int(name[1:7]) for name in os.listdir(self.versions_dir)
+                          if name[:1] == "v" and name[1:7].isdigit()] + [0])
+            # mkdir fails if the name is taken, so concurrent publishers get distinct versions
+            while True:
+                number += 1
+                version = f"v{number:06d}"
+                try:
+                    os.mkdir(self.version_dir(version))
+                    break
+                except FileExistsError:
+                    continue
+
+            write_model_artifact(self.version_dir(version), network_model)
+            for file_path in files:
+                shutil.copy2(file_path, os.path.join(self.version_dir(version), os.path.basename(file_path)))
+            version_metadata = {"version": version, "created_at": datetime.now().isoformat(timespec="seconds"),
+                                **(metadata or {})}
+            with open(os.path.join(self.version_dir(version), VERSION_METADATA_FILE_NAME), "w") as file_obj:
+                json.dump(version_metadata, file_obj, indent=2, default=str)
+            self.set_current(version)
+            self.prune()
+            return version
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def load(self, version: str = None)->"NetworkModel":
+        """
+        Loads a version, the current one by default.
+        """
+        try:
+            version = version or self.current_version()
+            if version is None:
+                raise ValueError(f"No model version is published in {self.registry_dir}")
+            return load_model_artifact(self.version_dir(version))
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def version_file_path(self, version: str, file_name: str):
+        """
+        Returns:
+            path of a file published with the version, None if it has no such file
+        """
+        file_path = os.path.join(self.version_dir(version), file_name)
+        return file_path if os.path.exists(file_path) else None
+
+    def load_metadata(self, version: str)->dict:
+        try:
+            with open(os.path.join(self.version_dir(version), VERSION_METADATA_FILE_NAME)) as file_obj:
+                return json.load(file_obj)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def prune(self)->None:
+        """
+        Removes the oldest versions beyond keep_versions, never the current one. A serving
+        process that still maps a removed version keeps working from the open mapping.
+        """
+        try:
+            if self.keep_versions is None:
+                return
+            current = self.current_version()
+            versions = self.list_versions()
+            for version in versions[:max(0, len(versions) - self.keep_versions)]:
+                if version != current:
+                    shutil.rmtree(self.version_dir(version), ignore_errors=True)
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
@@ -0,0 +1,253 @@
+import os
+import sys
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import create_model
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.logging.logger import logging
+from NetworkSecurity.constants.training_pipeline import (SCHEMA_FILE_PATH, TARGET_COLUMN, FINAL_DRIFT_REFERENCE_FILE_NAME,
+                                                         APP_HOST, APP_PORT, APP_MAX_BATCH_SIZE,
+                                                         APP_WARMUP_ROUNDS, APP_LATENCY_BUCKETS_MS,
+                                                         APP_COALESCE_MAX_WAIT_MS, APP_COALESCE_MAX_BATCH_SIZE,
+                                                         APP_SCORE_CACHE_SIZE, DATA_VALIDATION_FEATURE_DOMAIN,
+                                                         APP_MODEL_WATCH_INTERVAL_SECONDS, MODEL_REGISTRY_DIR)
+from NetworkSecurity.entity.config_entity import DriftMonitorConfig
+from NetworkSecurity.utils.common.functions import read_yaml_file
+from NetworkSecurity.utils.common.histogram import LatencyHistogram
+from NetworkSecurity.utils.ml_utils.model.estimator import NetworkModel
+from NetworkSecurity.utils.ml_utils.model.coalescer import PredictionCoalescer
+from NetworkSecurity.utils.ml_utils.model.memoized_scorer import MemoizedScorer
+from NetworkSecurity.utils.ml_utils.model.registry import ModelRegistry
+from NetworkSecurity.utils.ml_utils.metric.drift_monitor import DriftMonitor
+
+# Input schema is compiled once from schema.yaml, every feature column is a required int
+schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+FEATURE_COLUMNS = [list(column.keys())[0] for column in schema_config["columns"]
+                   if list(column.keys())[0] != TARGET_COLUMN]
+NetworkFeatures = create_model("NetworkFeatures", **{column: (int, ...) for column in FEATURE_COLUMNS})
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR)
+
+class ModelState:
+    network_model: NetworkModel = None
+    scorer: MemoizedScorer = None
+    coalescer: PredictionCoalescer = None
+    drift_monitor: DriftMonitor = None
+    model_version: str = None
+    failed_model_version: str = None
+    model_swaps: int = 0
+    is_warm: bool = False
+    latency = {
+        "predict": LatencyHistogram(APP_LATENCY_BUCKETS_MS),
+        "predict_batch": LatencyHistogram(APP_LATENCY_BUCKETS_MS)
+    }
+
+def warm_up(network_model: NetworkModel)->None:
+    """
+    Runs a few predictions so first real requests do not pay lazy initialisation costs.
+    """
+    try:
+        warmup_df = pd.DataFrame([[0] * len(FEATURE_COLUMNS)], columns=FEATURE_COLUMNS)
+        for _ in range(APP_WARMUP_ROUNDS):
+            network_model.predict(warmup_df)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def build_drift_monitor(version: str):
+    """
+    Drift monitor against the training data of a registry version, None if the version has no drift reference.
+    """
+    try:
+        drift_monitor_config = DriftMonitorConfig()
+        drift_monitor_config.reference_file_path = model_registry.version_file_path(version,
+                                                                                    FINAL_DRIFT_REFERENCE_FILE_NAME)
+        if drift_monitor_config.reference_file_path is None:
+            logging.info(f"No drift reference histograms for model version {version}, live drift monitoring is disabled")
+            return None
+        return DriftMonitor(drift_monitor_config, FEATURE_COLUMNS)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def build_serving_model(version: str):
+    """
+    Loads a registry version, warms it up and gives it
+    its own prediction cache, as cached predictions of the previous version must not be reused,
+    and its own drift monitor, as drift is measured against the training data of the served model.
+    Returns:
+        (network model, scorer or None, drift monitor or None)
+    """
+    try:
+        network_model = model_registry.load(version)
+        warm_up(network_model)
+        scorer = None
+        if APP_SCORE_CACHE_SIZE > 0:
+            scorer = MemoizedScorer(network_model, FEATURE_COLUMNS,
+                                    max_size=APP_SCORE_CACHE_SIZE, domain=DATA_VALIDATION_FEATURE_DOMAIN)
+        return network_model, scorer, build_drift_monitor(version)
+    except Exception as e:
+        raise NetworkSecurityException(e, sys)
+
+def swap_serving_model(network_model: NetworkModel, scorer: MemoizedScorer, drift_monitor: DriftMonitor,
+                       version: str)->None:
+    """
+    Every assignment replaces one reference and a scorer wraps its own model, so each request
+    is scored wholly by the old or wholly by the new version, batches in flight finish on the old one.
+    The drift window starts empty with the new version.
+    """
+    if ModelState.coalescer is not None:
+        # The coalescer only needs .predict, so it scores through the cache when there is one
+        ModelState.coalescer.network_model = scorer or network_model
+    ModelState.scorer = scorer
+    ModelState.network_model = network_model
+    ModelState.drift_monitor = drift_monitor
+    ModelState.model_version = version
+
+async def watch_model_registry(interval_seconds: float)->None:
+    """
+    Hot swaps in a new current registry version: it is loaded and warmed in a worker thread
+    while the old version keeps serving, then swapped in. A version that fails to load is
+    not retried until another one is published.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        version = None
+        try:
+            version = model_registry.current_version()
+            if version is None or version in (ModelState.model_version, ModelState.failed_model_version):
+                continue
+            start_time = time.perf_counter()
+            network_model, scorer, drift_monitor = await asyncio.to_thread(build_serving_model, version)
+            previous_version = ModelState.model_version
+            swap_serving_model(network_model, scorer, drift_monitor, version)
+            ModelState.model_swaps += 1
+            logging.info(f"Swapped serving model {previous_version} -> {version}, "
+                         f"loaded and warmed in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+        except Exception as e:
+            ModelState.failed_model_version = version
+            logging.info(f"Loading model version {version} failed, still serving {ModelState.model_version}: {e}")
+
+async def flush_drift_monitor(interval_seconds: float)->None:
+    """
+    Adds the rows queued by request handlers to the window of the drift monitor being served,
+    in a worker thread so counting never runs on the event loop. Rows queued for a monitor that
+    was swapped out are dropped with it, as the window starts empty with the new version.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            drift_monitor = ModelState.drift_monitor
+            if drift_monitor is not None and drift_monitor.pending:
+                await asyncio.to_thread(drift_monitor.flush)
+        except Exception as e:
+            logging.info(f"Drift monitor flush failed: {e}")
+
+async def run_drift_checks(interval_seconds: float)->None:
+    """
+    Checks the drift monitor of the model being served, it changes when the model is swapped
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            drift_monitor = ModelState.drift_monitor
+            if drift_monitor is not None:
+                await asyncio.to_thread(drift_monitor.check)
+        except Exception as e:
+            logging.info(f"Drift check failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.info("Loading final preprocessor and model for online prediction")
+    start_time = time.perf_counter()
+    version = model_registry.current_version()
+    swap_serving_model(*build_serving_model(version), version)
+    logging.info(f"Model version {version} loaded and warmed in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+    ModelState.coalescer = PredictionCoalescer(network_model=ModelState.scorer or ModelState.network_model,
+                                               feature_columns=FEATURE_COLUMNS,
+                                               max_wait_ms=APP_COALESCE_MAX_WAIT_MS,
+                                               max_batch_size=APP_COALESCE_MAX_BATCH_SIZE,
+                                               latency_buckets_ms=APP_LATENCY_BUCKETS_MS)
+    await ModelState.coalescer.start()
+    drift_monitor_config = DriftMonitorConfig()
+    drift_task = asyncio.create_task(run_drift_checks(drift_monitor_config.check_interval_seconds))
+    flush_task = asyncio.create_task(flush_drift_monitor(drift_monitor_config.flush_interval_seconds))
+    watch_task = asyncio.create_task(watch_model_registry(APP_MODEL_WATCH_INTERVAL_SECONDS))
+    ModelState.is_warm = True
+    logging.info("Model loaded and warm, serving predictions")
+    yield
+    ModelState.is_warm = False
+    watch_task.cancel()
+    drift_task.cancel()
+    flush_task.cancel()
+    await ModelState.coalescer.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+def predict_rows(rows: list)->list:
+    if not ModelState.is_warm:
+        raise HTTPException(status_code=503, detail="Model is not loaded yet")
+    dataframe = pd.DataFrame([row.model_dump() for row in rows], columns=FEATURE_COLUMNS)
+    drift_monitor = ModelState.drift_monitor
+    if drift_monitor is not None:
+        drift_monitor.record(dataframe.to_numpy())
+    scorer = ModelState.scorer or ModelState.network_model
+    return [int(y) for y in scorer.predict(dataframe)]
+
+@app.get("/health")
+def health():
+    if ModelState.is_warm:
+        return {"status": "ok", "model_version": ModelState.model_version}
+    return JSONResponse(status_code=503, content={"status": "loading"})
+
+@app.post("/predict")
+async def predict(features: NetworkFeatures):
+    if not ModelState.is_warm:
+        raise HTTPException(status_code=503, detail="Model is not loaded yet")
+    start_time = time.perf_counter()
+    # Concurrent single-row requests are coalesced into one vectorized predict
+    row = features.model_dump()
+    prediction = int(await ModelState.coalescer.predict(row))
+    drift_monitor = ModelState.drift_monitor
+    if drift_monitor is not None:
+        # Only queued here, flush_drift_monitor counts the rows off the event loop
+        drift_monitor.record([[row[column] for column in FEATURE_COLUMNS]])
+    ModelState.latency["predict"].record((time.perf_counter() - start_time) * 1000)
+    return {"prediction": prediction}
+
+@app.post("/predict/batch")
+def predict_batch(rows: list[NetworkFeatures]):
+    if len(rows) > APP_MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size is limited to {APP_MAX_BATCH_SIZE} rows")
+    start_time = time.perf_counter()
+    predictions = predict_rows(rows) if rows else []
+    ModelState.latency["predict_batch"].record((time.perf_counter() - start_time) * 1000)
+    return {"predictions": predictions}
+
+@app.get("/metrics")
+def metrics():
+    report = {name: histogram.snapshot() for name, histogram in ModelState.latency.items()}
+    if ModelState.coalescer is not None:
+        report["coalescer"] = ModelState.coalescer.stats()
+    if ModelState.scorer is not None:
+        report["score_cache"] = ModelState.scorer.stats()
+    report["model"] = {"version": ModelState.model_version, "swaps": ModelState.model_swaps,
+                       "failed_version": ModelState.failed_model_version}
+    return report
+
+@app.get("/drift")
+def drift():
+    drift_monitor = ModelState.drift_monitor
+    if drift_monitor is None:
+        return JSONResponse(status_code=404, content={"status": "drift monitoring disabled"})
+    if drift_monitor.last_report is None:
+        return {"status": "no drift check has run yet"}
+    return drift_monitor.last_report
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=APP_HOST, port=APP_PORT)
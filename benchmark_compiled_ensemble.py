@@ -0,0 +1,101 @@
+"""
+Benchmark of the compiled tree ensemble kernel against sklearn's predict on the bundled dataset.
+Every ensemble ModelTrainer searches (random forest, gradient boosting, AdaBoost) is fitted on the
+training features (-1 mapped to 0, int8, as DataTransformation produces them), then timed on:
+    single row          median latency of one row predictions (online scoring)
+    100k sampled rows   rows drawn from the test set, many duplicates (typical traffic)
+    100k distinct rows  random rows of the feature domain, almost all distinct (historical dumps)
+for sklearn, the compiled kernel alone, and the compiled model as served (with the sklearn fallback
+for large batches of mostly distinct rows). Predictions are checked to be identical.
+
+python benchmark_compiled_ensemble.py
+python benchmark_compiled_ensemble.py --n-estimators 256 --rows 200000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from NetworkSecurity.constants.training_pipeline import (TARGET_COLUMN, DATA_INGESTIONTRAIN_TEST_SPLIT_RATIO,
+                                                         DATA_VALIDATION_FEATURE_DOMAIN,
+                                                         MODEL_TRAINER_COMPILED_FALLBACK_MIN_ROWS,
+                                                         MODEL_TRAINER_COMPILED_FALLBACK_DISTINCT_RATIO)
+from NetworkSecurity.utils.ml_utils.model.compiled_ensemble import CompiledEnsemble
+
+DATA_FILE_PATH = os.path.join(ROOT_DIR, "Network_Data", "phisingData.csv")
+SINGLE_ROW_CALLS = 200
+REPEATS = 3
+
+def load_data(seed: int)->tuple:
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    X = dataframe.drop(columns=[TARGET_COLUMN]).replace(-1, 0).to_numpy(dtype=np.int8)
+    y = dataframe[TARGET_COLUMN].to_numpy(dtype=np.int8)
+    return train_test_split(X, y, test_size=DATA_INGESTIONTRAIN_TEST_SPLIT_RATIO, random_state=seed)
+
+def single_row_ms(model, X: np.ndarray)->float:
+    seconds = []
+    for row in X[:SINGLE_ROW_CALLS]:
+        row = row[None, :]
+        start_time = time.perf_counter()
+        model.predict(row)
+        seconds.append(time.perf_counter() - start_time)
+    return float(np.median(seconds)) * 1000
+
+def batch_seconds(model, X: np.ndarray)->float:
+    seconds = []
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        model.predict(X)
+        seconds.append(time.perf_counter() - start_time)
+    return min(seconds)
+
+def run(model, X_train, y_train, batches: dict)->dict:
+    model.fit(X_train, y_train)
+    served = CompiledEnsemble(model, domain=DATA_VALIDATION_FEATURE_DOMAIN,
+                              fallback_min_rows=MODEL_TRAINER_COMPILED_FALLBACK_MIN_ROWS,
+                              fallback_distinct_ratio=MODEL_TRAINER_COMPILED_FALLBACK_DISTINCT_RATIO)
+    kernel = CompiledEnsemble(model, domain=DATA_VALIDATION_FEATURE_DOMAIN)
+    kernel.fallback_model = None
+    predictors = {"sklearn": model, "kernel": kernel, "served": served}
+    result = {name: {"single_row_ms": single_row_ms(predictor, batches["sampled"])}
+              for name, predictor in predictors.items()}
+    for batch_name, X in batches.items():
+        expected = model.predict(X)
+        for name, predictor in predictors.items():
+            assert np.array_equal(predictor.predict(X), expected), f"{name} predictions differ on {batch_name} rows"
+            result[name][batch_name] = batch_seconds(predictor, X)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n-estimators", type=int, default=128)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    X_train, X_test, y_train, y_test = load_data(args.seed)
+    rng = np.random.default_rng(args.seed)
+    batches = {
+        "sampled": X_test[rng.integers(0, len(X_test), size=args.rows)],
+        "distinct": rng.choice(np.unique(X_train), size=(args.rows, X_train.shape[1])).astype(np.int8)
+    }
+    models = {
+        "Random Forest": RandomForestClassifier(n_estimators=args.n_estimators, random_state=0),
+        "Gradient Boosting": GradientBoostingClassifier(n_estimators=args.n_estimators, random_state=0),
+        "AdaBoost": AdaBoostClassifier(n_estimators=args.n_estimators, random_state=0),
+    }
+    print(f"{len(X_train)} train rows, {args.n_estimators} estimators, batches of {args.rows} rows")
+    print(f"{'model':<18} {'predictor':<8} {'single row':>12} {'sampled':>10} {'distinct':>10}")
+    for model_name, model in models.items():
+        for name, timings in run(model, X_train, y_train, batches).items():
+            print(f"{model_name:<18} {name:<8} {timings['single_row_ms']:9.3f}ms "
+                  f"{timings['sampled']:9.3f}s {timings['distinct']:9.3f}s")
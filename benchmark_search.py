@@ -0,0 +1,95 @@
+"""
+Benchmark of the hyperparameter search of ModelTrainer on the bundled dataset.
+Compares wall time and the test F1 score of the selected model for:
+    randomized_search_cv    one RandomizedSearchCV per model, then a refit (the search before evaluate_models)
+    random                  evaluate_models, every sampled candidate on all rows
+    halving (<resources>)   evaluate_models successive halving on rows, n_estimators or both
+
+python benchmark_search.py                      # n_iter=10 on every core
+python benchmark_search.py --n-iter 30 --n-jobs 1
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from sklearn.base import clone
+from sklearn.model_selection import RandomizedSearchCV, train_test_split
+from sklearn.metrics import r2_score
+
+from NetworkSecurity.components.model_trainer import ModelTrainer
+from NetworkSecurity.constants.training_pipeline import TARGET_COLUMN, DATA_INGESTIONTRAIN_TEST_SPLIT_RATIO
+from NetworkSecurity.utils.ml_utils.metric.classification_metric import get_classification_score
+from NetworkSecurity.utils.ml_utils.model.evaluate import evaluate_models
+from NetworkSecurity.utils.common.functions import get_n_workers
+
+DATA_FILE_PATH = os.path.join(ROOT_DIR, "Network_Data", "phisingData.csv")
+
+def load_data(seed: int)->tuple:
+    """
+    Features and labels as DataTransformation produces them (-1 features mapped to 0, int8)
+    """
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    X = dataframe.drop(columns=[TARGET_COLUMN]).replace(-1, 0).to_numpy(dtype=np.int8)
+    y = dataframe[TARGET_COLUMN].to_numpy(dtype=np.int8)
+    return train_test_split(X, y, test_size=DATA_INGESTIONTRAIN_TEST_SPLIT_RATIO, random_state=seed)
+
+def randomized_search_cv(X_train, y_train, X_test, y_test, models, params, n_iter, n_jobs, seed):
+    report = {}
+    for name, model in models.items():
+        search = RandomizedSearchCV(model, params[name], n_iter=n_iter, cv=3, n_jobs=n_jobs,
+                                    random_state=seed)
+        search.fit(X_train, y_train)
+        models[name] = clone(model).set_params(**search.best_params_).fit(X_train, y_train)
+        report[name] = r2_score(y_test, models[name].predict(X_test))
+    return report
+
+def run(method: str, X_train, y_train, X_test, y_test, n_iter: int, n_jobs: int, seed: int)->dict:
+    models, params = ModelTrainer.get_search_space()
+    for model in models.values():
+        if "verbose" in model.get_params():
+            model.set_params(verbose=0)
+    start_time = time.perf_counter()
+    if method == "randomized_search_cv":
+        report = randomized_search_cv(X_train, y_train, X_test, y_test, models, params, n_iter, n_jobs, seed)
+    elif method == "random":
+        report = evaluate_models(X_train, y_train, X_test, y_test, models, params, n_jobs=n_jobs, n_iter=n_iter,
+                                 random_state=seed)
+    else:
+        resources = tuple(method.split(":")[1].split("+"))
+        report = evaluate_models(X_train, y_train, X_test, y_test, models, params, n_jobs=n_jobs, n_iter=n_iter,
+                                 search_mode="halving", halving_resources=resources, random_state=seed)
+    seconds = time.perf_counter() - start_time
+    # Same selection as ModelTrainer.train_model
+    best_name = max(report, key=report.get)
+    f1_score = get_classification_score(y_test, models[best_name].predict(X_test)).f1_score
+    return {"seconds": seconds, "best_model": best_name, "test_f1_score": f1_score}
+
+METHODS = ["randomized_search_cv", "random", "halving:rows", "halving:n_estimators", "halving:rows+n_estimators"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--n-iter", type=int, default=10)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS)
+    args = parser.parse_args()
+
+    # Invalid sampled candidates (e.g. max_features="auto") fail to fit and score nan, as in training
+    warnings.filterwarnings("ignore")
+    X_train, X_test, y_train, y_test = load_data(args.seed)
+    print(f"{len(X_train)} train rows, n_iter={args.n_iter}, {get_n_workers(args.n_jobs)} workers")
+    results = {method: run(method, X_train, y_train, X_test, y_test, args.n_iter, args.n_jobs, args.seed)
+               for method in args.methods}
+    baseline = results.get("randomized_search_cv")
+    for method, result in results.items():
+        speedup = f"{baseline['seconds'] / result['seconds']:5.1f}x" if baseline else ""
+        print(f"{method:<27} {result['seconds']:7.1f}s {speedup}  F1 {result['test_f1_score']:.4f}  "
+              f"({result['best_model']})")
@@ -1,56 +1,93 @@
 import sys
-from NetworkSecurity.components.data_ingestion import DataIngestion
-from NetworkSecurity.exception.exception import NetworkSecurityException 
+import argparse
+from NetworkSecurity.exception.exception import NetworkSecurityException
 from NetworkSecurity.logging.logger import logging
-from NetworkSecurity.entity.config_entity import (DataIngestionConfig, TrainingPipelineConfig , 
-                                                  DataValidationConfig, DataTransformationConfig,
-                                                   ModelTrainerConfig )
-from NetworkSecurity.entity.artifact_entity import (DataIngestionArtifact, DataValidationArtifacts,
-                                                    DataTransformationArtifacts, ModelTrainerArtifacts)
-from NetworkSecurity.components.data_validation import DataValidation 
-from NetworkSecurity.components.data_transformation import DataTransformation
-from NetworkSecurity.components.model_trainer import ModelTrainer
-from NetworkSecurity.pipeline.training_pipeline import TrainingPipeline
 
+# Every command imports only the modules it runs, e.g. predict never imports the training
+# components or the experiment tracker. Keep heavy imports inside the command functions,
+# test_import_time.py checks the cost of starting each command.
 
-if __name__=="__main__":
-    try:
-        # training_pipeline_config = TrainingPipelineConfig()
-
-        # data_ingestion_config = DataIngestionConfig(training_pipeline_config)
-        # data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
-        # logging.info("Initiated data Ingestion")
-        # data_ingestion_artifacts = data_ingestion.initiate_data_ingestion()
-        # logging.info("Data Ingestion completed")
-        # print(data_ingestion_artifacts)
-
-        # data_validation_config = DataValidationConfig(training_pipeline_config)
-        # data_validation = DataValidation(data_ingestion_artifacts=data_ingestion_artifacts,
-        #                data_validation_config=data_validation_config)
-        # logging.info("Initiating data validation")
-        # data_validation_artifacts = data_validation.initiate_data_validation()
-        # logging.info("Data validation completed")
-        # print(data_validation_artifacts)
-
-        # data_transformation_config = DataTransformationConfig(training_pipeline_config)
-        # data_transformation = DataTransformation(data_validation_artifacts= data_validation_config, 
-        #                                          data_transformation_config=data_transformation_config)
-        # logging.info("Initiated Data Transformation")
-        # data_transformation_artifacts = data_transformation.initiate_data_transformation()
-        # logging.info("Data Transformation Completed")
-        # print(data_transformation_artifacts)
-
-        # logging.info("Initiating Model Trainer")
-        # model_trainer_config = ModelTrainerConfig(training_pipeline_config)
-        # model_trainer = ModelTrainer(model_trainer_config=model_trainer_config, 
-        #                              data_transformation_artifacts=data_transformation_artifacts)
-        # model_trainer_artifacts = model_trainer.initiate_model_trainer()
-        # logging.info("Model Trainer Artifacts Created")
-        training_pipeline = TrainingPipeline()
-        training_pipeline.run_pipeline()
+# Stage each command runs, and the stage whose artifacts it continues from
+STAGE_COMMANDS = {
+    "ingest": ("data_ingestion", None),
+    "validate": ("data_validation", "data_ingestion"),
+    "transform": ("data_transformation", "data_validation"),
+    "train": ("model_training", "data_transformation"),
+}
+
+def get_training_pipeline(previous_stage: str, run_timestamp: str = None):
+    """
+    Pipeline continuing run_timestamp, by default the newest run that completed previous_stage
+    """
+    from NetworkSecurity.pipeline.training_pipeline import TrainingPipeline
+    if previous_stage is None:
+        return TrainingPipeline()
+    run_timestamp = run_timestamp or TrainingPipeline.get_latest_run_timestamp(previous_stage)
+    if run_timestamp is None:
+        raise ValueError(f"No run has completed {previous_stage} yet")
+    return TrainingPipeline(run_timestamp=run_timestamp)
+
+def run_stage(args):
+    stage_name, previous_stage = STAGE_COMMANDS[args.command]
+    training_pipeline = get_training_pipeline(previous_stage, getattr(args, "run", None))
+    logging.info(f"Running {stage_name} of run {training_pipeline.training_pipeline_config.timestamp}")
+    if stage_name == "data_ingestion":
+        artifacts = training_pipeline.start_data_ingestion()
+    elif stage_name == "data_validation":
+        artifacts = training_pipeline.start_data_validation(training_pipeline.load_stage_artifacts(previous_stage))
+    elif stage_name == "data_transformation":
+        artifacts = training_pipeline.start_data_transformation(training_pipeline.load_stage_artifacts(previous_stage))
+    else:
+        artifacts = training_pipeline.start_model_training(training_pipeline.load_stage_artifacts(previous_stage))
+        if not args.no_push:
+            training_pipeline.push_artifacts()
+    print(f"run: {training_pipeline.training_pipeline_config.timestamp}")
+    print(artifacts)
+
+def run_pipeline(args):
+    from NetworkSecurity.pipeline.training_pipeline import TrainingPipeline
+    training_pipeline = TrainingPipeline()
+    print(training_pipeline.run_pipeline())
+
+def run_prediction(args):
+    from NetworkSecurity.entity.config_entity import BatchPredictionConfig
+    from NetworkSecurity.pipeline.batch_prediction import BatchPrediction
+    batch_prediction_config = BatchPredictionConfig()
+    if args.n_jobs is not None:
+        batch_prediction_config.n_jobs = args.n_jobs
+    batch_prediction = BatchPrediction(batch_prediction_config)
+    print(batch_prediction.initiate_batch_prediction(args.input_file_path))
 
+def get_parser()->argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Network security training pipeline and batch prediction")
+    subparsers = parser.add_subparsers(dest="command")
 
+    subparsers.add_parser("run", help="run every training stage and push the artifacts (default)").set_defaults(
+        handler=run_pipeline)
+    subparsers.add_parser("ingest", help="export the collection and split train / test, starts a new run").set_defaults(
+        handler=run_stage)
+    for command, help_text in (("validate", "validate the ingested data and detect drift"),
+                               ("transform", "fit the preprocessor and transform the data"),
+                               ("train", "train, publish the model and push the artifacts")):
+        stage_parser = subparsers.add_parser(command, help=help_text)
+        stage_parser.add_argument("--run", help="run timestamp to continue, "
+                                  "defaults to the newest run that completed the previous stage")
+        stage_parser.set_defaults(handler=run_stage)
+    subparsers.choices["train"].add_argument("--no-push", action="store_true",
+                                             help="do not commit the run to the artifact store or push it to S3")
 
+    predict_parser = subparsers.add_parser("predict", help="score a csv or parquet file with the final model")
+    predict_parser.add_argument("input_file_path")
+    predict_parser.add_argument("--n-jobs", type=int, help="worker processes, -1 for every cpu")
+    predict_parser.set_defaults(handler=run_prediction)
+    return parser
+
+
+if __name__=="__main__":
+    try:
+        args = get_parser().parse_args()
+        # python main.py without a command runs the whole pipeline, as before
+        handler = getattr(args, "handler", run_pipeline)
+        handler(args)
     except Exception as e:
         raise NetworkSecurityException(e, sys)
-
@@ -1,8 +1,9 @@
-import sys 
-import os 
-import json 
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from dotenv import load_dotenv 
+from dotenv import load_dotenv
 load_dotenv()
 MONGO_DB_URL = os.getenv("MONGO_DB_URL")
 # print(MONGO_DB_URL)
@@ -10,35 +11,57 @@ MONGO_DB_URL = os.getenv("MONGO_DB_URL")
 import certifi
 ca = certifi.where()
 
-import pandas as pd 
-import numpy as np 
+import pandas as pd
+import numpy as np
 import pymongo
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure
 from NetworkSecurity.logging.logger import logging
 from NetworkSecurity.exception.exception import NetworkSecurityException
 
+DUPLICATE_KEY_ERROR_CODE = 11000
+
 class NetworkDataExtract():
-    def __init__(self):
+    def __init__(self, mongo_client=None):
+        """
+        mongo_client: optional client (e.g. mongomock) used instead of connecting to MONGO_DB_URL
+        """
         try:
-            pass
+            self.mongo_client = mongo_client
         except Exception as e:
             raise NetworkSecurityException(e, sys)
-        
+
     def convert_csv_to_json(self, filepath):
         try:
             data = pd.read_csv(filepath)
             data.reset_index(drop=True, inplace=True)
-            records = list(json.loads(data.T.to_json()).values())
-            return records           
+            # to_dict gives native python values, no transpose and json round trip needed
+            records = data.to_dict(orient="records")
+            return records
         except Exception as e:
             raise NetworkSecurityException(e, sys)
-        
+
+    def read_csv_in_chunks(self, filepath, chunk_size):
+        """
+        Yields the csv as lists of at most chunk_size documents
+        """
+        try:
+            for chunk in pd.read_csv(filepath, chunksize=chunk_size):
+                yield chunk.to_dict(orient="records")
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
+    def get_mongo_client(self, max_pool_size=100):
+        if self.mongo_client is None:
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL, maxPoolSize=max_pool_size)
+        return self.mongo_client
+
     def insert_data_to_mongoDB(self, records, database, collection):
-        try: 
+        try:
             self.database = database
             self.collection = collection
-            self.records = records 
+            self.records = records
 
-            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+            self.mongo_client = self.get_mongo_client()
             self.database = self.mongo_client[self.database]
             self.collection = self.database[self.collection]
             self.collection.insert_many(self.records)
@@ -47,12 +70,64 @@ class NetworkDataExtract():
         except  Exception as e:
             raise NetworkSecurityException(e, sys)
 
+    @staticmethod
+    def insert_chunk(collection, records, max_retries):
+        """
+        Unordered bulk insert of one chunk, retried on transient connection errors.
+        insert_many sets _id on the documents before sending them, so a retry resends the
+        same ids and documents that already made it in show up as duplicate key errors.
+        Returns:
+            number of documents stored
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                return len(collection.insert_many(records, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if any(error["code"] != DUPLICATE_KEY_ERROR_CODE for error in write_errors):
+                    raise
+                return e.details.get("nInserted", 0) + len(write_errors)
+            except (AutoReconnect, ConnectionFailure) as e:
+                if attempt == max_retries:
+                    raise
+                logging.info(f"Transient MongoDB error ({e}), retrying chunk, attempt {attempt + 1}")
+                time.sleep(0.5 * 2 ** attempt)
+
+    def bulk_insert_csv_to_mongoDB(self, filepath, database, collection,
+                                   chunk_size=5000, n_workers=4, max_retries=3):
+        """
+        Streams the csv in chunks and inserts them from n_workers threads sharing one
+        connection pool. At most 2 * n_workers chunks are in memory at any time.
+        """
+        try:
+            mongo_client = self.get_mongo_client(max_pool_size=n_workers)
+            mongo_collection = mongo_client[database][collection]
+
+            inserted = 0
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                pending = set()
+                for records in self.read_csv_in_chunks(filepath, chunk_size):
+                    if len(pending) >= 2 * n_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        inserted += sum(future.result() for future in done)
+                    pending.add(executor.submit(self.insert_chunk, mongo_collection, records, max_retries))
+                inserted += sum(future.result() for future in pending)
+
+            elapsed = time.perf_counter() - start_time
+            docs_per_second = inserted / elapsed if elapsed > 0 else 0.0
+            logging.info(f"Inserted {inserted} documents in {elapsed:.1f}s ({docs_per_second:.0f} docs/sec)")
+            return f"Inserted {inserted} records into MongoDB successfully! ({docs_per_second:.0f} docs/sec)"
+
+        except Exception as e:
+            raise NetworkSecurityException(e, sys)
+
 if __name__ == "__main__":
-    FILE_PATH = "Network_Data\phisingData.csv"
+    FILE_PATH = os.path.join("Network_Data", "phisingData.csv")
     DATABASE = "NAVEEN"
     collection = "Network Data"
     network_obj = NetworkDataExtract()
-    records = network_obj.convert_csv_to_json(filepath=FILE_PATH)
-    insert_data = network_obj.insert_data_to_mongoDB(records = records,
-                                       database=DATABASE,
-                                       collection=collection)
+    insert_data = network_obj.bulk_insert_csv_to_mongoDB(filepath=FILE_PATH,
+                                                         database=DATABASE,
+                                                         collection=collection)
+    logging.info(insert_data)
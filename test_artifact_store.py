@@ -0,0 +1,122 @@
+"""
+Tests of the content addressed artifact store on a temporary directory: committing a run,
+committing it again without storing new bytes, pruning old runs, garbage collecting their
+blobs, restoring a committed directory, and read-only blobs refusing writes in place.
+
+pytest test_artifact_store.py
+"""
+import os
+import json
+import stat
+
+import pytest
+
+from NetworkSecurity.utils.common.artifact_store import ArtifactStore
+from NetworkSecurity.utils.common.functions import save_object, load_object
+
+def write_file(file_path: str, content: bytes)->None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as file_obj:
+        file_obj.write(content)
+
+def read_file(file_path: str)->bytes:
+    with open(file_path, "rb") as file_obj:
+        return file_obj.read()
+
+def count_blobs(store: ArtifactStore)->int:
+    return sum(len(file_names) for _, _, file_names in os.walk(store.blobs_dir))
+
+def blob_bytes(store: ArtifactStore)->int:
+    return sum(os.path.getsize(os.path.join(root, file_name))
+               for root, _, file_names in os.walk(store.blobs_dir) for file_name in file_names)
+
+def stored_bytes(store: ArtifactStore, name: str, dir_path: str)->int:
+    """
+    Commits dir_path as name, returns the bytes the commit added to the store
+    """
+    before = blob_bytes(store)
+    store.commit(name, dir_path, link=True)
+    return blob_bytes(store) - before
+
+def make_run(run_dir: str, model_content: bytes)->None:
+    write_file(os.path.join(run_dir, "data_ingestion", "train.parquet"), b"train rows" * 100)
+    write_file(os.path.join(run_dir, "data_ingestion", "test.parquet"), b"test rows" * 100)
+    write_file(os.path.join(run_dir, "model_trainer", "model.pkl"), model_content)
+
+def test_commit_recommit_prune_gc_restore(tmp_path):
+    store = ArtifactStore(store_dir=str(tmp_path / "artifact_store"))
+    first_run, second_run = str(tmp_path / "runs" / "first"), str(tmp_path / "runs" / "second")
+    make_run(first_run, b"first model")
+    make_run(second_run, b"second model")
+
+    manifest = store.commit("runs/first", first_run, link=True)
+    assert sorted(manifest["files"]) == ["data_ingestion/test.parquet", "data_ingestion/train.parquet",
+                                         "model_trainer/model.pkl"]
+    # The run directory holds links to the blobs, not a second copy
+    train_path = os.path.join(first_run, "data_ingestion", "train.parquet")
+    assert os.path.samefile(train_path, store.blob_path(manifest["files"]["data_ingestion/train.parquet"]["sha256"]))
+
+    # Committing an unchanged directory again stores nothing
+    assert stored_bytes(store, "runs/first", first_run) == 0
+
+    # Only the model differs between the runs, it is the only new content
+    blob_count = count_blobs(store)
+    assert stored_bytes(store, "runs/second", second_run) == len(b"second model")
+    assert count_blobs(store) == blob_count + 1
+    second_manifest = store.load_manifest("runs/second")
+
+    # Both runs were committed within the same second, date the first one earlier
+    first_manifest = store.load_manifest("runs/first")
+    first_manifest["created_at"] = "2000-01-01T00:00:00"
+    with open(store.manifest_path("runs/first"), "w") as file_obj:
+        json.dump(first_manifest, file_obj)
+    assert store.prune("runs", keep_last=1) == ["runs/first"]
+    assert store.list_manifests() == ["runs/second"]
+
+    # Only the blob of the first model is no longer referenced
+    report = store.gc()
+    assert report["blobs_removed"] == 1 and report["blobs_kept"] == 3
+    for entry in second_manifest["files"].values():
+        assert os.path.exists(store.blob_path(entry["sha256"]))
+
+    restored_dir = str(tmp_path / "restored")
+    store.restore("runs/second", restored_dir)
+    for relative_path in second_manifest["files"]:
+        assert read_file(os.path.join(restored_dir, *relative_path.split("/"))) == \
+            read_file(os.path.join(second_run, *relative_path.split("/")))
+
+def test_rewriting_a_committed_file_leaves_its_blob_unchanged(tmp_path):
+    store = ArtifactStore(store_dir=str(tmp_path / "artifact_store"))
+    run_dir = str(tmp_path / "run")
+    model_file_path = os.path.join(run_dir, "model.pkl")
+    save_object(model_file_path, {"version": 1})
+    manifest = store.commit("runs/run", run_dir, link=True)
+
+    # A stage rerun into a committed run replaces the linked file instead of writing through the link
+    save_object(model_file_path, {"version": 2})
+    blob_path = store.blob_path(manifest["files"]["model.pkl"]["sha256"])
+    assert load_object(blob_path) == {"version": 1}
+    assert load_object(model_file_path) == {"version": 2}
+    assert not os.path.samefile(model_file_path, blob_path)
+
+def test_committed_files_are_read_only(tmp_path):
+    store = ArtifactStore(store_dir=str(tmp_path / "artifact_store"))
+    run_dir = str(tmp_path / "run")
+    make_run(run_dir, b"model")
+    manifest = store.commit("runs/run", run_dir, link=True)
+
+    model_file_path = os.path.join(run_dir, "model_trainer", "model.pkl")
+    for file_path in (model_file_path, store.blob_path(manifest["files"]["model_trainer/model.pkl"]["sha256"])):
+        assert stat.S_IMODE(os.stat(file_path).st_mode) & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH) == 0
+    if os.geteuid() != 0:
+        # A write in place through the link fails instead of changing the blob
+        with pytest.raises(PermissionError):
+            open(model_file_path, "r+b")
+
+    # Restored copies belong to the caller and stay writable
+    restored_dir = str(tmp_path / "restored")
+    store.restore("runs/run", restored_dir)
+    restored_file_path = os.path.join(restored_dir, "model_trainer", "model.pkl")
+    assert os.stat(restored_file_path).st_mode & stat.S_IWUSR
+    write_file(restored_file_path, b"edited")
+    assert read_file(model_file_path) == b"model"
@@ -0,0 +1,108 @@
+"""
+Tests of the sharding and output schema of batch prediction: a parquet file with one row group
+is split into row ranges, and shards whose chunks have missing values (float columns in pandas)
+merge into one prediction file with the types of the input.
+
+pytest test_batch_prediction.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from NetworkSecurity.constants.training_pipeline import TARGET_COLUMN, SCHEMA_FILE_PATH
+from NetworkSecurity.entity.config_entity import BatchPredictionConfig
+from NetworkSecurity.pipeline.batch_prediction import BatchPrediction
+from NetworkSecurity.utils.common.functions import read_yaml_file, get_schema_dtypes
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+N_ROWS = 1000
+
+class SignModel:
+    """
+    Predicts 1 if a feature is positive, else -1
+    """
+    def __init__(self, column: str):
+        self.column = column
+
+    def predict(self, X):
+        return np.where(X[self.column].fillna(0).to_numpy() > 0, 1, -1)
+
+@pytest.fixture
+def input_dataframe():
+    feature_columns = [column for column in get_schema_dtypes(read_yaml_file(os.path.join(ROOT_DIR, SCHEMA_FILE_PATH)))
+                       if column != TARGET_COLUMN]
+    random_state = np.random.RandomState(0)
+    dataframe = pd.DataFrame(random_state.randint(-1, 2, size=(N_ROWS, len(feature_columns))).astype(np.int8),
+                             columns=feature_columns)
+    # Missing values in the last shard only, so its chunks get float columns in pandas
+    dataframe[feature_columns[1]] = dataframe[feature_columns[1]].astype("Int8")
+    dataframe.loc[N_ROWS - 10:, feature_columns[1]] = pd.NA
+    dataframe.insert(0, "url_id", [f"id{i}" for i in range(N_ROWS)])
+    return dataframe
+
+def make_batch_prediction(tmp_path, monkeypatch, extension: str, input_dataframe)->BatchPrediction:
+    monkeypatch.chdir(ROOT_DIR)
+    config = BatchPredictionConfig()
+    config.prediction_dir = str(tmp_path / "prediction")
+    config.prediction_file_path = os.path.join(config.prediction_dir, f"predictions{extension}")
+    config.chunk_size = 128
+    os.makedirs(config.prediction_dir)
+    batch_prediction = BatchPrediction(config)
+    batch_prediction.network_model = SignModel(input_dataframe.columns[1])
+    return batch_prediction
+
+def score_shards(batch_prediction: BatchPrediction, input_file_path: str, n_shards: int)->list:
+    """
+    Scores every shard into its part file with a worker instance and merges the parts,
+    as score_in_parallel does with worker processes
+    """
+    config = batch_prediction.batch_prediction_config
+    worker = BatchPrediction(config)
+    worker.network_model = batch_prediction.network_model
+    shards = batch_prediction.get_shards(input_file_path, n_shards)
+    extension = os.path.splitext(config.prediction_file_path)[1]
+    batch_prediction.output_schema = batch_prediction.get_output_schema(input_file_path)
+    batch_prediction.parquet_writer = None
+    rows = []
+    for i, shard in enumerate(shards):
+        part_file_path = os.path.join(config.prediction_dir, f"part_{i:05d}{extension}")
+        rows.append(worker.score_shard(input_file_path, shard, part_file_path, write_header= i == 0))
+        batch_prediction.merge_part(part_file_path, is_first_part= i == 0)
+    if batch_prediction.parquet_writer is not None:
+        batch_prediction.parquet_writer.close()
+    return rows
+
+def test_single_row_group_parquet_is_split_into_row_ranges(tmp_path, monkeypatch, input_dataframe):
+    input_file_path = str(tmp_path / "input.parquet")
+    input_dataframe.to_parquet(input_file_path, index=False)
+    assert pq.ParquetFile(input_file_path).metadata.num_row_groups == 1
+    batch_prediction = make_batch_prediction(tmp_path, monkeypatch, ".parquet", input_dataframe)
+
+    shards = batch_prediction.get_shards(input_file_path, 4)
+    assert shards == [("parquet", 0, 250), ("parquet", 250, 500), ("parquet", 500, 750), ("parquet", 750, 1000)]
+    assert score_shards(batch_prediction, input_file_path, 4) == [250, 250, 250, 250]
+
+    input_schema = pq.read_schema(input_file_path)
+    predictions = pq.read_table(batch_prediction.batch_prediction_config.prediction_file_path)
+    for field in input_schema:
+        assert predictions.schema.field(field.name).type == field.type
+    assert predictions.column("url_id").to_pylist() == input_dataframe["url_id"].tolist()
+    assert predictions.column(input_dataframe.columns[2]).null_count == 10
+
+def test_csv_shards_print_integers_alike(tmp_path, monkeypatch, input_dataframe):
+    input_file_path = str(tmp_path / "input.csv")
+    input_dataframe.to_csv(input_file_path, index=False)
+    batch_prediction = make_batch_prediction(tmp_path, monkeypatch, ".csv", input_dataframe)
+
+    assert sum(score_shards(batch_prediction, input_file_path, 4)) == N_ROWS
+    with open(batch_prediction.batch_prediction_config.prediction_file_path) as file_obj:
+        lines = file_obj.read().splitlines()
+    assert len(lines) == N_ROWS + 1
+    assert not any(".0" in line for line in lines)
+    predictions = pd.read_csv(batch_prediction.batch_prediction_config.prediction_file_path)
+    expected = np.where(input_dataframe.iloc[:, 1] > 0, 1, -1)
+    assert (predictions[batch_prediction.batch_prediction_config.prediction_column].to_numpy() == expected).all()
+    assert predictions["url_id"].tolist() == input_dataframe["url_id"].tolist()
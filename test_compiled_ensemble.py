@@ -0,0 +1,64 @@
+"""
+Tests of the compiled tree ensemble: predictions match sklearn exactly, the gradient boosting
+init prediction is the model's decision function less its trees, and large batches of mostly
+distinct rows are handed to the sklearn model.
+
+pytest test_compiled_ensemble.py
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+
+from NetworkSecurity.utils.ml_utils.model.compiled_ensemble import CompiledEnsemble
+
+def make_data(n_rows: int, n_classes: int = 2, seed: int = 0):
+    random_state = np.random.RandomState(seed)
+    X = random_state.randint(-1, 2, size=(n_rows, 12)).astype(np.int8)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + random_state.randint(0, 2, size=n_rows)) % n_classes
+    return X, y
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_gradient_boosting_init_matches_sklearn(n_classes):
+    X, y = make_data(600, n_classes)
+    model = GradientBoostingClassifier(n_estimators=20, random_state=0).fit(X, y)
+    X_test = X[:50].astype(np.float32)
+    # decision_function is the init prediction plus learning_rate times the prediction of every tree
+    trees = np.stack([[tree.predict(X_test) for tree in stage] for stage in model.estimators_])
+    expected = model.decision_function(X_test).reshape(len(X_test), -1) - model.learning_rate * trees.sum(axis=0).T
+    assert np.allclose(expected, CompiledEnsemble.get_init_raw(model), rtol=0, atol=1e-9)
+
+@pytest.mark.parametrize("model", [RandomForestClassifier(n_estimators=20, random_state=0),
+                                   GradientBoostingClassifier(n_estimators=20, random_state=0),
+                                   AdaBoostClassifier(n_estimators=20, random_state=0)])
+def test_predictions_match_sklearn(model):
+    X, y = make_data(600)
+    model.fit(X, y)
+    compiled_model = CompiledEnsemble(model)
+    X_test, _ = make_data(2000, seed=1)
+    assert np.array_equal(compiled_model.predict(X_test), model.predict(X_test))
+    assert np.array_equal(compiled_model.predict(X_test[:1]), model.predict(X_test[:1]))
+
+class CountingModel:
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return self.model.predict(X)
+
+def test_large_distinct_batches_fall_back_to_sklearn():
+    X, y = make_data(600)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    compiled_model = CompiledEnsemble(model, fallback_min_rows=1000, fallback_distinct_ratio=0.25)
+    compiled_model.fallback_model = CountingModel(model)
+
+    # 12 ternary features, 5000 random rows are almost all distinct
+    X_distinct, _ = make_data(5000, seed=2)
+    assert np.array_equal(compiled_model.predict(X_distinct), model.predict(X_distinct))
+    assert compiled_model.fallback_model.calls == 1
+
+    # The same rows repeated: few distinct rows, served by the kernel
+    X_repeated = np.repeat(X_distinct[:100], 50, axis=0)
+    assert np.array_equal(compiled_model.predict(X_repeated), model.predict(X_repeated))
+    assert compiled_model.fallback_model.calls == 1
@@ -0,0 +1,69 @@
+"""
+Tests of the full collection export against a mongomock stand-in for MongoDB: the collection
+is streamed into the feature store one row group per chunk, and split into train and test one
+row group at a time, without building a dataframe of the whole collection.
+
+pytest test_data_ingestion.py
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from NetworkSecurity.components import data_ingestion as data_ingestion_module
+from NetworkSecurity.components.data_ingestion import DataIngestion
+from NetworkSecurity.constants.training_pipeline import SCHEMA_FILE_PATH
+from NetworkSecurity.entity.config_entity import TrainingPipelineConfig, DataIngestionConfig
+from NetworkSecurity.utils.common.functions import read_yaml_file, get_schema_dtypes
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+N_DOCUMENTS = 2500
+
+@pytest.fixture
+def data_ingestion(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT_DIR)
+    columns = list(get_schema_dtypes(read_yaml_file(SCHEMA_FILE_PATH)))
+    random_state = np.random.RandomState(0)
+    values = random_state.randint(-1, 2, size=(N_DOCUMENTS, len(columns)))
+    documents = [dict(zip(columns, map(int, row))) for row in values]
+    # Missing values as the collection stores them
+    for document in documents[::97]:
+        document[columns[3]] = "na"
+    mongo_client = mongomock.MongoClient()
+    config = DataIngestionConfig(TrainingPipelineConfig())
+    mongo_client[config.database_name][config.collection_name].insert_many(documents)
+    monkeypatch.setattr(data_ingestion_module.pymongo, "MongoClient", lambda *args, **kwargs: mongo_client)
+
+    config.feature_store_file_path = str(tmp_path / "feature_store" / "phisingData.parquet")
+    config.training_file_path = str(tmp_path / "ingested" / "train.parquet")
+    config.testing_file_path = str(tmp_path / "ingested" / "test.parquet")
+    config.batch_size = 1000
+    return DataIngestion(config)
+
+def sorted_rows(dataframe: pd.DataFrame)->list:
+    return sorted(map(tuple, dataframe.fillna(-9).to_numpy().tolist()))
+
+def test_export_and_split_stream_row_groups(data_ingestion, monkeypatch):
+    concat = pd.concat
+    def fail_concat(*args, **kwargs):
+        raise AssertionError("the collection must not be concatenated in memory")
+    monkeypatch.setattr(data_ingestion_module.pd, "concat", fail_concat)
+    artifacts = data_ingestion.initiate_data_ingestion()
+    monkeypatch.setattr(data_ingestion_module.pd, "concat", concat)
+
+    config = data_ingestion.data_ingestion_config
+    feature_store = pq.ParquetFile(config.feature_store_file_path)
+    assert feature_store.metadata.num_rows == N_DOCUMENTS
+    assert feature_store.num_row_groups == 3
+
+    train = pq.read_table(artifacts.trained_file_path).to_pandas()
+    test = pq.read_table(artifacts.test_file_path).to_pandas()
+    assert len(test) == int(np.ceil(N_DOCUMENTS * config.train_test_split_ratio))
+    assert len(train) + len(test) == N_DOCUMENTS
+    assert pq.read_schema(artifacts.trained_file_path) == feature_store.schema_arrow
+    # Every document is in exactly one of the splits
+    assert sorted_rows(concat([train, test])) == sorted_rows(pq.read_table(config.feature_store_file_path).to_pandas())
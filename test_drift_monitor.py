@@ -0,0 +1,42 @@
+"""
+Tests of the buffered drift monitor: request handlers only queue rows with record, the counts
+change when the rows are flushed, and a drift check flushes the queue before comparing.
+
+pytest test_drift_monitor.py
+"""
+import numpy as np
+
+from NetworkSecurity.entity.config_entity import DriftMonitorConfig
+from NetworkSecurity.utils.ml_utils.metric.drift_metric import compute_histograms, save_histograms
+from NetworkSecurity.utils.ml_utils.metric.drift_monitor import DriftMonitor
+
+COLUMNS = ["a", "b", "c"]
+
+def drift_monitor(tmp_path)->DriftMonitor:
+    config = DriftMonitorConfig()
+    random_state = np.random.RandomState(0)
+    reference = random_state.randint(-1, 2, size=(5000, len(COLUMNS)))
+    config.reference_file_path = str(tmp_path / "reference_histograms.npz")
+    config.snapshot_file_path = str(tmp_path / "drift_monitor" / "snapshots.jsonl")
+    config.min_window_rows = 10
+    save_histograms(config.reference_file_path, COLUMNS, compute_histograms(reference, config.feature_domain))
+    return DriftMonitor(config, COLUMNS)
+
+def test_recorded_rows_are_counted_on_flush(tmp_path):
+    monitor = drift_monitor(tmp_path)
+    monitor.record([[1, 0, -1]])
+    monitor.record(np.array([[0, 0, 0], [1, 1, 1]]))
+    assert monitor.window_counts.sum() == 0
+
+    assert monitor.flush() == 3
+    assert not monitor.pending
+    expected = compute_histograms(np.array([[1, 0, -1], [0, 0, 0], [1, 1, 1]]), [-1, 0, 1])
+    assert np.array_equal(monitor.window_counts, expected)
+    assert monitor.flush() == 0
+
+def test_check_flushes_recorded_rows(tmp_path):
+    monitor = drift_monitor(tmp_path)
+    monitor.record(np.ones((20, len(COLUMNS)), dtype=np.int8))
+    snapshot = monitor.check()
+    assert snapshot["window_rows"] == 20
+    assert snapshot["drift_status"] is True
@@ -0,0 +1,26 @@
+"""
+Tests that a seeded hyperparameter search is reproducible: the same random_state samples the
+same candidates and the same halving row subsamples, so the same parameters are selected.
+
+pytest test_evaluate.py
+"""
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier
+
+from NetworkSecurity.utils.ml_utils.model.evaluate import evaluate_models
+
+def search(X, y, random_state: int)->dict:
+    models = {"Decision Tree": DecisionTreeClassifier(random_state=0),
+              "Random Forest": RandomForestClassifier(random_state=0)}
+    params = {"Decision Tree": {"max_depth": list(range(1, 20)), "min_samples_leaf": list(range(1, 30))},
+              "Random Forest": {"n_estimators": [8, 16, 32, 64], "max_depth": list(range(1, 20))}}
+    evaluate_models(X[:300], y[:300], X[300:], y[300:], models, params, n_jobs=2, n_iter=9,
+                    search_mode="halving", random_state=random_state)
+    return {name: model.get_params() for name, model in models.items()}
+
+def test_seeded_halving_search_is_reproducible():
+    random_state = np.random.RandomState(0)
+    X = random_state.randint(0, 3, size=(400, 8)).astype(np.int8)
+    y = np.where(X[:, 0] + random_state.randint(0, 2, size=400) > 1, 1, -1)
+    assert search(X, y, random_state=7) == search(X, y, random_state=7)
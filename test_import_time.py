@@ -0,0 +1,98 @@
+"""
+Cold start checks of the CLI (main.py) and of the modules short lived jobs import.
+Every import runs in a fresh interpreter. The tests check the modules it must not pull in,
+e.g. batch prediction must not import the training components or the experiment tracker,
+which is deterministic. Wall clock times depend on the machine, so the time budgets are only
+compared by the report, which exits with status 1 when an import is over its budget.
+
+pytest test_import_time.py          # check the imported modules
+python test_import_time.py          # report the import times against their budgets
+"""
+import os
+import sys
+import json
+import subprocess
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPEATS = 3
+
+TRAINING_ONLY_MODULES = ["NetworkSecurity.components.model_trainer", "sklearn.ensemble", "mlflow", "dagshub"]
+
+# module -> (import time budget in seconds, modules it must not import)
+IMPORT_BUDGETS = {
+    "main": (0.3, ["numpy", "pandas", "sklearn", "scipy", "pymongo"] + TRAINING_ONLY_MODULES),
+    "NetworkSecurity.entity.config_entity": (0.3, ["numpy", "pandas", "sklearn"]),
+    "NetworkSecurity.pipeline.batch_prediction": (1.0, ["sklearn", "scipy", "pymongo"] + TRAINING_ONLY_MODULES),
+    "NetworkSecurity.pipeline.training_pipeline": (1.0, ["sklearn", "scipy", "pymongo"] + TRAINING_ONLY_MODULES),
+    "NetworkSecurity.components.model_trainer": (2.0, ["sklearn.ensemble", "mlflow", "dagshub"]),
+}
+
+PROBE = """
+import sys, time, json, importlib
+start_time = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start_time, "modules": sorted(sys.modules)}))
+"""
+
+def import_in_fresh_interpreter(module_name: str, cwd: str)->dict:
+    environment = dict(os.environ, PYTHONPATH=ROOT_DIR, PYTHONDONTWRITEBYTECODE="1")
+    output = subprocess.run([sys.executable, "-c", PROBE, module_name], cwd=cwd, env=environment,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure_import(module_name: str, repeats: int = REPEATS)->dict:
+    """
+    Args:
+        repeats: timed imports after the first one, 0 only collects the modules
+    Returns:
+        {"seconds": best import time (None without repeats), "modules": modules loaded by the import,
+        "created_files": files the import created in its working directory}
+    """
+    with tempfile.TemporaryDirectory() as cwd:
+        # The first import compiles the bytecode of the repo, it is not timed
+        first_run = import_in_fresh_interpreter(module_name, cwd)
+        runs = [import_in_fresh_interpreter(module_name, cwd) for _ in range(repeats)]
+        created_files = os.listdir(cwd)
+    return {"seconds": min(run["seconds"] for run in runs) if runs else None, "modules": first_run["modules"],
+            "created_files": created_files}
+
+def check_import(module_name: str)->None:
+    _, forbidden_modules = IMPORT_BUDGETS[module_name]
+    result = measure_import(module_name, repeats=0)
+    imported = [name for name in forbidden_modules if name in result["modules"]]
+    assert not imported, f"importing {module_name} imports {imported}"
+    assert not result["created_files"], f"importing {module_name} created {result['created_files']}"
+
+def test_main_imports():
+    check_import("main")
+
+def test_config_imports():
+    check_import("NetworkSecurity.entity.config_entity")
+
+def test_batch_prediction_imports():
+    check_import("NetworkSecurity.pipeline.batch_prediction")
+
+def test_training_pipeline_imports():
+    check_import("NetworkSecurity.pipeline.training_pipeline")
+
+def test_model_trainer_imports():
+    check_import("NetworkSecurity.components.model_trainer")
+
+def test_cli_help_starts_without_heavy_imports():
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.join(ROOT_DIR, "main.py"), "--help"],
+                            capture_output=True, text=True, check=True)
+    imported = {line.split("|")[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+    assert "predict" in result.stdout
+    assert not imported & {"numpy", "pandas", "sklearn"}, f"main.py --help imports {imported & {'numpy', 'pandas', 'sklearn'}}"
+
+
+if __name__ == "__main__":
+    over_budget = []
+    for module_name, (budget_seconds, _) in IMPORT_BUDGETS.items():
+        result = measure_import(module_name)
+        if result["seconds"] > budget_seconds:
+            over_budget.append(module_name)
+        print(f"{module_name:<45} {result['seconds'] * 1000:8.1f} ms  (budget {budget_seconds * 1000:.0f} ms, "
+              f"{len(result['modules'])} modules){'  OVER BUDGET' if module_name in over_budget else ''}")
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,46 @@
+"""
+Tests of the versioned model artifact format: every save writes an immutable version and
+switches the CURRENT pointer, so a reader loads one complete version while saves run.
+
+pytest test_model_artifact.py
+"""
+import os
+
+import numpy as np
+
+from NetworkSecurity.utils.common import functions
+from NetworkSecurity.utils.common.functions import (save_model_artifact, load_model_artifact, write_model_artifact,
+                                                    get_model_artifact_versions, model_artifact_exists)
+
+def test_save_switches_current_and_keeps_previous_versions(tmp_path):
+    dir_path = str(tmp_path / "network_model")
+    for number in range(1, 6):
+        version = save_model_artifact(dir_path, {"number": number, "weights": np.full(100, number)})
+        assert version == f"v{number:06d}"
+        loaded = load_model_artifact(dir_path)
+        assert loaded["number"] == number and (loaded["weights"] == number).all()
+    assert get_model_artifact_versions(dir_path) == ["v000003", "v000004", "v000005"]
+
+def test_unversioned_artifact_is_replaced_by_first_save(tmp_path):
+    dir_path = str(tmp_path / "network_model")
+    write_model_artifact(dir_path, {"number": 0})
+    assert model_artifact_exists(dir_path) and load_model_artifact(dir_path) == {"number": 0}
+    save_model_artifact(dir_path, {"number": 1})
+    assert load_model_artifact(dir_path) == {"number": 1}
+    assert sorted(os.listdir(dir_path)) == ["CURRENT", "v000001"]
+
+def test_load_follows_current_when_its_version_is_removed(tmp_path, monkeypatch):
+    dir_path = str(tmp_path / "network_model")
+    save_model_artifact(dir_path, {"number": 1})
+    read_model_artifact = functions.read_model_artifact
+    calls = []
+    def read_while_saving(version_dir):
+        calls.append(os.path.basename(version_dir))
+        if len(calls) == 1:
+            # Saves run between reading CURRENT and reading the version files, and remove the version
+            for number in range(2, 5):
+                save_model_artifact(dir_path, {"number": number})
+        return read_model_artifact(version_dir)
+    monkeypatch.setattr(functions, "read_model_artifact", read_while_saving)
+    assert load_model_artifact(dir_path) == {"number": 4}
+    assert calls == ["v000001", "v000004"]
@@ -0,0 +1,36 @@
+"""
+Tests of the model registry as the only published model: the loader serves the current
+version (preprocessor and model of one run together), refuses to serve when nothing is
+published, and follows a roll back of CURRENT.
+
+pytest test_model_registry.py
+"""
+import pytest
+
+from NetworkSecurity.exception.exception import NetworkSecurityException
+from NetworkSecurity.utils.ml_utils.model.estimator import NetworkModel, load_final_network_model
+from NetworkSecurity.utils.ml_utils.model.registry import ModelRegistry
+
+def test_loader_serves_the_current_version(tmp_path):
+    registry_dir = str(tmp_path / "model_registry")
+    model_registry = ModelRegistry(registry_dir, keep_versions=2)
+    drift_reference_file_path = tmp_path / "reference_histograms.npz"
+    drift_reference_file_path.write_bytes(b"histograms")
+
+    for run in (1, 2, 3):
+        version = model_registry.publish(NetworkModel(preprocessor=f"preprocessor {run}", model=f"model {run}"),
+                                         metadata={"run": run}, files=[str(drift_reference_file_path)])
+    assert version == "v000003"
+    assert model_registry.list_versions() == ["v000002", "v000003"]
+    network_model = load_final_network_model(registry_dir)
+    assert (network_model.preprocessor, network_model.model) == ("preprocessor 3", "model 3")
+    assert model_registry.version_file_path(version, "reference_histograms.npz") is not None
+
+    # Rolling back CURRENT serves the earlier run's preprocessor and model together
+    model_registry.set_current("v000002")
+    network_model = load_final_network_model(registry_dir)
+    assert (network_model.preprocessor, network_model.model) == ("preprocessor 2", "model 2")
+
+def test_loader_refuses_an_empty_registry(tmp_path):
+    with pytest.raises(NetworkSecurityException, match="No model version is published"):
+        load_final_network_model(str(tmp_path / "model_registry"))
@@ -0,0 +1,86 @@
+"""
+Tests of the bulk CSV loader against a mongomock stand-in for MongoDB: a chunked insert
+stores every row once, a chunk is retried on AutoReconnect, and documents that already made
+it in (duplicate keys on a retry) count as inserted.
+
+pytest test_push_data_to_mongoDB.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from pymongo.errors import AutoReconnect
+
+mongomock = pytest.importorskip("mongomock")
+
+import push_data_to_mongoDB
+from push_data_to_mongoDB import NetworkDataExtract
+
+N_ROWS = 1050
+
+@pytest.fixture
+def csv_file_path(tmp_path):
+    random_state = np.random.RandomState(0)
+    dataframe = pd.DataFrame(random_state.randint(-1, 2, size=(N_ROWS, 5)),
+                             columns=["having_IP_Address", "URL_Length", "SFH", "port", "Result"])
+    file_path = tmp_path / "phisingData.csv"
+    dataframe.to_csv(file_path, index=False)
+    return str(file_path)
+
+class FlakyCollection:
+    """
+    Collection whose first insert_many stores the documents but loses the reply,
+    as a dropped connection does
+    """
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = 0
+
+    def insert_many(self, records, ordered=True):
+        self.calls += 1
+        result = self.collection.insert_many(records, ordered=ordered)
+        if self.calls == 1:
+            raise AutoReconnect("connection closed")
+        return result
+
+def test_chunked_insert_stores_every_row(csv_file_path):
+    mongo_client = mongomock.MongoClient()
+    network_data_extract = NetworkDataExtract(mongo_client=mongo_client)
+    message = network_data_extract.bulk_insert_csv_to_mongoDB(csv_file_path, "NAVEEN", "Network Data",
+                                                              chunk_size=100, n_workers=4)
+    assert f"Inserted {N_ROWS} records" in message
+    collection = mongo_client["NAVEEN"]["Network Data"]
+    assert collection.count_documents({}) == N_ROWS
+    assert collection.count_documents({"Result": 1}) == int((pd.read_csv(csv_file_path)["Result"] == 1).sum())
+
+def test_chunk_is_retried_on_auto_reconnect(csv_file_path, monkeypatch):
+    monkeypatch.setattr(push_data_to_mongoDB.time, "sleep", lambda seconds: None)
+    collection = mongomock.MongoClient()["NAVEEN"]["Network Data"]
+    flaky_collection = FlakyCollection(collection)
+    records = next(NetworkDataExtract().read_csv_in_chunks(csv_file_path, chunk_size=100))
+
+    # The retry resends the same _ids, all of them are already stored
+    assert NetworkDataExtract.insert_chunk(flaky_collection, records, max_retries=3) == 100
+    assert flaky_collection.calls == 2
+    assert collection.count_documents({}) == 100
+
+def test_duplicate_keys_count_as_inserted(csv_file_path):
+    collection = mongomock.MongoClient()["NAVEEN"]["Network Data"]
+    records = next(NetworkDataExtract().read_csv_in_chunks(csv_file_path, chunk_size=100))
+    for i, record in enumerate(records):
+        record["_id"] = i
+    # The first 40 documents were stored by an earlier attempt
+    collection.insert_many([dict(record) for record in records[:40]])
+
+    assert NetworkDataExtract.insert_chunk(collection, records, max_retries=0) == 100
+    assert collection.count_documents({}) == 100
+
+def test_retries_are_bounded(csv_file_path, monkeypatch):
+    monkeypatch.setattr(push_data_to_mongoDB.time, "sleep", lambda seconds: None)
+
+    class DownCollection:
+        def insert_many(self, records, ordered=True):
+            raise AutoReconnect("connection refused")
+
+    records = next(NetworkDataExtract().read_csv_in_chunks(csv_file_path, chunk_size=10))
+    with pytest.raises(AutoReconnect):
+        NetworkDataExtract.insert_chunk(DownCollection(), records, max_retries=2)
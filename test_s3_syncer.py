@@ -0,0 +1,73 @@
+"""
+Tests of the folder sync against a LocalObjectStore: a second sync of an unchanged folder
+transfers no file, a one-file edit transfers that file only, and multipart copies are complete
+even when os.pread returns fewer bytes than asked.
+
+pytest test_s3_syncer.py
+"""
+import os
+
+import pytest
+
+from NetworkSecurity.cloud import s3_syncer
+from NetworkSecurity.cloud.s3_syncer import S3Sync, LocalObjectStore
+
+def write_file(file_path: str, content: bytes)->None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as file_obj:
+        file_obj.write(content)
+
+def read_file(file_path: str)->bytes:
+    with open(file_path, "rb") as file_obj:
+        return file_obj.read()
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = str(tmp_path / "final_model")
+    write_file(os.path.join(folder, "model.pkl"), b"model" * 1000)
+    write_file(os.path.join(folder, "preprocessor.pkl"), b"preprocessor" * 1000)
+    write_file(os.path.join(folder, "reports", "metrics.yaml"), b"f1_score: 0.97\n")
+    return folder
+
+def test_only_changed_files_are_uploaded(tmp_path, folder):
+    s3_sync = S3Sync(max_workers=2)
+    bucket_url = f"file://{tmp_path / 'bucket' / 'final_model'}"
+
+    report = s3_sync.sync_folder_to_s3(folder, bucket_url)
+    assert report["files"] == 3 and report["transferred"] == 3
+
+    report = s3_sync.sync_folder_to_s3(folder, bucket_url)
+    assert report["transferred"] == 0 and report["skipped"] == 3 and report["bytes_transferred"] == 0
+
+    write_file(os.path.join(folder, "reports", "metrics.yaml"), b"f1_score: 0.98\n")
+    report = s3_sync.sync_folder_to_s3(folder, bucket_url)
+    assert report["transferred"] == 1 and report["bytes_transferred"] == len(b"f1_score: 0.98\n")
+    assert read_file(str(tmp_path / "bucket" / "final_model" / "reports" / "metrics.yaml")) == b"f1_score: 0.98\n"
+
+def test_only_changed_files_are_downloaded(tmp_path, folder):
+    s3_sync = S3Sync(max_workers=2)
+    bucket_url = f"file://{tmp_path / 'bucket' / 'final_model'}"
+    s3_sync.sync_folder_to_s3(folder, bucket_url)
+    local_folder = str(tmp_path / "local_model")
+
+    assert s3_sync.sync_folder_from_s3(local_folder, bucket_url)["transferred"] == 3
+    assert s3_sync.sync_folder_from_s3(local_folder, bucket_url)["transferred"] == 0
+
+    write_file(os.path.join(local_folder, "model.pkl"), b"stale model")
+    report = s3_sync.sync_folder_from_s3(local_folder, bucket_url)
+    assert report["transferred"] == 1
+    assert read_file(os.path.join(local_folder, "model.pkl")) == read_file(os.path.join(folder, "model.pkl"))
+
+@pytest.mark.skipif(not hasattr(os, "pread"), reason="multipart copies need os.pread")
+def test_multipart_copy_survives_short_reads(tmp_path, monkeypatch):
+    pread = os.pread
+    # Every read returns at most 1000 bytes, as a read interrupted by a signal may
+    monkeypatch.setattr(s3_syncer.os, "pread", lambda fd, n, offset: pread(fd, min(n, 1000), offset))
+    content = os.urandom(100000)
+    source_path = str(tmp_path / "source.bin")
+    write_file(source_path, content)
+    store = LocalObjectStore(str(tmp_path / "bucket"), multipart_threshold=4096,
+                             multipart_chunksize=16384, max_concurrency=4)
+
+    store.upload_file(source_path, "parts/source.bin")
+    assert read_file(str(tmp_path / "bucket" / "parts" / "source.bin")) == content